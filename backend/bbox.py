@@ -0,0 +1,45 @@
+"""
+Bounding boxes in query strings.
+
+Map viewports and spatial incident queries take a ``bbox`` query value
+of the form ``min_lat,min_lon,max_lat,max_lon``. :func:`parse_bbox`
+turns it into a tuple or answers 400, rejecting non-finite numbers and
+coordinates off the globe before they reach the spatial indexes.
+:func:`check_bbox` applies the same rules to boxes that arrive in other
+shapes, such as WebSocket subscription messages, raising ``ValueError``.
+"""
+
+import math
+from typing import Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+BBOX_FORMAT = "bbox must be min_lat,min_lon,max_lat,max_lon"
+
+
+def check_bbox(box: Sequence[float]) -> BBox:
+    """Validate a ``(min_lat, min_lon, max_lat, max_lon)`` box, raising ``ValueError``."""
+    min_lat, min_lon, max_lat, max_lon = box
+    if not all(math.isfinite(v) for v in (min_lat, min_lon, max_lat, max_lon)):
+        raise ValueError("bbox values must be finite numbers")
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError(BBOX_FORMAT)
+    if min_lat < -90 or max_lat > 90 or min_lon < -180 or max_lon > 180:
+        raise ValueError("bbox latitudes must be within +/-90 and longitudes within +/-180")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def parse_bbox(bbox: str) -> BBox:
+    """Parse a ``min_lat,min_lon,max_lat,max_lon`` query value."""
+    try:
+        values = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=BBOX_FORMAT)
+    if len(values) != 4:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=BBOX_FORMAT)
+    try:
+        return check_bbox(values)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Conditional GET support for list endpoints.
+
+List endpoints tag their responses with an ETag derived from store
+versions. Clients that send the tag back in ``If-None-Match`` receive an
+empty ``304 Not Modified`` instead of the full collection when nothing
+has changed since their last poll.
+"""
+
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+def _matches(header: str, etag: str) -> bool:
+    """Compare an If-None-Match header against ``etag`` using weak comparison."""
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set ``etag`` on ``response`` and return a 304 response if the client already has it."""
+    response.headers["ETag"] = etag
+    header = request.headers.get("if-none-match")
+    if header and _matches(header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
\ No newline at end of file
@@ -5,14 +5,20 @@ This module defines helpers used across routers to enforce authentication
 and authorization. For the purposes of this demonstration the user store
 is kept in memory. In a production setting this would be backed by a
 database or directory service.
+
+Verified tokens are kept in a bounded LRU cache until their ``exp``
+passes, so a client presenting the same token on every request pays for
+signature verification only once.
 """
 
+import os
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, WebSocket, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
@@ -23,6 +29,9 @@ from .roles import Role, has_permission
 SECRET_KEY = "super-secret-key"  # In production, override via env var
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Minimum seconds between sweeps of expired tokens from a full cache
+TOKEN_CACHE_PURGE_INTERVAL = 60.0
 
 
 class TokenData(BaseModel):
@@ -80,26 +89,119 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def decode_access_token(token: str) -> TokenData:
-    """Decode a JWT and return TokenData or raise HTTPException."""
+def _verify_token(token: str) -> Tuple[TokenData, float]:
+    """Verify a JWT signature and claims, returning TokenData and its expiry."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")  # subject is the username
         role_str: str = payload.get("role")
         if username is None or role_str is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Malformed token")
-        return TokenData(username=username, role=Role(role_str))
+        return TokenData(username=username, role=Role(role_str)), float(payload.get("exp", float("inf")))
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
+class TokenCache:
+    """Bounded LRU cache of verified tokens, each kept only until its expiry.
+
+    Only tokens that passed verification are cached, so a miss always
+    falls back to the full check and a forged token is never remembered.
+    A full cache evicts from the least recently used end; expired entries
+    are swept out at most once per ``purge_interval`` seconds.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, purge_interval: float = TOKEN_CACHE_PURGE_INTERVAL) -> None:
+        self.max_size = max_size
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._entries: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, token: str) -> TokenData:
+        """Return the user for ``token``, verifying it only on a cache miss."""
+        entry = self._entries.get(token)
+        if entry is not None:
+            if entry[1] > time.time():
+                self.hits += 1
+                self._entries.move_to_end(token)
+                return entry[0]
+            self._entries.pop(token, None)
+            self.expired += 1
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+        self.misses += 1
+        data, exp = _verify_token(token)
+        if self.max_size > 0:
+            self._entries[token] = (data, exp)
+            if len(self._entries) > self.max_size:
+                now = time.time()
+                if now >= self._next_purge:
+                    self._next_purge = now + self.purge_interval
+                    self.purge_expired()
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        return data
+
+    def purge_expired(self) -> int:
+        """Drop every entry whose expiry has passed and return how many were dropped."""
+        now = time.time()
+        stale = [token for token, (_, exp) in self._entries.items() if exp <= now]
+        for token in stale:
+            self._entries.pop(token, None)
+        self.expired += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        self.purge_expired()
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+token_cache = TokenCache()
+
+
+def decode_access_token(token: str) -> TokenData:
+    """Decode a JWT and return TokenData or raise HTTPException."""
+    return token_cache.get(token)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
     """Return the current user from a JWT token."""
     return decode_access_token(token)
 
 
+async def websocket_user(websocket: WebSocket) -> Optional[TokenData]:
+    """Authenticate a WebSocket from its ``token`` query parameter.
+
+    Browsers cannot set headers on WebSocket handshakes, so the token is
+    passed in the URL. Returns None when the token is missing or invalid.
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        return None
+    try:
+        return decode_access_token(token)
+    except HTTPException:
+        return None
+
+
 def role_required(*required_roles: Role):  # type: ignore
     """Dependency to check that the current user has one of the required roles."""
     async def dependency(current_user: TokenData = Depends(get_current_user)):
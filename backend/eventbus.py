@@ -0,0 +1,292 @@
+"""
+Event bus connecting the workers of a deployment.
+
+The streaming manager and the entity stores publish through a bus so
+that several uvicorn workers, on one host or many, can serve the same
+picture. :class:`InProcessBus` is used for a single worker and simply
+calls local handlers. :class:`SocketBus` additionally forwards events,
+as newline-delimited JSON, to a :class:`BusBroker` that relays them to
+every other connected worker.
+
+Outgoing frames wait in a bounded outbox that a sender task drains into
+the connection, so neither a slow broker nor an outage can grow memory
+without limit; once ``EVENT_BUS_OUTBOX_FRAMES`` frames are waiting the
+oldest are dropped and counted.
+
+A worker that joins after others have started asks the broker for the
+current state when it first connects. The broker passes the request to
+one connected worker, which answers with a snapshot from its state
+provider (see :meth:`SocketBus.set_state_provider`). Events missed while
+a running worker is cut off from the broker are not fetched again.
+
+Set ``EVENT_BUS_URL`` to ``tcp://host:port`` or ``unix:///path`` to use
+the socket bus. A broker for local runs and tests can be started with::
+
+    python -m backend.eventbus tcp://127.0.0.1:7700
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], None]
+
+# Frames held for the broker before the oldest are dropped
+OUTBOX_MAX_FRAMES = int(os.getenv("EVENT_BUS_OUTBOX_FRAMES", "100000"))
+# Longest frame accepted; state snapshots for joining workers are single frames
+FRAME_LIMIT = 256 * 1024 * 1024
+# Bytes a worker may leave unread at the broker before it is disconnected
+PEER_BUFFER_MAX_BYTES = int(os.getenv("EVENT_BUS_PEER_BUFFER_BYTES", str(64 * 1024 * 1024)))
+# Control frames start with this key so the broker can spot them without parsing every frame
+_SYNC_PREFIX = b'{"sync":'
+
+
+def parse_bus_url(url: str) -> Tuple[str, Any]:
+    """Split a bus URL into ("tcp", (host, port)) or ("unix", path)."""
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    if url.startswith("unix://"):
+        return "unix", url[len("unix://"):]
+    raise ValueError(f"Unsupported event bus URL: {url}")
+
+
+class InProcessBus:
+    """Delivers events to handlers registered in this process only."""
+
+    distributed = False
+    dropped_frames = 0
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def outbox_frames(self) -> int:
+        """Return how many published frames are waiting to be sent to other workers."""
+        return 0
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, event: Any, deliver_locally: bool = True) -> None:
+        """Publish an event; local handlers run before this returns."""
+        if deliver_locally:
+            self._deliver(topic, event)
+
+    def _deliver(self, topic: str, event: Any) -> None:
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Event handler for %s failed", topic)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class SocketBus(InProcessBus):
+    """Publishes events to other workers through a :class:`BusBroker`."""
+
+    distributed = True
+
+    def __init__(self, url: str, reconnect_delay: float = 1.0, outbox_max_frames: int = OUTBOX_MAX_FRAMES) -> None:
+        super().__init__()
+        self.url = url
+        self.node_id = uuid.uuid4().hex
+        self.reconnect_delay = reconnect_delay
+        self.dropped_frames = 0
+        self._outbox: Deque[bytes] = deque(maxlen=outbox_max_frames)
+        self._outbox_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self._get_state: Optional[Callable[[], Any]] = None
+        self._apply_state: Optional[Callable[[Any], None]] = None
+        self._synced = False
+
+    def set_state_provider(self, get_state: Callable[[], Any], apply_state: Callable[[Any], None]) -> None:
+        """Share state with workers that join later and load it from a peer on first connect."""
+        self._get_state = get_state
+        self._apply_state = apply_state
+
+    def outbox_frames(self) -> int:
+        return len(self._outbox)
+
+    def publish(self, topic: str, event: Any, deliver_locally: bool = True) -> None:
+        super().publish(topic, event, deliver_locally)
+        self._send({"node": self.node_id, "topic": topic, "event": event})
+
+    def _send(self, frame: dict) -> None:
+        if len(self._outbox) == self._outbox.maxlen:
+            self.dropped_frames += 1
+            if self.dropped_frames == 1 or self.dropped_frames % 10000 == 0:
+                logger.warning("Event bus outbox full; %d frames dropped so far", self.dropped_frames)
+        self._outbox.append(json.dumps(frame).encode() + b"\n")
+        self._outbox_ready.set()
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        kind, address = parse_bus_url(self.url)
+        if kind == "tcp":
+            return await asyncio.open_connection(*address, limit=FRAME_LIMIT)
+        return await asyncio.open_unix_connection(address, limit=FRAME_LIMIT)
+
+    async def _write_outbox(self, writer: asyncio.StreamWriter) -> None:
+        """Move frames from the outbox to the connection, waiting whenever the broker falls behind."""
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            while self._outbox:
+                writer.write(self._outbox.popleft())
+                await writer.drain()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await self._open()
+            except OSError as exc:
+                logger.warning("Event bus broker unavailable at %s: %s", self.url, exc)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            if self._apply_state is not None and not self._synced:
+                # Ahead of any buffered events, so the broker learns who is asking
+                writer.write(json.dumps({"sync": "request", "node": self.node_id}).encode() + b"\n")
+            sender = asyncio.get_running_loop().create_task(self._write_outbox(writer))
+            self._outbox_ready.set()
+            self._connected.set()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    frame = json.loads(line)
+                    if "sync" in frame:
+                        self._handle_sync(frame)
+                    elif frame.get("node") != self.node_id:
+                        self._deliver(frame["topic"], frame["event"])
+            except (OSError, ValueError) as exc:
+                logger.warning("Event bus connection lost: %s", exc)
+            finally:
+                sender.cancel()
+                self._connected.clear()
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _handle_sync(self, frame: dict) -> None:
+        if frame["sync"] == "request":
+            if self._get_state is not None:
+                self._send({"sync": "state", "to": frame["node"], "state": self._get_state()})
+        elif frame["sync"] == "state" and not self._synced:
+            self._synced = True
+            # None when no other worker was connected to share its state
+            if frame["state"] is not None and self._apply_state is not None:
+                self._apply_state(frame["state"])
+                logger.info("Loaded state from a peer worker")
+
+    async def start(self, timeout: float = 5.0) -> None:
+        """Connect to the broker, waiting up to ``timeout`` seconds for the first connection."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Starting without event bus broker; events are buffered until it connects")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class BusBroker:
+    """Relays every frame received from one worker to all other workers."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Connected workers in the order they connected
+        self._peers: Dict[asyncio.StreamWriter, Optional[str]] = {}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._peers[writer] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(_SYNC_PREFIX):
+                    self._route_sync(writer, line)
+                    continue
+                for peer in list(self._peers):
+                    if peer is not writer and not peer.is_closing():
+                        self._write(peer, line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._peers.pop(writer, None)
+            writer.close()
+
+    def _route_sync(self, writer: asyncio.StreamWriter, line: bytes) -> None:
+        """Pass a state request to the longest-connected other worker, and its answer back."""
+        frame = json.loads(line)
+        if frame["sync"] == "request":
+            self._peers[writer] = frame["node"]
+            source = next((peer for peer in self._peers if peer is not writer and not peer.is_closing()), None)
+            if source is None:
+                writer.write(json.dumps({"sync": "state", "to": frame["node"], "state": None}).encode() + b"\n")
+            else:
+                self._write(source, line)
+        else:
+            for peer, node in list(self._peers.items()):
+                if node == frame["to"] and not peer.is_closing():
+                    self._write(peer, line)
+
+    def _write(self, peer: asyncio.StreamWriter, line: bytes) -> None:
+        if peer.transport.get_write_buffer_size() > PEER_BUFFER_MAX_BYTES:
+            # It reconnects and carries on; events it missed meanwhile are lost
+            logger.warning("Disconnecting a worker that stopped reading from the event bus")
+            peer.close()
+            return
+        peer.write(line)
+
+    async def start(self) -> None:
+        kind, address = parse_bus_url(self.url)
+        if kind == "tcp":
+            self._server = await asyncio.start_server(self._handle, *address, limit=FRAME_LIMIT)
+        else:
+            self._server = await asyncio.start_unix_server(self._handle, address, limit=FRAME_LIMIT)
+
+    async def stop(self) -> None:
+        for peer in list(self._peers):
+            peer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def create_bus(url: Optional[str] = None):
+    """Return a socket bus for ``url`` or an in-process bus when no URL is given."""
+    return SocketBus(url) if url else InProcessBus()
+
+
+bus = create_bus(os.getenv("EVENT_BUS_URL"))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    broker_url = sys.argv[1] if len(sys.argv) > 1 else "tcp://127.0.0.1:7700"
+    logger.info("Event bus broker listening on %s", broker_url)
+    asyncio.run(BusBroker(broker_url).serve_forever())
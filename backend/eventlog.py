@@ -0,0 +1,307 @@
+"""
+Durable append-only event log for the entity stores.
+
+Every write to a :class:`~backend.store.Store` is appended to a log of
+newline-delimited JSON records. A write that names its changed fields,
+such as a location fix, is logged as just those fields; others carry the
+whole entity. Listeners only encode the record and hand it to a
+background thread, which commits batches of records with a
+single ``fsync`` (group commit) so the event loop never waits on disk.
+The log is split into segments; once enough records have accumulated in
+closed segments they are folded, again off the event loop, into a
+compact snapshot holding the latest version of every entity, and the
+folded segments are deleted.
+
+On startup the latest snapshot is loaded and only the segments written
+after it are replayed. Set ``EVENT_LOG_DIR`` to enable the log.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .store import Store, stores
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR")
+# Roll over to a new segment once the current one exceeds this size
+SEGMENT_MAX_BYTES = int(os.getenv("EVENT_LOG_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+# Maximum time a record waits before its batch is committed
+COMMIT_INTERVAL = float(os.getenv("EVENT_LOG_COMMIT_INTERVAL", "0.05"))
+# Records in closed segments that trigger a new snapshot
+SNAPSHOT_EVERY = int(os.getenv("EVENT_LOG_SNAPSHOT_EVERY", "100000"))
+
+_SEGMENT_PREFIX = "segment-"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+def _seq_of(filename: str, prefix: str) -> int:
+    return int(filename[len(prefix):].split(".", 1)[0])
+
+
+def _snapshot_order(names: List[str]) -> List[str]:
+    """Geofences are restored first so patrol fence membership can be rebuilt."""
+    return sorted(names, key=lambda name: name != "geofences")
+
+
+class EventLog:
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = SEGMENT_MAX_BYTES,
+        commit_interval: float = COMMIT_INTERVAL,
+        snapshot_every: int = SNAPSHOT_EVERY,
+    ) -> None:
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._segment = None
+        self._segment_bytes = 0
+        self._since_snapshot = 0
+        self._stats: Dict[str, Any] = {
+            "records_written": 0,
+            "batches_committed": 0,
+            "bytes_written": 0,
+            "last_commit_seconds": 0.0,
+            "snapshots_written": 0,
+        }
+        self._started_at = time.monotonic()
+
+    # Recovery -------------------------------------------------------
+
+    def _files(self, prefix: str) -> List[str]:
+        return sorted(
+            (f for f in os.listdir(self.directory) if f.startswith(prefix)), key=lambda f: _seq_of(f, prefix)
+        )
+
+    def recover(self) -> Dict[str, Any]:
+        """Load the latest snapshot and replay later segments into the stores."""
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.perf_counter()
+        snapshot_seq, snapshot_entities = 0, 0
+        snapshots = self._files(_SNAPSHOT_PREFIX)
+        if snapshots:
+            with open(os.path.join(self.directory, snapshots[-1])) as fh:
+                snapshot = json.load(fh)
+            snapshot_seq = snapshot["seq"]
+            for name in _snapshot_order(list(snapshot["stores"])):
+                store = stores.get(name)
+                if store is None:
+                    continue
+                for key, value in snapshot["stores"][name]:
+                    store.apply_remote(key, value)
+                    snapshot_entities += 1
+                store.next_id = max(store.next_id, snapshot["next_ids"].get(name, 1))
+        loaded = time.perf_counter()
+        self.seq = snapshot_seq
+        replayed = 0
+        for filename in self._files(_SEGMENT_PREFIX):
+            for record in self._read_segment(filename, repair=True):
+                if record["n"] <= snapshot_seq:
+                    continue
+                store = stores.get(record["s"])
+                if store is not None:
+                    if "f" in record:
+                        store.apply_remote(record["k"], record["f"], partial=True)
+                    else:
+                        store.apply_remote(record["k"], record["v"])
+                    store.next_id = max(store.next_id, record["c"])
+                self.seq = record["n"]
+                replayed += 1
+        finished = time.perf_counter()
+        self._stats["recovery"] = {
+            "snapshot_seq": snapshot_seq,
+            "snapshot_entities": snapshot_entities,
+            "snapshot_load_seconds": round(loaded - started, 6),
+            "replayed_records": replayed,
+            "replay_seconds": round(finished - loaded, 6),
+            "total_seconds": round(finished - started, 6),
+        }
+        logger.info("Event log recovered: %s", self._stats["recovery"])
+        return self._stats["recovery"]
+
+    def _read_segment(self, filename: str, repair: bool = False):
+        """Yield the records of a segment, stopping at a torn final record.
+
+        With ``repair`` the torn tail is truncated so later appends stay readable.
+        """
+        path = os.path.join(self.directory, filename)
+        valid_bytes = 0
+        with open(path, "rb") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if record is None or not line.endswith(b"\n"):
+                    logger.warning("Ignoring incomplete record at end of %s", filename)
+                    break
+                valid_bytes += len(line)
+                yield record
+        if repair and valid_bytes < os.path.getsize(path):
+            os.truncate(path, valid_bytes)
+
+    # Writing --------------------------------------------------------
+
+    def attach(self) -> None:
+        """Start logging every store write and start the writer thread."""
+        for store in stores.values():
+            store.add_listener(self._listener(store))
+        self._open_segment()
+        self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+        self._writer.start()
+
+    def _listener(self, store: Store):
+        def listener(key: Hashable, value: Any, local: bool) -> None:
+            # Encode now: entities are mutated in place by later updates
+            data, partial = store.encoded_change(value)
+            with self._lock:
+                self.seq += 1
+                record = {"n": self.seq, "s": store.name, "k": key, "f" if partial else "v": data, "c": store.next_id}
+                self._pending.append(json.dumps(record))
+            self._wakeup.set()
+
+        return listener
+
+    def _open_segment(self) -> None:
+        path = os.path.join(self.directory, f"{_SEGMENT_PREFIX}{self.seq + 1:012d}.log")
+        self._segment = open(path, "a")
+        self._segment_bytes = self._segment.tell()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Let a batch accumulate before committing it
+            time.sleep(self.commit_interval)
+            self._wakeup.clear()
+            self._commit()
+            if self._stopping:
+                self._commit()
+                return
+
+    def _commit(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+            last_seq = self.seq
+        if not batch:
+            return
+        started = time.perf_counter()
+        data = "\n".join(batch) + "\n"
+        self._segment.write(data)
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self._segment_bytes += len(data)
+        stats = self._stats
+        stats["records_written"] += len(batch)
+        stats["batches_committed"] += 1
+        stats["bytes_written"] += len(data)
+        stats["last_commit_seconds"] = round(time.perf_counter() - started, 6)
+        self._since_snapshot += len(batch)
+        if self._segment_bytes >= self.segment_max_bytes:
+            self._segment.close()
+            # The next segment is named after the first sequence it will hold
+            path = os.path.join(self.directory, f"{_SEGMENT_PREFIX}{last_seq + 1:012d}.log")
+            self._segment = open(path, "a")
+            self._segment_bytes = 0
+            if self._since_snapshot >= self.snapshot_every:
+                self._since_snapshot = 0
+                self._start_compaction()
+
+    # Snapshots ------------------------------------------------------
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        current = os.path.basename(self._segment.name)
+        closed = [f for f in self._files(_SEGMENT_PREFIX) if f != current]
+        self._compactor = threading.Thread(
+            target=self.compact, args=(closed,), name="event-log-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def compact(self, segments: List[str]) -> None:
+        """Fold the latest snapshot and the given closed segments into a new snapshot."""
+        if not segments:
+            return
+        state: Dict[str, Dict[Hashable, Any]] = {}
+        next_ids: Dict[str, int] = {}
+        seq = 0
+        snapshots = self._files(_SNAPSHOT_PREFIX)
+        if snapshots:
+            with open(os.path.join(self.directory, snapshots[-1])) as fh:
+                snapshot = json.load(fh)
+            seq = snapshot["seq"]
+            next_ids.update(snapshot["next_ids"])
+            for name, entities in snapshot["stores"].items():
+                state[name] = {_hashable(key): (key, value) for key, value in entities}
+        for filename in segments:
+            for record in self._read_segment(filename):
+                if record["n"] <= seq:
+                    continue
+                entities = state.setdefault(record["s"], {})
+                key = _hashable(record["k"])
+                if "f" in record:
+                    if key in entities:
+                        entities[key] = (record["k"], {**entities[key][1], **record["f"]})
+                else:
+                    entities[key] = (record["k"], record["v"])
+                next_ids[record["s"]] = max(next_ids.get(record["s"], 1), record["c"])
+                seq = record["n"]
+        snapshot = {
+            "seq": seq,
+            "next_ids": next_ids,
+            "stores": {name: list(state[name].values()) for name in _snapshot_order(list(state))},
+        }
+        path = os.path.join(self.directory, f"{_SNAPSHOT_PREFIX}{seq:012d}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(snapshot, fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+        for filename in segments + snapshots:
+            if filename != os.path.basename(path):
+                os.remove(os.path.join(self.directory, filename))
+        self._stats["snapshots_written"] += 1
+        logger.info("Event log snapshot written at seq %d", seq)
+
+    # Lifecycle ------------------------------------------------------
+
+    def close(self) -> None:
+        """Commit outstanding records and stop the writer thread."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join()
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._segment is not None:
+            self._segment.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return recovery timings and sustained write throughput."""
+        elapsed = time.monotonic() - self._started_at
+        stats = dict(self._stats)
+        stats["pending_records"] = len(self._pending)
+        stats["records_per_second"] = round(stats["records_written"] / elapsed, 1) if elapsed else 0.0
+        return stats
+
+
+def _hashable(key: Any) -> Tuple[str, Any]:
+    # JSON keys are ints or strings; keep them distinct when used as dict keys
+    return (type(key).__name__, key)
+
+
+event_log: Optional[EventLog] = EventLog(EVENT_LOG_DIR) if EVENT_LOG_DIR else None
@@ -6,9 +6,20 @@ given GPS coordinate lies inside a polygonal geofence and whether it
 deviates significantly from a defined patrol route. These functions
 use basic algorithms suited to demonstration purposes; for production
 use a geospatial library (e.g. Shapely or GeoPandas) is recommended.
+
+Route adherence on the hot update path goes through :class:`RouteIndex`,
+which buckets route segments into a uniform grid once per patrol so a
+location fix only has to be compared with the handful of segments near
+it rather than the whole route. :func:`on_route_batch` checks many
+patrols against their own routes at once with NumPy.
 """
 
-from typing import List, Tuple
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .startup import lazy_import
+
+np = lazy_import("numpy")
 
 
 def point_in_polygon(point: Tuple[float, float], polygon: List[Tuple[float, float]]) -> bool:
@@ -30,22 +41,163 @@ def point_in_polygon(point: Tuple[float, float], polygon: List[Tuple[float, floa
     return inside
 
 
+def point_segment_distance(
+    point: Tuple[float, float], start: Tuple[float, float], end: Tuple[float, float]
+) -> float:
+    """Return the planar distance in degrees from a point to a line segment."""
+    px, py = point
+    ax, ay = start
+    bx, by = end
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0.0:
+        return math.hypot(px - ax, py - ay)
+    t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _route_segments(route: List[Tuple[float, float]]) -> List[Tuple[Tuple[float, float], Tuple[float, float]]]:
+    """Return consecutive route vertices as segments; a lone vertex is a zero-length segment."""
+    if len(route) == 1:
+        return [(route[0], route[0])]
+    return [(route[i], route[i + 1]) for i in range(len(route) - 1)]
+
+
 def is_on_route(
     point: Tuple[float, float], route: List[Tuple[float, float]], threshold: float = 0.0005
 ) -> bool:
-    """Return True if the point is within a threshold of any point on the route.
+    """Return True if the point is within a threshold of any segment of the route.
 
-    This simplistic implementation measures absolute differences on
-    latitude and longitude axes separately. A production system should
-    compute geodesic distances.
+    Distances are planar in degrees. A production system should compute
+    geodesic distances. This is a linear scan over the route and serves
+    as the reference implementation for :class:`RouteIndex`.
 
     Args:
         point: (lat, lon) tuple for current location.
         route: List of (lat, lon) tuples representing planned path.
         threshold: Acceptable deviation in degrees.
     """
-    px, py = point
-    for rx, ry in route:
-        if abs(px - rx) <= threshold and abs(py - ry) <= threshold:
+    for start, end in _route_segments(route):
+        if point_segment_distance(point, start, end) <= threshold:
             return True
-    return False
\ No newline at end of file
+    return False
+
+
+def on_route_batch(
+    points: Sequence[Tuple[float, float]],
+    routes: Sequence[List[Tuple[Tuple[float, float], Tuple[float, float]]]],
+    thresholds: Sequence[float],
+) -> "np.ndarray":
+    """Return whether each point lies within its threshold of its own route.
+
+    Every segment of every route is measured in one vectorised pass; the
+    result matches :func:`is_on_route` point by point.
+
+    Args:
+        points: (lat, lon) tuple for each patrol.
+        routes: Segments of each patrol's route, as held by :class:`RouteIndex`.
+        thresholds: Acceptable deviation in degrees for each patrol.
+    """
+    counts = np.fromiter((len(segments) for segments in routes), dtype=np.int64, count=len(routes))
+    result = np.zeros(len(routes), dtype=bool)
+    if not counts.any():
+        return result
+    px, py = np.repeat(np.asarray(points, dtype=float).reshape(-1, 2), counts, axis=0).T
+    ax, ay, bx, by = np.asarray([s for segments in routes for s in segments], dtype=float).reshape(-1, 4).T
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    t = np.where(length_sq == 0.0, 0.0, t)
+    distances = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+    # Routes without segments are never on track and own no rows
+    routed = counts > 0
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[routed]
+    result[routed] = np.minimum.reduceat(distances, starts) <= np.asarray(thresholds, dtype=float)[routed]
+    return result
+
+
+class RouteIndex:
+    """Grid index over the segments of a single patrol route.
+
+    Each segment is registered in every grid cell that lies within
+    ``threshold`` of it, so a query only needs to inspect the cell that
+    contains the fix. A cursor remembers the last matched segment and the
+    segments either side of it are checked first, which resolves most
+    updates from a patrol moving steadily along its route without
+    touching the grid at all.
+    """
+
+    def __init__(
+        self, route: List[Tuple[float, float]], threshold: float = 0.0005, window: int = 4
+    ) -> None:
+        self.route = route
+        self.threshold = threshold
+        self.window = window
+        self.cursor = 0
+        self.segments = _route_segments([tuple(p) for p in route])
+        lengths = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in self.segments]
+        mean_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.cell_size = max(2.0 * threshold, mean_length)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, length in enumerate(lengths):
+            self._insert(i, length)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _insert(self, index: int, length: float) -> None:
+        """Register a segment in every cell within ``threshold`` of it.
+
+        The segment is sampled at intervals of at most half a cell and each
+        sample claims the cells covering a box of radius ``threshold`` plus
+        half the sample spacing, which is enough to cover every point within
+        ``threshold`` of the segment.
+        """
+        (ax, ay), (bx, by) = self.segments[index]
+        steps = max(1, math.ceil(length / (self.cell_size / 2.0)))
+        radius = self.threshold + (length / steps) / 2.0
+        cells = set()
+        for s in range(steps + 1):
+            t = s / steps
+            x = ax + t * (bx - ax)
+            y = ay + t * (by - ay)
+            x0, y0 = self._cell(x - radius, y - radius)
+            x1, y1 = self._cell(x + radius, y + radius)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cells.add((cx, cy))
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(index)
+
+    def _distance(self, point: Tuple[float, float], index: int) -> float:
+        start, end = self.segments[index]
+        return point_segment_distance(point, start, end)
+
+    def nearest_segment(self, point: Tuple[float, float]) -> Optional[int]:
+        """Return the index of the closest segment within ``threshold``, or None."""
+        if not self.segments:
+            return None
+        # Fast path: segments around the last match.
+        lo = max(0, self.cursor - self.window)
+        hi = min(len(self.segments), self.cursor + self.window + 1)
+        for index in range(lo, hi):
+            if self._distance(point, index) <= self.threshold:
+                self.cursor = index
+                return index
+        best: Optional[int] = None
+        best_distance = self.threshold
+        for index in self._cells.get(self._cell(point[0], point[1]), ()):
+            distance = self._distance(point, index)
+            if distance <= best_distance:
+                best, best_distance = index, distance
+        if best is not None:
+            self.cursor = best
+        return best
+
+    def is_on_route(self, point: Tuple[float, float]) -> bool:
+        """Return True if the point is within ``threshold`` of the route."""
+        return self.nearest_segment(point) is not None
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Vectorised evaluation of location fixes against every stored geofence.
+
+The engine keeps all polygons packed into contiguous NumPy arrays: one
+row per edge, plus a bounding-box table with one row per fence. A fix is
+first tested against every bounding box in a single vectorised pass.
+
+Each fence is also rasterised once, when it is created, into a grid over
+its bounding box whose cells are marked fully inside, fully outside or
+boundary. Candidate fences whose grid cell is inside or outside are
+answered from the grid; only fences where the fix lands in a boundary
+cell have their edges ray cast, again in one pass. Results match
+:func:`backend.geofence.point_in_polygon`.
+
+The engine also remembers which fences each patrol was last inside so
+that callers can turn a fix into entry and exit events.
+
+:func:`containing_batch` answers the same question for many fixes at
+once, such as every patrol's position after a fence is redrawn. It works
+on a :class:`PackedFences` snapshot, which stays valid while fences
+change, so it can run in a worker thread.
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .startup import lazy_import
+
+np = lazy_import("numpy")
+
+
+OUTSIDE = 0
+INSIDE = 1
+BOUNDARY = 2
+
+# Cells along the longer side of a fence's bounding box
+DEFAULT_GRID_RESOLUTION = 64
+
+# Tolerance, in cell units, used when marking boundary cells so that
+# edges lying exactly on a grid line mark the cells on both sides
+_EPS = 1e-9
+
+
+class FenceRaster:
+    """Acceleration grid for a single polygon."""
+
+    def __init__(self, points: List[Tuple[float, float]], resolution: int) -> None:
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.edges = np.hstack([pts, np.roll(pts, -1, axis=0)])
+        self.bbox = (pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max())
+        width = self.bbox[2] - self.bbox[0]
+        height = self.bbox[3] - self.bbox[1]
+        longest = max(width, height)
+        if longest == 0.0:
+            self.nx = self.ny = 1
+        else:
+            self.nx = max(1, round(resolution * width / longest))
+            self.ny = max(1, round(resolution * height / longest))
+        # Zero-extent axes get a unit cell so index arithmetic stays finite
+        self.cell_w = width / self.nx or 1.0
+        self.cell_h = height / self.ny or 1.0
+        self.grid = self._classify(self._boundary_mask())
+
+    def _boundary_mask(self) -> "np.ndarray":
+        """Mark every cell that an edge passes through or touches."""
+        minx, miny = self.bbox[0], self.bbox[1]
+        mask = np.zeros((self.ny, self.nx), dtype=bool)
+        for x1, y1, x2, y2 in self.edges:
+            xa, xb = min(x1, x2), max(x1, x2)
+            c0 = max(0, math.floor((xa - minx) / self.cell_w - _EPS))
+            c1 = min(self.nx - 1, math.floor((xb - minx) / self.cell_w + _EPS))
+            for col in range(c0, c1 + 1):
+                if x1 == x2:
+                    ya, yb = min(y1, y2), max(y1, y2)
+                else:
+                    # Clip the edge to this column and take its y extent
+                    lo = max(xa, minx + col * self.cell_w)
+                    hi = min(xb, minx + (col + 1) * self.cell_w)
+                    slope = (y2 - y1) / (x2 - x1)
+                    ylo = y1 + (lo - x1) * slope
+                    yhi = y1 + (hi - x1) * slope
+                    ya, yb = min(ylo, yhi), max(ylo, yhi)
+                r0 = max(0, math.floor((ya - miny) / self.cell_h - _EPS))
+                r1 = min(self.ny - 1, math.floor((yb - miny) / self.cell_h + _EPS))
+                mask[r0:r1 + 1, col] = True
+        return mask
+
+    def _classify(self, boundary: "np.ndarray") -> "np.ndarray":
+        """Classify non-boundary cells by ray casting from their centres, one row at a time."""
+        minx, miny = self.bbox[0], self.bbox[1]
+        x1, y1, x2, y2 = self.edges.T
+        centres_x = minx + (np.arange(self.nx) + 0.5) * self.cell_w
+        grid = np.full((self.ny, self.nx), BOUNDARY, dtype=np.uint8)
+        for row in range(self.ny):
+            cy = miny + (row + 0.5) * self.cell_h
+            spans = (np.minimum(y1, y2) < cy) & (cy <= np.maximum(y1, y2))
+            xs = np.sort((cy - y1[spans]) * (x2[spans] - x1[spans]) / (y2[spans] - y1[spans]) + x1[spans])
+            # Crossings to the right of each centre; odd counts are inside
+            counts = xs.size - np.searchsorted(xs, centres_x, side="left")
+            states = np.where(counts % 2 == 1, INSIDE, OUTSIDE).astype(np.uint8)
+            grid[row] = np.where(boundary[row], BOUNDARY, states)
+        return grid
+
+    def stats(self) -> dict:
+        """Describe the grid and the memory it occupies."""
+        return {
+            "vertices": len(self.edges),
+            "grid": [self.nx, self.ny],
+            "inside_cells": int((self.grid == INSIDE).sum()),
+            "outside_cells": int((self.grid == OUTSIDE).sum()),
+            "boundary_cells": int((self.grid == BOUNDARY).sum()),
+            "grid_bytes": int(self.grid.nbytes),
+            "edge_bytes": int(self.edges.nbytes),
+        }
+
+
+class PackedFences(NamedTuple):
+    """Packed arrays of every fence at one moment; never modified in place."""
+
+    names: List[str]
+    bbox: "np.ndarray"
+    edges: "np.ndarray"
+    offsets: "np.ndarray"
+    grid: "np.ndarray"
+    grid_offsets: "np.ndarray"
+    grid_dims: "np.ndarray"
+    cell_dims: "np.ndarray"
+
+
+class GeofenceEngine:
+    def __init__(self, grid_resolution: int = DEFAULT_GRID_RESOLUTION) -> None:
+        self.grid_resolution = grid_resolution
+        self._rasters: Dict[str, FenceRaster] = {}
+        self._dirty = True
+        # Packed arrays; built by _pack on first use so NumPy loads only when needed
+        self._names: List[str] = []
+        # patrol id -> names of the fences the patrol was last seen inside
+        self.memberships: Dict[int, Set[str]] = {}
+
+    def set_fence(
+        self, name: str, points: List[Tuple[float, float]], resolution: Optional[int] = None
+    ) -> None:
+        """Add or replace a named fence, rasterising it immediately."""
+        # Degenerate polygons can never contain a point
+        if len(points) < 3:
+            self.remove_fence(name)
+            return
+        self._rasters[name] = FenceRaster(points, resolution or self.grid_resolution)
+        self._dirty = True
+
+    def remove_fence(self, name: str) -> None:
+        if self._rasters.pop(name, None) is not None:
+            self._dirty = True
+
+    def stats(self) -> Dict[str, dict]:
+        """Return per-fence grid statistics and memory footprint."""
+        return {name: raster.stats() for name, raster in self._rasters.items()}
+
+    def _pack(self) -> None:
+        """Rebuild the packed edge, bounding-box and grid arrays."""
+        rasters = list(self._rasters.values())
+        self._names = list(self._rasters)
+        self._bbox = np.asarray([r.bbox for r in rasters], dtype=float).reshape(-1, 4)
+        self._edges = np.vstack([r.edges for r in rasters]) if rasters else np.empty((0, 4))
+        self._offsets = np.concatenate(([0], np.cumsum([len(r.edges) for r in rasters]))).astype(np.int64)
+        grid_sizes = [r.grid.size for r in rasters]
+        self._grid = np.concatenate([r.grid.ravel() for r in rasters]) if rasters else np.empty(0, dtype=np.uint8)
+        self._grid_offsets = np.concatenate(([0], np.cumsum(grid_sizes)[:-1])).astype(np.int64)
+        self._grid_dims = np.asarray([(r.nx, r.ny) for r in rasters], dtype=np.int64).reshape(-1, 2)
+        self._cell_dims = np.asarray([(r.cell_w, r.cell_h) for r in rasters], dtype=float).reshape(-1, 2)
+        self._dirty = False
+
+    def packed(self) -> PackedFences:
+        """Return the current packed arrays for :func:`containing_batch`."""
+        if self._dirty:
+            self._pack()
+        return PackedFences(
+            self._names, self._bbox, self._edges, self._offsets,
+            self._grid, self._grid_offsets, self._grid_dims, self._cell_dims,
+        )
+
+    def _ray_cast(self, point: Tuple[float, float], fences: "np.ndarray") -> "np.ndarray":
+        """Return a mask over ``fences`` of those whose polygon contains the point."""
+        x, y = point
+        starts = self._offsets[fences]
+        ends = self._offsets[fences + 1]
+        edges = np.concatenate([self._edges[s:e] for s, e in zip(starts, ends)])
+        x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+        spans = (np.minimum(y1, y2) < y) & (y <= np.maximum(y1, y2)) & (x <= np.maximum(x1, x2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xinters = (y - y1) * (x2 - x1) / (y2 - y1) + x1
+        crossings = spans & ((x1 == x2) | (x <= xinters))
+        # Count crossings per fence; odd counts are inside
+        local_starts = np.concatenate(([0], np.cumsum(ends - starts)[:-1]))
+        counts = np.add.reduceat(crossings.astype(np.int64), local_starts)
+        return counts % 2 == 1
+
+    def containing(self, point: Tuple[float, float]) -> List[str]:
+        """Return the names of all fences that contain the point."""
+        if not self._rasters:
+            return []
+        if self._dirty:
+            self._pack()
+        if not self._names:
+            return []
+        x, y = point
+        bbox = self._bbox
+        candidates = np.flatnonzero(
+            (bbox[:, 0] <= x) & (x <= bbox[:, 2]) & (bbox[:, 1] <= y) & (y <= bbox[:, 3])
+        )
+        if candidates.size == 0:
+            return []
+        dims = self._grid_dims[candidates]
+        cells = self._cell_dims[candidates]
+        cols = np.clip(((x - bbox[candidates, 0]) / cells[:, 0]).astype(np.int64), 0, dims[:, 0] - 1)
+        rows = np.clip(((y - bbox[candidates, 1]) / cells[:, 1]).astype(np.int64), 0, dims[:, 1] - 1)
+        states = self._grid[self._grid_offsets[candidates] + rows * dims[:, 0] + cols]
+        inside = states == INSIDE
+        boundary = states == BOUNDARY
+        if boundary.any():
+            inside[boundary] = self._ray_cast(point, candidates[boundary])
+        return [self._names[i] for i in candidates[inside]]
+
+    def evaluate(self, patrol_id: int, point: Tuple[float, float]) -> Tuple[List[str], List[str]]:
+        """Update a patrol's fence membership and return (entered, exited) names."""
+        return self.update_membership(patrol_id, set(self.containing(point)))
+
+    def update_membership(self, patrol_id: int, current: Set[str]) -> Tuple[List[str], List[str]]:
+        """Record the fences a patrol is now inside and return (entered, exited) names."""
+        previous = self.memberships.get(patrol_id, set())
+        self.memberships[patrol_id] = current
+        return sorted(current - previous), sorted(previous - current)
+
+
+
+def _ray_cast_pairs(fences: PackedFences, x: "np.ndarray", y: "np.ndarray", fence: "np.ndarray") -> "np.ndarray":
+    """Ray cast each point against its paired fence, all pairs in one pass."""
+    starts = fences.offsets[fence]
+    counts = fences.offsets[fence + 1] - starts
+    local_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # One row per (pair, edge of the pair's fence)
+    pair = np.repeat(np.arange(fence.size), counts)
+    edge = np.arange(counts.sum()) - np.repeat(local_starts - starts, counts)
+    x1, y1, x2, y2 = fences.edges[edge].T
+    x, y = x[pair], y[pair]
+    spans = (np.minimum(y1, y2) < y) & (y <= np.maximum(y1, y2)) & (x <= np.maximum(x1, x2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xinters = (y - y1) * (x2 - x1) / (y2 - y1) + x1
+    crossings = spans & ((x1 == x2) | (x <= xinters))
+    return np.add.reduceat(crossings.astype(np.int64), local_starts) % 2 == 1
+
+
+def containing_batch(fences: PackedFences, points: "np.ndarray") -> "np.ndarray":
+    """Return a boolean matrix with one row per point and one column per fence."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    result = np.zeros((len(points), len(fences.names)), dtype=bool)
+    if not result.size:
+        return result
+    x, y = points[:, :1], points[:, 1:]
+    bbox = fences.bbox
+    point, fence = np.nonzero((bbox[:, 0] <= x) & (x <= bbox[:, 2]) & (bbox[:, 1] <= y) & (y <= bbox[:, 3]))
+    if point.size == 0:
+        return result
+    x, y = points[point, 0], points[point, 1]
+    dims = fences.grid_dims[fence]
+    cells = fences.cell_dims[fence]
+    cols = np.clip(((x - bbox[fence, 0]) / cells[:, 0]).astype(np.int64), 0, dims[:, 0] - 1)
+    rows = np.clip(((y - bbox[fence, 1]) / cells[:, 1]).astype(np.int64), 0, dims[:, 1] - 1)
+    states = fences.grid[fences.grid_offsets[fence] + rows * dims[:, 0] + cols]
+    inside = states == INSIDE
+    boundary = states == BOUNDARY
+    if boundary.any():
+        inside[boundary] = _ray_cast_pairs(fences, x[boundary], y[boundary], fence[boundary])
+    result[point[inside], fence[inside]] = True
+    return result
+
+
+geofence_engine = GeofenceEngine()
\ No newline at end of file
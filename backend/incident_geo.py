@@ -0,0 +1,219 @@
+"""
+Spatial grid index over incident locations.
+
+Incidents are bucketed into a uniform latitude/longitude grid. A radius
+or bounding-box query visits only the cells it overlaps, or only the
+occupied cells when that is fewer, and tests the incidents in those
+cells, so its cost follows the size of the area searched rather than the
+number of stored incidents. Cells lying wholly inside a query box are
+taken without testing each incident, which also lets heatmap counts be
+aggregated cell by cell with numpy.
+"""
+
+import math
+import os
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .models import Incident
+from .startup import lazy_import
+from .timeutils import to_epoch
+
+np = lazy_import("numpy")
+
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+Cell = Tuple[int, int]
+
+# Size in degrees of the index cells, about 1.1 km of latitude
+INCIDENT_GRID_DEG = float(os.getenv("INCIDENT_GRID_DEG", "0.01"))
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance in metres between two (lat, lon) points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def radius_bbox(center: Tuple[float, float], radius_m: float) -> BBox:
+    """Return a box that contains every point within ``radius_m`` of ``center``."""
+    dlat = radius_m / METERS_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(center[0]))
+    dlon = 180.0 if cos_lat < 1e-9 else min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, center[0] - dlat),
+        center[1] - dlon,
+        min(90.0, center[0] + dlat),
+        center[1] + dlon,
+    )
+
+
+class IncidentGeoIndex:
+    def __init__(self, cell_deg: float = INCIDENT_GRID_DEG) -> None:
+        self.cell_deg = cell_deg
+        self._cells: Dict[Cell, Set[int]] = {}
+        # incident id -> (lat, lon, dtg epoch, cell)
+        self._entries: Dict[int, Tuple[float, float, float, Cell]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, incident: Incident) -> None:
+        """Index a new incident or re-index a moved one."""
+        previous = self._entries.get(incident.id)
+        if previous is not None:
+            members = self._cells[previous[3]]
+            members.discard(incident.id)
+            if not members:
+                del self._cells[previous[3]]
+        lat, lon = incident.location
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, set()).add(incident.id)
+        self._entries[incident.id] = (lat, lon, to_epoch(incident.dtg), cell)
+
+    def _overlapping(self, bbox: BBox) -> List[Cell]:
+        """Return the occupied cells overlapping ``bbox``."""
+        x0, y0 = self._cell(bbox[0], bbox[1])
+        x1, y1 = self._cell(bbox[2], bbox[3])
+        cells = self._cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells):
+            return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in cells]
+        return [cell for cell in cells if x0 <= cell[0] <= x1 and y0 <= cell[1] <= y1]
+
+    def _cells_in(self, bbox: BBox) -> Iterator[Tuple[Cell, bool]]:
+        """Yield occupied cells overlapping ``bbox`` and whether each lies wholly inside it."""
+        d = self.cell_deg
+        for cell in self._overlapping(bbox):
+            inside = (
+                bbox[0] <= cell[0] * d and (cell[0] + 1) * d <= bbox[2]
+                and bbox[1] <= cell[1] * d and (cell[1] + 1) * d <= bbox[3]
+            )
+            yield cell, inside
+
+    def _in_window(self, dtg: float, start: Optional[float], end: Optional[float]) -> bool:
+        return (start is None or dtg >= start) and (end is None or dtg <= end)
+
+    def within(
+        self,
+        bbox: BBox,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """Return ids of incidents inside ``bbox`` (and the DTG window), in id order."""
+        entries = self._entries
+        result: List[int] = []
+        for cell, inside in self._cells_in(bbox):
+            for incident_id in self._cells[cell]:
+                lat, lon, dtg, _ = entries[incident_id]
+                if not inside and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+                    continue
+                if self._in_window(dtg, start, end):
+                    result.append(incident_id)
+        result.sort()
+        return result if limit is None else result[:limit]
+
+    def near(
+        self,
+        center: Tuple[float, float],
+        radius_m: float,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return ``(incident id, distance in metres)`` within ``radius_m`` of ``center``, nearest first."""
+        bbox = radius_bbox(center, radius_m)
+        boxes = [bbox]
+        # A box spanning every longitude (near a pole or for huge radii) is
+        # searched once; one crossing the antimeridian is searched as two
+        if bbox[3] - bbox[1] >= 360.0:
+            boxes = [(bbox[0], -180.0, bbox[2], 180.0)]
+        elif bbox[1] < -180.0:
+            boxes = [(bbox[0], -180.0, bbox[2], bbox[3]), (bbox[0], bbox[1] + 360.0, bbox[2], 180.0)]
+        elif bbox[3] > 180.0:
+            boxes = [(bbox[0], bbox[1], bbox[2], 180.0), (bbox[0], -180.0, bbox[2], bbox[3] - 360.0)]
+        entries = self._entries
+        result: List[Tuple[int, float]] = []
+        for box in boxes:
+            for cell, _ in self._cells_in(box):
+                for incident_id in self._cells[cell]:
+                    lat, lon, dtg, _ = entries[incident_id]
+                    if not self._in_window(dtg, start, end):
+                        continue
+                    distance = haversine_m(center, (lat, lon))
+                    if distance <= radius_m:
+                        result.append((incident_id, distance))
+        result.sort(key=lambda hit: (hit[1], hit[0]))
+        return result if limit is None else result[:limit]
+
+    def heatmap(
+        self,
+        bbox: BBox,
+        bin_deg: float,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Dict[Cell, int]:
+        """Count incidents inside ``bbox`` per ``bin_deg`` bin, keyed by bin row and column from the box corner.
+
+        Index cells that lie inside the box and inside a single bin are
+        counted whole when no DTG window is given.
+        """
+        counts: Dict[Cell, int] = {}
+        cells = self._overlapping(bbox)
+        if not cells:
+            return counts
+        d = self.cell_deg
+        # Points on the far edges belong to the last bin rather than a new one
+        last_row = max(1, math.ceil((bbox[2] - bbox[0]) / bin_deg)) - 1
+        last_col = max(1, math.ceil((bbox[3] - bbox[1]) / bin_deg)) - 1
+
+        grid = np.array(cells, dtype=np.int64).reshape(-1, 2)
+        south, west = grid[:, 0] * d, grid[:, 1] * d
+        # A cell is counted whole when it falls inside a single bin; cell and bin
+        # edges are compared with a small tolerance so cells sharing an edge
+        # with a bin are not lost to rounding.
+        eps = 1e-9
+        row = np.minimum(last_row, np.floor((south + d / 2 - bbox[0]) / bin_deg))
+        col = np.minimum(last_col, np.floor((west + d / 2 - bbox[1]) / bin_deg))
+        row_south = bbox[0] + row * bin_deg
+        col_west = bbox[1] + col * bin_deg
+        row_north = np.where(row == last_row, bbox[2], row_south + bin_deg)
+        col_east = np.where(col == last_col, bbox[3], col_west + bin_deg)
+        whole = (
+            (south >= bbox[0] - eps) & (south + d <= bbox[2] + eps)
+            & (west >= bbox[1] - eps) & (west + d <= bbox[3] + eps)
+            & (south >= row_south - eps) & (south + d <= row_north + eps)
+            & (west >= col_west - eps) & (west + d <= col_east + eps)
+        )
+        if start is not None or end is not None:
+            whole[:] = False
+
+        if whole.any():
+            sizes = np.fromiter((len(self._cells[cell]) for cell in cells), dtype=np.int64, count=len(cells))
+            bins = row[whole].astype(np.int64) * (last_col + 1) + col[whole].astype(np.int64)
+            unique, inverse = np.unique(bins, return_inverse=True)
+            for b, count in zip(unique.tolist(), np.bincount(inverse, weights=sizes[whole]).tolist()):
+                counts[divmod(b, last_col + 1)] = int(count)
+
+        entries = self._entries
+        for i in np.flatnonzero(~whole).tolist():
+            for incident_id in self._cells[cells[i]]:
+                lat, lon, dtg, _ = entries[incident_id]
+                if not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+                    continue
+                if self._in_window(dtg, start, end):
+                    key = (
+                        min(last_row, math.floor((lat - bbox[0]) / bin_deg)),
+                        min(last_col, math.floor((lon - bbox[1]) / bin_deg)),
+                    )
+                    counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+incident_geo_index = IncidentGeoIndex()
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Time-ordered index over incident reports.
+
+Incident ids are kept in lists sorted by ``(dtg, id)``: one over all
+incidents and one per camp and per reporter. Time-range lookups bisect
+into the relevant list, so filtering a window costs O(log n) plus the
+size of the result instead of a scan of the whole store. The same key
+doubles as a pagination cursor.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from .models import Incident
+from .timeutils import to_epoch
+
+Key = Tuple[float, int]  # (dtg as epoch seconds, incident id)
+
+
+def encode_cursor(key: Key) -> str:
+    return f"{key[0]!r}_{key[1]}"
+
+
+def decode_cursor(cursor: str) -> Key:
+    """Parse a cursor produced by :func:`encode_cursor`; raises ValueError if malformed."""
+    seconds, _, incident_id = cursor.partition("_")
+    return float(seconds), int(incident_id)
+
+
+class IncidentIndex:
+    def __init__(self) -> None:
+        self._all: List[Key] = []
+        self._by_camp: Dict[str, List[Key]] = {}
+        self._by_reporter: Dict[str, List[Key]] = {}
+        # incident id -> (key, camp, reporter) as currently indexed
+        self._entries: Dict[int, Tuple[Key, str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    @staticmethod
+    def _remove(keys: List[Key], key: Key) -> None:
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def add(self, incident: Incident) -> None:
+        """Index a new incident or re-index a modified one."""
+        previous = self._entries.get(incident.id)
+        if previous is not None:
+            key, camp, reporter = previous
+            self._remove(self._all, key)
+            self._remove(self._by_camp[camp], key)
+            self._remove(self._by_reporter[reporter], key)
+        key = (to_epoch(incident.dtg), incident.id)
+        # Reports mostly arrive in dtg order, so insort usually appends
+        insort(self._all, key)
+        insort(self._by_camp.setdefault(incident.camp, []), key)
+        insort(self._by_reporter.setdefault(incident.reporter, []), key)
+        self._entries[incident.id] = (key, incident.camp, incident.reporter)
+
+    def range(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        camp: Optional[str] = None,
+        reporter: Optional[str] = None,
+        after: Optional[Key] = None,
+        limit: Optional[int] = None,
+    ) -> List[Key]:
+        """Return keys with start <= dtg <= end in (dtg, id) order.
+
+        ``after`` resumes from a cursor and ``limit`` caps the result.
+        Filtering by both camp and reporter walks the smaller of the two
+        lists.
+        """
+        by_camp = self._by_camp.get(camp, []) if camp is not None else None
+        by_reporter = self._by_reporter.get(reporter, []) if reporter is not None else None
+        candidates = [keys for keys in (by_camp, by_reporter) if keys is not None]
+        keys = min(candidates, key=len) if candidates else self._all
+        lo = 0 if start is None else bisect_left(keys, (start, -1))
+        if after is not None:
+            lo = max(lo, bisect_right(keys, after))
+        hi = len(keys) if end is None else bisect_right(keys, (end, float("inf")))
+        if len(candidates) < 2:
+            return keys[lo:hi] if limit is None else keys[lo:min(hi, lo + limit)]
+        result: List[Key] = []
+        for i in range(lo, hi):
+            _, entry_camp, entry_reporter = self._entries[keys[i][1]]
+            if entry_camp == camp and entry_reporter == reporter:
+                result.append(keys[i])
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+
+incident_index = IncidentIndex()
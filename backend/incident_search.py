@@ -0,0 +1,196 @@
+"""
+Full-text search over incident reports.
+
+An inverted index maps every term found in an incident's ``subject``,
+``camp``, ``incident_in_brief`` and ``follow_up`` to the incidents that
+contain it, with a per-field weighted term frequency. It is maintained
+incrementally from the incident store, so searching never scans the
+reports themselves.
+
+Each indexed report gets a dense document number and posting lists are
+compact ``array`` columns of document numbers and weights, which numpy
+scores a whole list at a time. Queries are AND queries: every term must
+match, and matches are ranked with BM25. A term ending in ``*`` matches
+every indexed term with that prefix, found by bisecting a sorted
+vocabulary; the last term of a query is treated as a prefix on request
+so that search can run as the user types. Re-indexing a report retires
+its old document number rather than rewriting posting lists.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from .models import Incident
+from .startup import lazy_import
+from .timeutils import to_epoch
+
+np = lazy_import("numpy")
+
+
+# Weight of a term occurrence in each field
+FIELD_WEIGHTS = (("subject", 3.0), ("camp", 2.0), ("incident_in_brief", 1.0), ("follow_up", 1.0))
+# A prefix matching more terms than this is expanded to its most frequent ones
+MAX_PREFIX_TERMS = 128
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class IncidentSearchIndex:
+    def __init__(self) -> None:
+        # term -> (document numbers, weighted term frequencies)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Sorted vocabulary for prefix lookups
+        self._terms: List[str] = []
+        # Per document number: incident id, length, dtg epoch and whether it is current
+        self._ids = array("q")
+        self._lengths = array("d")
+        self._dtgs = array("d")
+        self._alive = array("b")
+        # incident id -> current document number
+        self._doc_of: Dict[int, int] = {}
+        self._total_length = 0.0
+        # numpy copies of the per-document columns and of posting lists, refreshed when they change
+        self._columns: Optional[Tuple["np.ndarray", "np.ndarray", "np.ndarray"]] = None
+        self._arrays: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    @staticmethod
+    def _weighted_terms(incident: Incident) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            value = getattr(incident, field)
+            if not value:
+                continue
+            for text in value if isinstance(value, list) else [value]:
+                for term in tokenize(text):
+                    terms[term] = terms.get(term, 0.0) + weight
+        return terms
+
+    def add(self, incident: Incident) -> None:
+        """Index a new incident or re-index a modified one."""
+        previous = self._doc_of.get(incident.id)
+        if previous is not None:
+            self._alive[previous] = 0
+            self._total_length -= self._lengths[previous]
+        terms = self._weighted_terms(incident)
+        length = sum(terms.values())
+        doc = len(self._ids)
+        self._ids.append(incident.id)
+        self._lengths.append(length)
+        self._dtgs.append(to_epoch(incident.dtg))
+        self._alive.append(1)
+        self._doc_of[incident.id] = doc
+        self._total_length += length
+        self._columns = None
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("q"), array("d"))
+                insort(self._terms, term)
+            postings[0].append(doc)
+            postings[1].append(frequency)
+
+    def expand(self, prefix: str) -> List[str]:
+        """Return the indexed terms starting with ``prefix``, most frequent first."""
+        lo = bisect_left(self._terms, prefix)
+        hi = bisect_left(self._terms, prefix + "\U0010ffff", lo)
+        terms = sorted(self._terms[lo:hi], key=lambda t: len(self._postings[t][0]), reverse=True)
+        return terms[:MAX_PREFIX_TERMS]
+
+    @staticmethod
+    def _parse(query: str, prefix_last: bool) -> List[Tuple[str, bool]]:
+        """Split a query into ``(term, is_prefix)`` clauses."""
+        words = query.lower().split()
+        clauses: List[Tuple[str, bool]] = []
+        for i, word in enumerate(words):
+            terms = tokenize(word)
+            prefix = word.endswith("*") or (prefix_last and i == len(words) - 1)
+            clauses.extend((term, prefix and j == len(terms) - 1) for j, term in enumerate(terms))
+        return clauses
+
+    def _get_columns(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Return the BM25 length normaliser, dtgs and liveness per document."""
+        if self._columns is None:
+            lengths = np.array(self._lengths, dtype=np.float64)
+            average = self._total_length / len(self._doc_of)
+            self._columns = (
+                K1 * (1 - B + B * lengths / average),
+                np.array(self._dtgs, dtype=np.float64),
+                np.array(self._alive, dtype=bool),
+            )
+        return self._columns
+
+    def _get_postings(self, term: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Return a term's posting list as numpy arrays; lists only grow, so length tells if a copy is stale."""
+        docs, frequencies = self._postings[term]
+        cached = self._arrays.get(term)
+        if cached is None or len(cached[0]) != len(docs):
+            cached = self._arrays[term] = (np.array(docs, dtype=np.int64), np.array(frequencies, dtype=np.float64))
+        return cached
+
+    def warm(self) -> None:
+        """Build the per-document columns ahead of the first search."""
+        if self._doc_of:
+            self._get_columns()
+
+    def search(
+        self,
+        query: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 50,
+        prefix_last: bool = True,
+    ) -> Tuple[int, List[Tuple[int, float]]]:
+        """Return the number of matches and the top ``limit`` as ``(incident id, score)``.
+
+        ``start`` and ``end`` bound the incident DTG in epoch seconds.
+        """
+        clauses = self._parse(query, prefix_last)
+        if not clauses or not self._doc_of:
+            return 0, []
+        norm, dtgs, alive = self._get_columns()
+        n = len(self._doc_of)
+        scores = np.zeros(len(norm))
+        matched = np.zeros(len(norm), dtype=np.int32)
+        for term, prefix in clauses:
+            terms = self.expand(term) if prefix else ([term] if term in self._postings else [])
+            if not terms:
+                return 0, []
+            # Best-scoring matching term per document for this clause
+            clause = np.zeros(len(norm))
+            for t in terms:
+                docs, frequencies = self._get_postings(t)
+                idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                weights = idf * frequencies * (K1 + 1) / (frequencies + norm[docs])
+                clause[docs] = np.maximum(clause[docs], weights)
+            scores += clause
+            matched += clause > 0
+        mask = (matched == len(clauses)) & alive
+        if start is not None:
+            mask &= dtgs >= start
+        if end is not None:
+            mask &= dtgs <= end
+        docs = np.flatnonzero(mask)
+        if limit < len(docs):
+            # Keep everything above the cut-off score, then fill up with ties in index order
+            candidate_scores = scores[docs]
+            cutoff = np.partition(candidate_scores, len(docs) - limit)[len(docs) - limit]
+            above = docs[candidate_scores > cutoff]
+            ties = docs[candidate_scores == cutoff]
+            docs = np.concatenate([above, ties[:limit - len(above)]])
+        ranked = sorted(((self._ids[d], float(scores[d])) for d in docs), key=lambda hit: (-hit[1], hit[0]))
+        return int(mask.sum()), ranked
+
+
+incident_search = IncidentSearchIndex()
\ No newline at end of file
@@ -3,13 +3,35 @@ Entry point for the Patrol Tracker True Enterprise backend.
 
 This module initialises the FastAPI application, configures CORS and
 mounts all routers. To run locally, execute ``uvicorn main:app`` from
-within the backend directory.
+within the backend directory. To run several workers, start an event bus
+broker (``python -m backend.eventbus``) and point every worker at it with
+``EVENT_BUS_URL``, giving each a distinct ``NODE_INDEX`` out of
+``NODE_COUNT``. Set ``EVENT_LOG_DIR`` to persist state across restarts.
+Metrics for Prometheus are served at ``/metrics``.
+
+``/health`` answers as soon as the worker is up; ``/ready`` answers 503
+until warm-up has finished and then reports how long each import,
+startup step and warm-up step took (see :mod:`backend.startup`).
 """
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+from typing import Optional
+
+from .startup import STARTUP_WARMUP, startup_report
+
+with startup_report.step("import", "fastapi"):
+    from fastapi import FastAPI, Response
+    from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import users, patrols, incidents, reports, geofence, streaming
+with startup_report.step("import", "backend core"):
+    from .eventbus import bus
+    from .eventlog import event_log
+    from .metrics import MetricsMiddleware, start_event_loop_monitor, stop_event_loop_monitor
+    from .report_jobs import report_jobs
+    from .store import enable_replication
+
+ROUTERS = ("users", "patrols", "incidents", "geofence", "reports", "streaming", "changes", "metrics")
+routers = {name: startup_report.import_module(f".routers.{name}", __package__) for name in ROUTERS}
 
 
 app = FastAPI(title="Patrol Tracker V3 True Enterprise Edition")
@@ -23,18 +45,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paging and conditional GET headers read by browser clients
+    expose_headers=["X-Next-Cursor", "ETag", "X-Total-Count"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
-app.include_router(users.router)
-app.include_router(patrols.router)
-app.include_router(incidents.router)
-app.include_router(geofence.router)
-app.include_router(reports.router)
-app.include_router(streaming.router)
+for module in routers.values():
+    app.include_router(module.router)
+
+_warmup_task: Optional["asyncio.Task"] = None
+
+
+@app.on_event("startup")
+async def start_storage_and_bus() -> None:
+    """Recover persisted state, connect to the event bus, then warm up in the background."""
+    global _warmup_task
+    if event_log is not None:
+        with startup_report.step("startup", "event log recovery"):
+            event_log.recover()
+            event_log.attach()
+    if bus.distributed:
+        enable_replication(bus)
+    with startup_report.step("startup", "event bus"):
+        await bus.start()
+    start_event_loop_monitor()
+    if STARTUP_WARMUP:
+        _warmup_task = asyncio.get_running_loop().create_task(startup_report.warm_up())
+    else:
+        startup_report.mark_ready()
+
+
+@app.on_event("shutdown")
+async def stop_storage_and_bus() -> None:
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+    stop_event_loop_monitor()
+    await bus.stop()
+    if event_log is not None:
+        event_log.close()
+    report_jobs.shutdown()
 
 
 @app.get("/health")
 def read_health() -> dict:
-    """Simple health check endpoint."""
-    return {"status": "ok"}
\ No newline at end of file
+    """Simple health check endpoint, with event log statistics when persistence is enabled."""
+    health = {"status": "ok"}
+    if event_log is not None:
+        health["storage"] = event_log.stats()
+    return health
+
+
+@app.get("/ready")
+def read_ready(response: Response) -> dict:
+    """Readiness check: 503 until warm-up has finished, with the startup timing report."""
+    if not startup_report.ready:
+        response.status_code = 503
+    return startup_report.describe()
\ No newline at end of file
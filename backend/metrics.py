@@ -0,0 +1,263 @@
+"""
+Lightweight metrics in the Prometheus text exposition format.
+
+Hot paths record into plain in-process counters and fixed-bucket
+histograms; an observation is a bisect and two additions, cheap enough
+to leave on under full load. Values that already exist elsewhere, such
+as store sizes or WebSocket queue depths, are registered as gauges with
+a callback and read only when ``/metrics`` is scraped; counts kept by
+other objects, such as cache hits, are counters with a callback.
+
+The module has no dependencies on the rest of the backend, so any module
+can import it to record observations.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+RENDER_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+EVENT_LOOP_LAG_INTERVAL = 0.5
+
+Labels = Tuple[str, ...]
+GaugeValue = Union[float, Iterable[Tuple[Labels, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram:
+    """A histogram with fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, _HistogramChild] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(child.sum)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {child.count}"
+
+
+class Counter:
+    """A monotonically increasing count.
+
+    With ``callback`` the count is kept elsewhere and read at scrape time
+    instead of being incremented here.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+    def samples(self) -> Iterator[str]:
+        value = self.callback() if self.callback is not None else self.value
+        yield f"{self.name} {_format_value(value)}"
+
+
+class Gauge:
+    """A value read from ``callback`` at scrape time.
+
+    The callback returns a number, or for labelled gauges an iterable of
+    ``(label_values, number)`` pairs.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], GaugeValue], labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[str]:
+        value = self.callback()
+        pairs = value if self.labelnames else [((), value)]
+        for values, number in pairs:
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(number)}"
+
+
+class Registry:
+    """Holds every metric and renders them for a scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Union[Histogram, Counter, Gauge]] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS, labelnames: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def counter(self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None) -> Counter:
+        return self.register(Counter(name, documentation, callback))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], GaugeValue], labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    labelnames=("method", "route", "status"),
+)
+route_check_latency = registry.histogram(
+    "route_check_duration_seconds", "Time spent checking a fix against its patrol route.", FAST_BUCKETS,
+)
+geofence_check_latency = registry.histogram(
+    "geofence_check_duration_seconds", "Time spent evaluating a fix against all geofences.", FAST_BUCKETS,
+)
+broadcast_fanout_latency = registry.histogram(
+    "broadcast_fanout_duration_seconds", "Time spent routing and queueing one published event to local clients.", FAST_BUCKETS,
+)
+broadcast_frames = registry.counter("broadcast_frames_total", "Frames queued for WebSocket clients.")
+report_render_latency = registry.histogram(
+    "report_render_duration_seconds", "Commander brief render time in the worker process.", RENDER_BUCKETS,
+    labelnames=("outcome",),
+)
+fleet_reevaluation_latency = registry.histogram(
+    "fleet_reevaluation_duration_seconds", "Time spent re-checking every patrol after a geofence change.",
+)
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled every half second.",
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request.
+
+    Requests are labelled with the matched route template rather than the
+    raw path so ids in URLs do not create unbounded label sets.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            request_latency.labels(scope["method"], template, str(status)).observe(time.perf_counter() - started)
+
+
+async def monitor_event_loop(interval: float = EVENT_LOOP_LAG_INTERVAL) -> None:
+    """Record how late the loop wakes from a fixed sleep, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+_lag_task: Optional["asyncio.Task"] = None
+
+
+def start_event_loop_monitor() -> None:
+    global _lag_task
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.get_running_loop().create_task(monitor_event_loop())
+
+
+def stop_event_loop_monitor() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
\ No newline at end of file
@@ -45,12 +45,54 @@ class Patrol(PatrolBase):
         orm_mode = True
 
 
+class PatrolRouteUpdate(BaseModel):
+    route_name: Optional[str] = None
+    route: List[Tuple[float, float]]
+
+
 class PatrolUpdate(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class PatrolBulkUpdate(PatrolUpdate):
+    patrol_id: int
+
+
+class BulkUpdateResult(BaseModel):
+    index: int
+    patrol_id: Optional[int] = None
+    status: str
+    detail: Optional[str] = None
+    on_track: Optional[bool] = None
+
+
+class PatrolCluster(BaseModel):
+    # Mean position of the patrols in the cluster
+    lat: float
+    lon: float
+    count: int
+    off_track: int
+
+
+class PatrolMap(BaseModel):
+    zoom: int
+    bbox: Tuple[float, float, float, float]
+    total: int = Field(..., description="Patrols inside the viewport")
+    off_track: int
+    clusters: List[PatrolCluster] = Field(default_factory=list)
+    patrols: List[Patrol] = Field(default_factory=list, description="Patrols shown individually")
+
+
+class PatrolTrack(BaseModel):
+    patrol_id: int
+    # Fixes in the requested window before simplification
+    fixes: int
+    timestamps: List[datetime] = Field(default_factory=list)
+    points: List[Tuple[float, float]] = Field(default_factory=list)
+
+
 class IncidentReport(BaseModel):
     camp: str
     dtg: datetime
@@ -68,11 +110,71 @@ class Incident(IncidentReport):
 class Geofence(BaseModel):
     name: str
     points: List[Tuple[float, float]]
+    # Acceleration grid cells along the longer side; None uses the engine default
+    grid_resolution: Optional[int] = Field(None, ge=1, le=1024)
     # Optionally define a bounding box for quick checks
     class Config:
         orm_mode = True
 
 
+class SubscriptionRequest(BaseModel):
+    """Client message on ``/ws`` that adds or removes stream filters."""
+
+    action: str = Field(..., description="subscribe or unsubscribe")
+    patrol_ids: List[int] = Field(default_factory=list)
+    units: List[str] = Field(default_factory=list)
+    # (min_lat, min_lon, max_lat, max_lon)
+    bboxes: List[Tuple[float, float, float, float]] = Field(default_factory=list)
+    all: bool = False
+
+
+class ReportJobStatus(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, done, failed or expired")
+    start: datetime
+    end: datetime
+    created: datetime
+    finished: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class IncidentSearchHit(BaseModel):
+    score: float
+    incident: Incident
+
+
+class IncidentSearchResult(BaseModel):
+    total: int = Field(..., description="Number of matching incidents, of which the best are returned")
+    hits: List[IncidentSearchHit]
+
+
+class IncidentNearHit(BaseModel):
+    distance_m: float
+    incident: Incident
+
+
+class HeatmapBin(BaseModel):
+    # South-west corner of the bin
+    lat: float
+    lon: float
+    count: int
+
+
+class IncidentHeatmap(BaseModel):
+    bbox: Tuple[float, float, float, float]
+    cell_deg: float
+    total: int
+    bins: List[HeatmapBin] = Field(..., description="Non-empty bins only")
+
+
+class ChangeFeed(BaseModel):
+    version: str = Field(..., description="Pass as ``since`` on the next poll")
+    reset: bool = Field(False, description="True when ``since`` is unknown and the full state was sent")
+    patrols: List[Patrol] = Field(default_factory=list)
+    incidents: List[Incident] = Field(default_factory=list)
+    geofences: List[Geofence] = Field(default_factory=list)
+
+
 class PDFRequest(BaseModel):
     start_date: datetime
-    end_date: datetime
+    end_date: datetime
\ No newline at end of file
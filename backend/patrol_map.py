@@ -0,0 +1,220 @@
+"""
+Quadtree of current patrol positions for the clustered live map.
+
+The tree divides the globe into quadrants, splitting a node once it
+holds more than ``NODE_CAPACITY`` patrols. Every node keeps how many
+patrols lie below it, how many of those are off track and the sum of
+their positions, so a whole node can be reported as one cluster without
+visiting the patrols inside it. Node sizes halve with each level just as
+map tiles do with each zoom level, so a zoom level picks the depth at
+which nodes become clusters and a viewport query only walks the nodes
+on screen down to that depth. Its cost follows what is visible rather
+than the size of the fleet.
+
+Moving a patrol removes it along the path to its old position and
+inserts it along the path to the new one, one node per level.
+"""
+
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+Entry = Tuple[float, float, bool]  # (lat, lon, on_track)
+
+# Patrols a leaf holds before it is split into quadrants
+NODE_CAPACITY = 16
+# Deepest level, about 4 cm across; co-located patrols share a leaf there
+MAX_DEPTH = 30
+# From this zoom level on, individual patrols are returned instead of clusters
+CLUSTER_MAX_ZOOM = int(os.getenv("PATROL_CLUSTER_MAX_ZOOM", "15"))
+# Clusters are cells a quarter of a 256 px map tile wide, about 64 px on screen
+CLUSTER_DEPTH_OFFSET = 2
+
+
+class Cluster:
+    """Patrols grouped into one map marker."""
+
+    __slots__ = ("count", "off_track", "sum_lat", "sum_lon")
+
+    def __init__(self, count: int = 0, off_track: int = 0, sum_lat: float = 0.0, sum_lon: float = 0.0) -> None:
+        self.count = count
+        self.off_track = off_track
+        self.sum_lat = sum_lat
+        self.sum_lon = sum_lon
+
+    def add(self, entry: Entry) -> None:
+        self.count += 1
+        self.off_track += not entry[2]
+        self.sum_lat += entry[0]
+        self.sum_lon += entry[1]
+
+    def as_dict(self) -> dict:
+        return {
+            "lat": self.sum_lat / self.count,
+            "lon": self.sum_lon / self.count,
+            "count": self.count,
+            "off_track": self.off_track,
+        }
+
+
+class _Node:
+    __slots__ = ("south", "west", "north", "east", "depth", "totals", "children", "points")
+
+    def __init__(self, south: float, west: float, north: float, east: float, depth: int) -> None:
+        self.south, self.west, self.north, self.east = south, west, north, east
+        self.depth = depth
+        self.totals = Cluster()
+        self.children: Optional[List["_Node"]] = None
+        self.points: Dict[int, Entry] = {}
+
+    def child_for(self, lat: float, lon: float) -> "_Node":
+        mid_lat = (self.south + self.north) / 2
+        mid_lon = (self.west + self.east) / 2
+        return self.children[(lat >= mid_lat) * 2 + (lon >= mid_lon)]
+
+    def split(self) -> None:
+        mid_lat = (self.south + self.north) / 2
+        mid_lon = (self.west + self.east) / 2
+        depth = self.depth + 1
+        self.children = [
+            _Node(self.south, self.west, mid_lat, mid_lon, depth),
+            _Node(self.south, mid_lon, mid_lat, self.east, depth),
+            _Node(mid_lat, self.west, self.north, mid_lon, depth),
+            _Node(mid_lat, mid_lon, self.north, self.east, depth),
+        ]
+        points, self.points = self.points, {}
+        for patrol_id, entry in points.items():
+            child = self.child_for(entry[0], entry[1])
+            child.totals.add(entry)
+            child.points[patrol_id] = entry
+
+    def collect(self, into: Dict[int, Entry]) -> None:
+        if self.children is None:
+            into.update(self.points)
+        else:
+            for child in self.children:
+                child.collect(into)
+
+
+class PatrolQuadtree:
+    def __init__(self) -> None:
+        self._root = _Node(-90.0, -180.0, 90.0, 180.0, 0)
+        self._entries: Dict[int, Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, patrol_id: int, location: Optional[Tuple[float, float]], on_track: bool) -> None:
+        """Place a patrol at ``location``, or take it off the map when that is None."""
+        entry = None if location is None else (location[0], location[1], on_track)
+        previous = self._entries.get(patrol_id)
+        if previous == entry:
+            return
+        if previous is not None:
+            self._remove(patrol_id, previous)
+        if entry is not None:
+            self._insert(patrol_id, entry)
+
+    def _insert(self, patrol_id: int, entry: Entry) -> None:
+        self._entries[patrol_id] = entry
+        node = self._root
+        while True:
+            node.totals.add(entry)
+            if node.children is None:
+                break
+            node = node.child_for(entry[0], entry[1])
+        node.points[patrol_id] = entry
+        # Keep splitting while every point lands in the same quadrant
+        while node.children is None and len(node.points) > NODE_CAPACITY and node.depth < MAX_DEPTH:
+            node.split()
+            node = node.child_for(entry[0], entry[1])
+
+    def _remove(self, patrol_id: int, entry: Entry) -> None:
+        del self._entries[patrol_id]
+        node = self._root
+        while True:
+            totals = node.totals
+            totals.count -= 1
+            totals.off_track -= not entry[2]
+            totals.sum_lat -= entry[0]
+            totals.sum_lon -= entry[1]
+            if node.children is None:
+                del node.points[patrol_id]
+                return
+            if totals.count <= NODE_CAPACITY:
+                # Few enough left to fold the subtree back into one leaf
+                points: Dict[int, Entry] = {}
+                node.collect(points)
+                del points[patrol_id]
+                node.children = None
+                node.points = points
+                # Recompute so rounding from repeated moves does not build up
+                node.totals = Cluster()
+                for remaining in points.values():
+                    node.totals.add(remaining)
+                return
+            node = node.child_for(entry[0], entry[1])
+
+    def query(self, bbox: BBox, zoom: int) -> Tuple[List[Cluster], List[int], Cluster]:
+        """Return the clusters and individual patrol ids inside ``bbox`` at map ``zoom``.
+
+        Clusters holding a single patrol are returned as that patrol. The
+        third value tallies every patrol in the viewport.
+        """
+        depth = zoom + CLUSTER_DEPTH_OFFSET if zoom < CLUSTER_MAX_ZOOM else None
+        clusters: List[Cluster] = []
+        singles: List[int] = []
+        self._walk(self._root, bbox, depth, clusters, singles)
+        totals = Cluster()
+        for cluster in clusters:
+            totals.count += cluster.count
+            totals.off_track += cluster.off_track
+        for patrol_id in singles:
+            totals.add(self._entries[patrol_id])
+        return clusters, singles, totals
+
+    def _walk(self, node: _Node, bbox: BBox, depth: Optional[int], clusters: List[Cluster], singles: List[int]) -> None:
+        if node.totals.count == 0:
+            return
+        if node.north < bbox[0] or node.south > bbox[2] or node.east < bbox[1] or node.west > bbox[3]:
+            return
+        inside = bbox[0] <= node.south and node.north <= bbox[2] and bbox[1] <= node.west and node.east <= bbox[3]
+        if node.children is None or (depth is not None and node.depth >= depth):
+            if inside and depth is not None and node.depth >= depth and node.totals.count > 1:
+                clusters.append(Cluster(node.totals.count, node.totals.off_track, node.totals.sum_lat, node.totals.sum_lon))
+                return
+            points: Dict[int, Entry] = {}
+            node.collect(points)
+            visible = (
+                (patrol_id, entry) for patrol_id, entry in points.items()
+                if inside or (bbox[0] <= entry[0] <= bbox[2] and bbox[1] <= entry[1] <= bbox[3])
+            )
+            if depth is None:
+                singles.extend(patrol_id for patrol_id, _ in visible)
+            else:
+                self._group(visible, depth, clusters, singles)
+            return
+        for child in node.children:
+            self._walk(child, bbox, depth, clusters, singles)
+
+    @staticmethod
+    def _group(points: Iterable[Tuple[int, Entry]], depth: int, clusters: List[Cluster], singles: List[int]) -> None:
+        """Group loose points by the cluster cell at ``depth`` they fall in."""
+        lat_step = 180.0 / 2 ** depth
+        lon_step = 360.0 / 2 ** depth
+        cells: Dict[Tuple[int, int], List[Tuple[int, Entry]]] = {}
+        for patrol_id, entry in points:
+            key = (math.floor((entry[0] + 90.0) / lat_step), math.floor((entry[1] + 180.0) / lon_step))
+            cells.setdefault(key, []).append((patrol_id, entry))
+        for members in cells.values():
+            if len(members) == 1:
+                singles.append(members[0][0])
+                continue
+            cluster = Cluster()
+            for _, entry in members:
+                cluster.add(entry)
+            clusters.append(cluster)
+
+
+patrol_quadtree = PatrolQuadtree()
\ No newline at end of file
@@ -5,81 +5,257 @@ Using reportlab's high-level platypus API we construct a
 structured PDF summarising patrol activities and incident reports
 over a specified time window. This module is designed to be
 imported and invoked from the reports router.
+
+Two incident layouts are available. The detailed layout prints every
+incident as a block of paragraphs and suits short briefs. The table
+layout prints incidents as rows of chunked tables that split across
+pages, which costs a small, constant number of flowables per page and
+is used automatically for large briefs. A table row cannot split across
+pages, so an incident too long for one row continues on further rows. In both layouts styles are
+built once per process and the story is generated lazily while the
+document is laid out, so memory does not grow with one flowable per
+incident detail line.
 """
 
+import textwrap
 from datetime import datetime
-from typing import List
+from functools import lru_cache
+from typing import Callable, Iterator, List
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 from reportlab.lib import colors
 
 from .models import Incident, Patrol
 
 
-def generate_commander_brief(
-    file_path: str, start: datetime, end: datetime, incidents: List[Incident], patrols: List[Patrol]
-) -> None:
-    """Generate a PDF summarising incidents and patrol statuses.
+# Briefs with more incidents than this use the table layout
+DETAILED_LAYOUT_MAX_INCIDENTS = 200
+# Rows per table in the table layout; each table splits across pages as needed
+TABLE_CHUNK_ROWS = 200
+# Lines of text per incident table row, well under a page at the table's leading
+INCIDENT_ROW_MAX_LINES = 60
 
-    Args:
-        file_path: Path on disk where the PDF should be saved.
-        start: Start of the reporting period.
-        end: End of the reporting period.
-        incidents: List of incidents within the period.
-        patrols: List of patrols for status summary.
+_INCIDENT_HEADER = ["ID", "DTG", "Camp", "Subject", "Location", "Details", "Follow-up", "Reporter"]
+# Approximate characters per line for wrapped table cells
+_INCIDENT_WRAP = [None, None, 12, 18, None, 34, 16, 10]
+_INCIDENT_COL_WIDTHS = [28, 62, 52, 72, 58, 140, 66, 44]
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Return the paragraph styles, built once per process."""
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=None)
+def get_table_style() -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+
+
+@lru_cache(maxsize=None)
+def get_incident_table_style() -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('LEADING', (0, 0), (-1, -1), 8.5),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+
+
+class _LazyStory(list):
+    """A story list whose flowables are produced on demand during layout.
+
+    reportlab consumes the story from the front and only ever looks a few
+    flowables ahead, so generating them as they are reached keeps just a
+    page or so of flowables alive. ``count`` must equal the number of
+    flowables the generator yields, since the layout loop relies on
+    ``len``.
     """
-    doc = SimpleDocTemplate(file_path, pagesize=A4)
-    styles = getSampleStyleSheet()
-    Story = []
+
+    def __init__(self, count: int, flowables: Iterator[Flowable]) -> None:
+        super().__init__()
+        self._pending = count
+        self._flowables = flowables
+
+    def _fill(self, n: int) -> None:
+        while list.__len__(self) < n and self._pending:
+            list.append(self, next(self._flowables))
+            self._pending -= 1
+
+    def _fill_for(self, index) -> None:
+        if isinstance(index, slice):
+            self._fill(len(self) if index.stop is None else index.stop)
+        else:
+            self._fill(index + 1 if index >= 0 else len(self))
+
+    def __len__(self) -> int:
+        return list.__len__(self) + self._pending
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return list.__getitem__(self, index)
+
+    def __setitem__(self, index, value) -> None:
+        self._fill_for(index)
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index) -> None:
+        self._fill_for(index)
+        list.__delitem__(self, index)
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _patrol_row(p: Patrol) -> list:
+    return [
+        p.id,
+        p.unit,
+        p.route_name,
+        p.last_update.strftime('%Y-%m-%d %H:%M') if p.last_update else "N/A",
+        "Yes" if p.on_track else "No",
+    ]
+
+
+def _incident_rows(inc: Incident) -> List[list]:
+    """Return the table rows for an incident, continuing tall cells on further rows."""
+    cells = [
+        inc.id,
+        inc.dtg.strftime('%Y-%m-%d %H:%M'),
+        inc.camp,
+        inc.subject,
+        f"{inc.location[0]:.5f}\n{inc.location[1]:.5f}",
+        "\n".join(f"- {line}" for line in inc.incident_in_brief),
+        inc.follow_up or "",
+        inc.reporter,
+    ]
+    columns = []
+    for cell, width in zip(cells, _INCIDENT_WRAP):
+        if not isinstance(cell, str):
+            columns.append([cell])
+        else:
+            columns.append([
+                line for part in cell.split("\n") for line in ((textwrap.wrap(part, width) or [""]) if width else [part])
+            ])
+    return [
+        ["\n".join(str(line) for line in column[start:start + INCIDENT_ROW_MAX_LINES]) for column in columns]
+        for start in range(0, max(len(column) for column in columns), INCIDENT_ROW_MAX_LINES)
+    ]
+
+
+def _detailed_incident(inc: Incident) -> Iterator[Flowable]:
+    styles = get_styles()
+    yield Paragraph(f"<b>Incident ID:</b> {inc.id}", styles['Heading4'])
+    yield Paragraph(f"<b>Camp:</b> {inc.camp}", styles['Normal'])
+    yield Paragraph(f"<b>DTG:</b> {inc.dtg.strftime('%Y-%m-%d %H:%M')}", styles['Normal'])
+    yield Paragraph(f"<b>Subject:</b> {inc.subject}", styles['Normal'])
+    yield Paragraph(f"<b>Location:</b> {inc.location[0]}, {inc.location[1]}", styles['Normal'])
+    yield Paragraph("<b>Details:</b>", styles['Normal'])
+    for line in inc.incident_in_brief:
+        yield Paragraph(f" - {line}", styles['Normal'])
+    if inc.follow_up:
+        yield Paragraph(f"<b>Follow-up:</b> {inc.follow_up}", styles['Normal'])
+    yield Paragraph(f"<b>Reporter:</b> {inc.reporter}", styles['Normal'])
+    yield Spacer(1, 12)
+
+
+def _detailed_incident_count(inc: Incident) -> int:
+    return 8 + len(inc.incident_in_brief) + (1 if inc.follow_up else 0)
+
+
+def _build_story(
+    start: datetime, end: datetime, incidents: List[Incident], patrols: List[Patrol], table_layout: bool
+) -> _LazyStory:
+    styles = get_styles()
+    count = 0
+    sections: List[Callable[[], Iterator[Flowable]]] = []
+
+    def add(n: int, produce: Callable[[], Iterator[Flowable]]) -> None:
+        nonlocal count
+        count += n
+        sections.append(produce)
 
     # Title
     title_text = f"Commander Brief ({start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')})"
-    Story.append(Paragraph(title_text, styles['Title']))
-    Story.append(Spacer(1, 12))
+    add(2, lambda: iter([Paragraph(title_text, styles['Title']), Spacer(1, 12)]))
 
     # Section: Patrol Statuses
-    Story.append(Paragraph("Patrol Statuses", styles['Heading2']))
+    add(1, lambda: iter([Paragraph("Patrol Statuses", styles['Heading2'])]))
     if patrols:
-        data = [["ID", "Unit", "Route", "Last Update", "On Track"]]
-        for p in patrols:
-            data.append([
-                p.id,
-                p.unit,
-                p.route_name,
-                p.last_update.strftime('%Y-%m-%d %H:%M') if p.last_update else "N/A",
-                "Yes" if p.on_track else "No",
-            ])
-        table = Table(data, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ]))
-        Story.append(table)
+        header = ["ID", "Unit", "Route", "Last Update", "On Track"]
+        add(
+            len(range(0, len(patrols), TABLE_CHUNK_ROWS)),
+            lambda: (
+                Table([header] + [_patrol_row(p) for p in chunk], hAlign='LEFT', repeatRows=1, style=get_table_style())
+                for chunk in _chunks(patrols, TABLE_CHUNK_ROWS)
+            ),
+        )
     else:
-        Story.append(Paragraph("No patrols recorded in this period.", styles['Normal']))
-    Story.append(Spacer(1, 12))
+        add(1, lambda: iter([Paragraph("No patrols recorded in this period.", styles['Normal'])]))
+    add(1, lambda: iter([Spacer(1, 12)]))
 
     # Section: Incidents
-    Story.append(Paragraph("Incident Reports", styles['Heading2']))
-    if incidents:
-        for inc in incidents:
-            Story.append(Paragraph(f"<b>Incident ID:</b> {inc.id}", styles['Heading4']))
-            Story.append(Paragraph(f"<b>Camp:</b> {inc.camp}", styles['Normal']))
-            Story.append(Paragraph(f"<b>DTG:</b> {inc.dtg.strftime('%Y-%m-%d %H:%M')}", styles['Normal']))
-            Story.append(Paragraph(f"<b>Subject:</b> {inc.subject}", styles['Normal']))
-            Story.append(Paragraph(f"<b>Location:</b> {inc.location[0]}, {inc.location[1]}", styles['Normal']))
-            Story.append(Paragraph("<b>Details:</b>", styles['Normal']))
-            for line in inc.incident_in_brief:
-                Story.append(Paragraph(f" - {line}", styles['Normal']))
-            if inc.follow_up:
-                Story.append(Paragraph(f"<b>Follow-up:</b> {inc.follow_up}", styles['Normal']))
-            Story.append(Paragraph(f"<b>Reporter:</b> {inc.reporter}", styles['Normal']))
-            Story.append(Spacer(1, 12))
+    add(1, lambda: iter([Paragraph("Incident Reports", styles['Heading2'])]))
+    if not incidents:
+        add(1, lambda: iter([Paragraph("No incidents reported in this period.", styles['Normal'])]))
+    elif table_layout:
+        add(
+            len(range(0, len(incidents), TABLE_CHUNK_ROWS)),
+            lambda: (
+                Table(
+                    [_INCIDENT_HEADER] + [row for inc in chunk for row in _incident_rows(inc)],
+                    colWidths=_INCIDENT_COL_WIDTHS,
+                    hAlign='LEFT',
+                    repeatRows=1,
+                    style=get_incident_table_style(),
+                )
+                for chunk in _chunks(incidents, TABLE_CHUNK_ROWS)
+            ),
+        )
     else:
-        Story.append(Paragraph("No incidents reported in this period.", styles['Normal']))
+        add(
+            sum(_detailed_incident_count(inc) for inc in incidents),
+            lambda: (flowable for inc in incidents for flowable in _detailed_incident(inc)),
+        )
 
-    doc.build(Story)
\ No newline at end of file
+    return _LazyStory(count, (flowable for produce in sections for flowable in produce()))
+
+
+def generate_commander_brief(
+    file_path: str,
+    start: datetime,
+    end: datetime,
+    incidents: List[Incident],
+    patrols: List[Patrol],
+    layout: str = "auto",
+) -> None:
+    """Generate a PDF summarising incidents and patrol statuses.
+
+    Args:
+        file_path: Path on disk where the PDF should be saved.
+        start: Start of the reporting period.
+        end: End of the reporting period.
+        incidents: List of incidents within the period.
+        patrols: List of patrols for status summary.
+        layout: ``"detailed"``, ``"table"`` or ``"auto"``, which picks the
+            table layout above ``DETAILED_LAYOUT_MAX_INCIDENTS`` incidents.
+    """
+    if layout not in ("auto", "detailed", "table"):
+        raise ValueError(f"Unknown layout: {layout}")
+    table_layout = layout == "table" or (layout == "auto" and len(incidents) > DETAILED_LAYOUT_MAX_INCIDENTS)
+    doc = SimpleDocTemplate(file_path, pagesize=A4)
+    doc.build(_build_story(start, end, incidents, patrols, table_layout))
\ No newline at end of file
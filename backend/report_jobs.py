@@ -0,0 +1,216 @@
+"""
+Background rendering of commander briefs.
+
+Rendering a brief with reportlab is CPU bound, so briefs are rendered in
+a process pool rather than on the event loop. Each request becomes a
+:class:`ReportJob` that clients can poll and download once it is done.
+Finished PDFs are cached under a key made of the time window and the
+version of the data rendered into it, so repeated requests for the same
+window are answered from disk immediately. The cache is bounded; evicted
+files are deleted once no download is still reading them, and the whole
+directory is removed on shutdown.
+
+This module deliberately avoids importing reportlab or the routers so
+that pool workers start quickly.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .metrics import report_render_latency
+from .models import Incident, Patrol
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+# Number of rendered briefs kept on disk
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "32"))
+# Job records kept for status polling
+MAX_JOBS = 1024
+
+
+def _render(
+    path: str, start: datetime, end: datetime, incidents: List[Incident], patrols: List[Patrol]
+) -> Tuple[float, Optional[str]]:
+    """Render a brief inside a pool worker and return how long it took and the error, if any."""
+    from .pdf_report import generate_commander_brief
+
+    started = time.perf_counter()
+    try:
+        generate_commander_brief(path, start, end, incidents, patrols)
+    except Exception as exc:
+        return time.perf_counter() - started, str(exc)
+    return time.perf_counter() - started, None
+
+
+def _warm_worker() -> None:
+    """Load reportlab and build the shared styles inside a pool worker."""
+    from .pdf_report import get_incident_table_style, get_styles, get_table_style
+
+    get_styles()
+    get_table_style()
+    get_incident_table_style()
+
+
+def patrol_digest(patrols: List[Patrol]) -> str:
+    """Hash the patrol fields that appear in a brief, at the precision they are printed."""
+    digest = hashlib.sha1()
+    for p in patrols:
+        last_update = p.last_update.strftime("%Y-%m-%d %H:%M") if p.last_update else ""
+        digest.update(f"{p.id}|{p.unit}|{p.route_name}|{last_update}|{p.on_track}\n".encode())
+    return digest.hexdigest()
+
+
+class ReportJob:
+    def __init__(self, key: Hashable, start: datetime, end: datetime) -> None:
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.start = start
+        self.end = end
+        self.status = "queued"
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = datetime.utcnow()
+        self.finished: Optional[datetime] = None
+        self.done = asyncio.Event()
+        # Responses still sending the PDF; an evicted file is kept until they finish
+        self.readers = 0
+
+    @property
+    def filename(self) -> str:
+        return f"commander_brief_{self.start.date()}_{self.end.date()}.pdf"
+
+    def describe(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "start": self.start,
+            "end": self.end,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+
+class ReportJobManager:
+    def __init__(self, workers: int = REPORT_WORKERS, cache_size: int = REPORT_CACHE_SIZE) -> None:
+        self.workers = workers
+        self.cache_size = cache_size
+        self.jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._cache: "OrderedDict[Hashable, ReportJob]" = OrderedDict()
+        self._inflight: Dict[Hashable, ReportJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._directory: Optional[str] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawn rather than fork: the server process runs threads
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def warm_up(self) -> None:
+        """Start the pool workers loading reportlab, without waiting for them.
+
+        Briefs are rare next to location updates, so readiness does not
+        wait on the workers; a brief requested meanwhile queues behind them.
+        """
+        pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(_warm_worker)
+
+    def _output_dir(self) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="commander-briefs-")
+        return self._directory
+
+    def submit(
+        self,
+        start: datetime,
+        end: datetime,
+        data_version: Hashable,
+        incidents: List[Incident],
+        patrols: List[Patrol],
+    ) -> ReportJob:
+        """Return a cached or in-flight job for the same window and data, or start a new one."""
+        key = (start.isoformat(), end.isoformat(), data_version)
+        job = self._cache.get(key) or self._inflight.get(key)
+        if job is not None:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            return job
+        job = ReportJob(key, start, end)
+        self.jobs[job.id] = job
+        while len(self.jobs) > MAX_JOBS:
+            self.jobs.popitem(last=False)
+        self._inflight[key] = job
+        asyncio.get_running_loop().create_task(self._run(job, incidents, patrols))
+        return job
+
+    async def _run(self, job: ReportJob, incidents: List[Incident], patrols: List[Patrol]) -> None:
+        path = os.path.join(self._output_dir(), f"{job.id}.pdf")
+        job.status = "running"
+        try:
+            try:
+                elapsed, error = await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), _render, path, job.start, job.end, incidents, patrols
+                )
+            except Exception as exc:
+                # The pool itself failed, so nothing was rendered or timed
+                elapsed, error = None, str(exc)
+            if elapsed is not None:
+                # Timed inside the worker, leaving out time queued for the pool
+                report_render_latency.labels("failed" if error is not None else "done").observe(elapsed)
+            if error is not None:
+                job.status = "failed"
+                job.error = error
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            job.status = "done"
+            job.path = path
+            self._cache[job.key] = job
+            while len(self._cache) > self.cache_size:
+                _, evicted = self._cache.popitem(last=False)
+                evicted.status = "expired"
+                if not evicted.readers:
+                    self._remove_file(evicted)
+        finally:
+            self._inflight.pop(job.key, None)
+            job.finished = datetime.utcnow()
+            job.done.set()
+
+    def checkout(self, job: ReportJob) -> None:
+        """Keep a job's PDF on disk, even if evicted, until :meth:`release` is called."""
+        job.readers += 1
+
+    def release(self, job: ReportJob) -> None:
+        """End a :meth:`checkout`, deleting the PDF if it was evicted meanwhile."""
+        job.readers -= 1
+        if not job.readers and job.status == "expired":
+            self._remove_file(job)
+
+    def _remove_file(self, job: ReportJob) -> None:
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+        job.path = None
+
+    def shutdown(self) -> None:
+        """Stop the worker pool and delete every rendered brief."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._cache.clear()
+
+
+report_jobs = ReportJobManager()
\ No newline at end of file
@@ -6,29 +6,61 @@ geofences. Patrol location updates can be checked against these
 geofences to detect incursions or deviations.
 """
 
-from typing import Dict, List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
+from ..conditional import not_modified
 from ..dependencies import role_required
+from ..geofence_engine import geofence_engine
 from ..models import Geofence
 from ..roles import Role
+from ..serialization import EncodedStore
+from ..startup import startup_report
+from ..store import Store
 
 
 router = APIRouter(prefix="/geofences", tags=["geofences"])
 
 # In-memory geofence store
-geofence_db: Dict[str, Geofence] = {}
+geofence_db: Store = Store("geofences", Geofence)
+geofences_json = EncodedStore(geofence_db)
+
+
+def _index_geofence(name: str, geofence: Geofence, local: bool) -> None:
+    """Rasterise every stored or replicated geofence into the engine."""
+    geofence_engine.set_fence(name, geofence.points, geofence.grid_resolution)
+
+
+geofence_db.add_listener(_index_geofence)
+startup_report.add_warmup("geofence grids", geofence_engine.packed)
 
 
 @router.post("/create", response_model=Geofence, status_code=status.HTTP_201_CREATED)
-async def create_geofence(geofence: Geofence, user=Depends(role_required(Role.HQ_OPS))):
-    """Create or update a named geofence."""
-    geofence_db[geofence.name] = geofence
+async def create_geofence(
+    geofence: Geofence,
+    resolution: Optional[int] = Query(
+        None, ge=1, le=1024, description="Acceleration grid cells along the longer side"
+    ),
+    user=Depends(role_required(Role.HQ_OPS)),
+):
+    """Create or update a named geofence and precompute its acceleration grid."""
+    if resolution is not None:
+        geofence.grid_resolution = resolution
+    geofence_db.put(geofence.name, geofence)
     return geofence
 
 
 @router.get("/", response_model=List[Geofence])
-async def list_geofences(user=Depends(role_required(Role.PATROL_MEMBER))):
-    """List all configured geofences."""
-    return list(geofence_db.values())
\ No newline at end of file
+async def list_geofences(request: Request, response: Response, user=Depends(role_required(Role.PATROL_MEMBER))):
+    """List all configured geofences, or ``304 Not Modified`` when the ETag still matches."""
+    cached = not_modified(request, response, geofence_db.etag())
+    if cached is not None:
+        return cached
+    return geofences_json.response(headers=response.headers)
+
+
+@router.get("/stats")
+async def geofence_stats(user=Depends(role_required(Role.HQ_OPS))):
+    """Report acceleration grid statistics and memory footprint per geofence."""
+    return geofence_engine.stats()
\ No newline at end of file
@@ -5,23 +5,55 @@ This router allows patrol members to submit structured incident reports and
 higher roles to view them. The incident format follows a high-level
 Bangladesh Army style, storing details such as camp, DTG, subject and
 structured incident details. Reports are stored in-memory for this
-demonstration.
+demonstration. Every report is also indexed for keyword search and by
+location for proximity, bounding-box and heatmap queries.
 """
 
-from typing import Dict, List
+import math
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
+from ..bbox import parse_bbox
+from ..conditional import not_modified
 from ..dependencies import role_required, get_current_user
-from ..models import Incident, IncidentReport
+from ..incident_geo import incident_geo_index
+from ..incident_index import decode_cursor, encode_cursor, incident_index
+from ..incident_search import incident_search
+from ..models import (
+    HeatmapBin,
+    Incident,
+    IncidentHeatmap,
+    IncidentNearHit,
+    IncidentReport,
+    IncidentSearchHit,
+    IncidentSearchResult,
+)
 from ..roles import Role
+from ..serialization import EncodedStore
+from ..startup import startup_report
+from ..store import Store
+from ..timeutils import to_epoch
 
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
 # In-memory incident store
-incidents_db: Dict[int, Incident] = {}
-incident_id_counter = 1
+incidents_db: Store = Store("incidents", Incident)
+incidents_db.add_listener(lambda incident_id, incident, local: incident_index.add(incident))
+incidents_db.add_listener(lambda incident_id, incident, local: incident_search.add(incident))
+incidents_db.add_listener(lambda incident_id, incident, local: incident_geo_index.add(incident))
+incidents_json = EncodedStore(incidents_db)
+startup_report.add_warmup("incident search", incident_search.warm)
+
+# Page size bounds for GET /incidents/
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+MAX_SEARCH_RESULTS = 500
+# Bounds for spatial queries
+MAX_RADIUS_M = 500_000
+MAX_HEATMAP_BINS = 100_000
 
 
 @router.post("/report", response_model=Incident, status_code=status.HTTP_201_CREATED)
@@ -30,9 +62,7 @@ async def create_incident(
     current_user = Depends(role_required(Role.PATROL_MEMBER)),
 ):
     """Submit a new incident report. Members and above may report."""
-    global incident_id_counter
-    new_id = incident_id_counter
-    incident_id_counter += 1
+    new_id = incidents_db.allocate_id()
     incident = Incident(
         id=new_id,
         camp=incident_data.camp,
@@ -43,11 +73,123 @@ async def create_incident(
         follow_up=incident_data.follow_up,
         reporter=current_user.username,
     )
-    incidents_db[new_id] = incident
+    incidents_db.put(new_id, incident)
     return incident
 
 
 @router.get("/", response_model=List[Incident])
-async def list_incidents(current_user=Depends(role_required(Role.PATROL_MEMBER))):
-    """Return all incident reports."""
-    return list(incidents_db.values())
\ No newline at end of file
+async def list_incidents(
+    request: Request,
+    response: Response,
+    start: Optional[datetime] = Query(None, description="Earliest DTG (ISO8601)"),
+    end: Optional[datetime] = Query(None, description="Latest DTG (ISO8601)"),
+    camp: Optional[str] = None,
+    reporter: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Return incident reports in DTG order, one page at a time.
+
+    When more results remain the ``X-Next-Cursor`` response header holds
+    the cursor for the next page. Answers ``304 Not Modified`` when
+    ``If-None-Match`` holds the current ETag.
+    """
+    cached = not_modified(request, response, incidents_db.etag())
+    if cached is not None:
+        return cached
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    keys = incident_index.range(
+        start=None if start is None else to_epoch(start),
+        end=None if end is None else to_epoch(end),
+        camp=camp,
+        reporter=reporter,
+        after=after,
+        limit=limit + 1,
+    )
+    if len(keys) > limit:
+        keys = keys[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(keys[-1])
+    return incidents_json.response((incident_id for _, incident_id in keys), headers=response.headers)
+
+
+@router.get("/search", response_model=IncidentSearchResult)
+async def search_incidents(
+    q: str = Query(..., min_length=1, description="Keywords; all must match. End a word with * to match a prefix"),
+    start: Optional[datetime] = Query(None, description="Earliest DTG (ISO8601)"),
+    end: Optional[datetime] = Query(None, description="Latest DTG (ISO8601)"),
+    prefix: bool = Query(True, description="Treat the last keyword as a prefix, for search as you type"),
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_RESULTS),
+    current_user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Search subject, camp, details and follow-up of incident reports, best matches first."""
+    total, ranked = incident_search.search(
+        q,
+        start=None if start is None else to_epoch(start),
+        end=None if end is None else to_epoch(end),
+        limit=limit,
+        prefix_last=prefix,
+    )
+    return IncidentSearchResult(
+        total=total,
+        hits=[IncidentSearchHit(score=round(score, 4), incident=incidents_db[incident_id]) for incident_id, score in ranked],
+    )
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[float], Optional[float]]:
+    return (None if start is None else to_epoch(start)), (None if end is None else to_epoch(end))
+
+
+@router.get("/near", response_model=List[IncidentNearHit])
+async def incidents_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(..., gt=0, le=MAX_RADIUS_M),
+    start: Optional[datetime] = Query(None, description="Earliest DTG (ISO8601)"),
+    end: Optional[datetime] = Query(None, description="Latest DTG (ISO8601)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Return incidents within ``radius_m`` metres of a point, nearest first."""
+    hits = incident_geo_index.near((lat, lon), radius_m, *_window(start, end), limit=limit)
+    return [IncidentNearHit(distance_m=round(distance, 1), incident=incidents_db[i]) for i, distance in hits]
+
+
+@router.get("/within", response_model=List[Incident])
+async def incidents_within(
+    response: Response,
+    bbox: str = Query(..., description="min_lat,min_lon,max_lat,max_lon"),
+    start: Optional[datetime] = Query(None, description="Earliest DTG (ISO8601)"),
+    end: Optional[datetime] = Query(None, description="Latest DTG (ISO8601)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Return incidents inside a bounding box in id order; ``X-Total-Count`` holds the full match count."""
+    ids = incident_geo_index.within(parse_bbox(bbox), *_window(start, end))
+    response.headers["X-Total-Count"] = str(len(ids))
+    return incidents_json.response(ids[:limit], headers=response.headers)
+
+
+@router.get("/heatmap", response_model=IncidentHeatmap)
+async def incidents_heatmap(
+    bbox: str = Query(..., description="min_lat,min_lon,max_lat,max_lon"),
+    cell_deg: float = Query(0.05, gt=0, le=180, description="Bin size in degrees"),
+    start: Optional[datetime] = Query(None, description="Earliest DTG (ISO8601)"),
+    end: Optional[datetime] = Query(None, description="Latest DTG (ISO8601)"),
+    current_user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Count incidents per grid bin inside a bounding box, for heatmaps."""
+    box = parse_bbox(bbox)
+    rows = max(1, math.ceil((box[2] - box[0]) / cell_deg))
+    cols = max(1, math.ceil((box[3] - box[1]) / cell_deg))
+    if rows * cols > MAX_HEATMAP_BINS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Too many bins; increase cell_deg")
+    counts = incident_geo_index.heatmap(box, cell_deg, *_window(start, end))
+    bins = [
+        HeatmapBin(lat=box[0] + row * cell_deg, lon=box[1] + col * cell_deg, count=count)
+        for (row, col), count in sorted(counts.items())
+    ]
+    return IncidentHeatmap(bbox=box, cell_deg=cell_deg, total=sum(counts.values()), bins=bins)
\ No newline at end of file
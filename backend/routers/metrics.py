@@ -0,0 +1,53 @@
+"""
+Prometheus scrape endpoint.
+
+Serves everything in :data:`backend.metrics.registry` at ``/metrics``.
+This router also registers the gauges and counters that are read from
+live state at scrape time: WebSocket connections and send queue depths,
+store sizes, the event bus outbox, the verified-token cache and
+outstanding report jobs. Like ``/health`` the endpoint is
+unauthenticated so that scrapers need no credentials; restrict it at
+the network edge if that matters.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..dependencies import token_cache
+from ..eventbus import bus
+from ..metrics import registry
+from ..report_jobs import report_jobs
+from ..store import stores
+from .streaming import manager
+
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry.gauge("websocket_connections", "Open WebSocket connections on this worker.", lambda: len(manager.active_connections))
+registry.gauge("websocket_send_queue_frames", "Frames waiting in WebSocket send queues.", lambda: sum(manager.queue_depths()))
+registry.gauge(
+    "websocket_send_queue_max_frames", "Longest WebSocket send queue.", lambda: max(manager.queue_depths(), default=0)
+)
+registry.gauge(
+    "store_entities", "Entities held in each store.",
+    lambda: [((name,), len(store)) for name, store in stores.items()], labelnames=("store",),
+)
+registry.gauge(
+    "store_version", "Version of the most recent write to each store.",
+    lambda: [((name,), store.version) for name, store in stores.items()], labelnames=("store",),
+)
+registry.gauge("event_bus_outbox_frames", "Frames waiting to be sent to the event bus broker.", bus.outbox_frames)
+registry.counter(
+    "event_bus_dropped_frames_total", "Frames dropped because the event bus outbox was full.", lambda: bus.dropped_frames
+)
+registry.counter("token_cache_hits_total", "Verified-token cache hits.", lambda: token_cache.hits)
+registry.counter("token_cache_misses_total", "Verified-token cache misses.", lambda: token_cache.misses)
+registry.gauge("report_jobs_inflight", "Commander briefs queued or rendering.", lambda: len(report_jobs._inflight))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> PlainTextResponse:
+    """Return all metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
\ No newline at end of file
@@ -4,34 +4,234 @@ Patrol management routes.
 This router defines endpoints for creating patrols, updating their
 locations and retrieving a list of active patrols. Patrol data is
 kept in-memory for simplicity. Each update triggers a broadcast to
-connected WebSocket clients via the streaming manager.
+connected WebSocket clients via the streaming manager; bulk updates
+from field gateways are broadcast as a single batch frame. Current
+positions are also kept in a quadtree so the live map can fetch only
+the clusters and patrols inside its viewport.
+
+Routes can be revised in place. When a geofence is created or redrawn,
+every patrol's last position is re-checked against all routes and fences
+in one vectorised pass on a worker thread, and only patrols whose
+on-track status or fence membership changed are broadcast.
 """
 
+import asyncio
+import json
+import logging
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
 
+from ..bbox import parse_bbox
+from ..conditional import not_modified
 from ..dependencies import role_required
-from ..models import Patrol, PatrolCreate, PatrolUpdate
+from ..models import (
+    BulkUpdateResult,
+    Patrol,
+    PatrolBulkUpdate,
+    PatrolCreate,
+    PatrolMap,
+    PatrolRouteUpdate,
+    PatrolTrack,
+    PatrolUpdate,
+)
 from ..roles import Role
+from ..patrol_map import patrol_quadtree
+from ..serialization import EncodedStore, PreencodedJSONResponse, encode_json
+from ..startup import startup_report
 from .. import geofence
+from ..geofence_engine import PackedFences, containing_batch, geofence_engine
+from ..metrics import fleet_reevaluation_latency, geofence_check_latency, route_check_latency
+from ..store import Store
+from ..timeutils import to_epoch
+from ..tracks import track_store
+from .geofence import geofence_db
 from .streaming import manager  # WebSocket manager for broadcast
 
 
 router = APIRouter(prefix="/patrols", tags=["patrols"])
+logger = logging.getLogger(__name__)
 
 # In-memory store of patrols
-patrols_db: Dict[int, Patrol] = {}
-patrol_id_counter = 1
+patrols_db: Store = Store("patrols", Patrol)
+# Cached JSON of each patrol for list responses
+patrols_json = EncodedStore(patrols_db)
+
+# Fields a location fix changes; fixes are replicated and logged as just these
+FIX_FIELDS = ("current_location", "last_update", "on_track")
+
+# Route adherence indexes, built once per patrol route
+route_indexes: Dict[int, geofence.RouteIndex] = {}
+
+
+def _index_patrol(patrol_id: int, patrol: Patrol, local: bool) -> None:
+    """Keep derived per-patrol state in step with the store."""
+    index = route_indexes.get(patrol_id)
+    # Local writes keep the same route list, so the identity check is usually enough
+    if index is not None and index.route is not patrol.route and index.route != patrol.route:
+        if local:
+            # Local writers build their own index; this one predates the write
+            del route_indexes[patrol_id]
+        else:
+            # Rerouted by another worker; patrols not indexed here yet, such as
+            # those read back from the log, are built by warm-up or their next fix
+            route_indexes[patrol_id] = geofence.RouteIndex(patrol.route)
+    patrol_quadtree.update(patrol_id, patrol.current_location, patrol.on_track)
+    if patrol.current_location is not None and patrol.last_update is not None:
+        track_store.record(patrol_id, patrol.last_update, patrol.current_location)
+        if not local:
+            # Fixes handled by another worker still move geofence membership here
+            geofence_engine.evaluate(patrol_id, patrol.current_location)
+
+
+patrols_db.add_listener(_index_patrol)
+# Patrols sent to WebSocket clients when they connect
+manager.set_snapshot_source(lambda: patrols_db.version, patrols_json.array)
+
+
+def _warm_patrols() -> None:
+    """Build missing route indexes and encode every patrol for lists and snapshots."""
+    for patrol_id, patrol in patrols_db.items():
+        if patrol_id not in route_indexes:
+            route_indexes[patrol_id] = geofence.RouteIndex(patrol.route)
+    patrols_json.array()
+
+
+startup_report.add_warmup("patrol routes", _warm_patrols)
+
+
+def _location_message(patrol: Patrol) -> dict:
+    return {
+        "type": "location_update",
+        "patrol_id": patrol.id,
+        "unit": patrol.unit,
+        "location": patrol.current_location,
+        "timestamp": patrol.last_update.isoformat(),
+        "timestamp_ms": round(to_epoch(patrol.last_update) * 1000),
+        "on_track": patrol.on_track,
+    }
+
+
+def _geofence_messages(patrol: Patrol, entered: List[str], exited: List[str]) -> List[dict]:
+    messages = []
+    for event, names in (("enter", entered), ("exit", exited)):
+        for name in names:
+            messages.append({
+                "type": "geofence_event",
+                "event": event,
+                "geofence": name,
+                "patrol_id": patrol.id,
+                "unit": patrol.unit,
+                "location": patrol.current_location,
+                "timestamp": patrol.last_update.isoformat(),
+            })
+    return messages
+
+
+def _evaluate_fleet(
+    locations: List[Tuple[float, float]], indexes: List[geofence.RouteIndex], fences: PackedFences
+) -> Tuple[Any, Any]:
+    """Check every location against its patrol's route and every fence; runs off the event loop."""
+    on_track = geofence.on_route_batch(locations, [index.segments for index in indexes], [index.threshold for index in indexes])
+    return on_track, containing_batch(fences, locations)
+
+
+class FleetReevaluation:
+    """Re-checks every located patrol after the geofences change.
+
+    Requests made while a run is in progress are folded into one more
+    run. Inputs are snapshotted on the event loop and checked in a worker
+    thread; patrols that reported a fix or got a new route in the
+    meantime are skipped, as that fix was already checked against the
+    latest state.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def schedule(self) -> None:
+        """Request a run, starting one unless one is already in progress."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to run on; each patrol is checked again on its next fix
+            return
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            self._pending = False
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Fleet re-evaluation failed")
+
+    async def run(self) -> int:
+        """Re-check every located patrol now, broadcast the changes and return how many changed."""
+        started = time.perf_counter()
+        patrols = [patrol for patrol in patrols_db.values() if patrol.current_location is not None]
+        locations = [patrol.current_location for patrol in patrols]
+        indexes = []
+        for patrol in patrols:
+            index = route_indexes.get(patrol.id)
+            if index is None:
+                index = route_indexes[patrol.id] = geofence.RouteIndex(patrol.route)
+            indexes.append(index)
+        fences = geofence_engine.packed()
+        on_track, inside = await asyncio.get_running_loop().run_in_executor(
+            None, _evaluate_fleet, locations, indexes, fences
+        )
+        messages: List[dict] = []
+        changed = 0
+        for i, patrol in enumerate(patrols):
+            stale = (
+                patrols_db.get(patrol.id) is not patrol
+                or patrol.current_location is not locations[i]
+                or route_indexes.get(patrol.id) is not indexes[i]
+            )
+            if stale:
+                continue
+            entered, exited = geofence_engine.update_membership(
+                patrol.id, {fences.names[j] for j in inside[i].nonzero()[0]}
+            )
+            moved_off_route = bool(on_track[i]) != patrol.on_track
+            if not (moved_off_route or entered or exited):
+                continue
+            changed += 1
+            if moved_off_route:
+                patrol.on_track = bool(on_track[i])
+                messages.append(_location_message(patrol))
+            messages.extend(_geofence_messages(patrol, entered, exited))
+            patrols_db.put(patrol.id, patrol, fields=("on_track",))
+        if messages:
+            await manager.publish(messages, batch=True)
+        fleet_reevaluation_latency.observe(time.perf_counter() - started)
+        return changed
+
+
+fleet_reevaluation = FleetReevaluation()
+
+
+def _geofence_changed(name: str, geofence: Any, local: bool) -> None:
+    """Re-check the fleet when a geofence is created or redrawn on this worker."""
+    # Other workers learn of the resulting changes through the replicated patrols
+    if local:
+        fleet_reevaluation.schedule()
+
+
+geofence_db.add_listener(_geofence_changed)
 
 
 @router.post("/create", response_model=Patrol, status_code=status.HTTP_201_CREATED)
 async def create_patrol(patrol_data: PatrolCreate, user=Depends(role_required(Role.PATROL_COMD))):
     """Create a new patrol. Only command-level or higher may create."""
-    global patrol_id_counter
-    new_id = patrol_id_counter
-    patrol_id_counter += 1
+    new_id = patrols_db.allocate_id()
     patrol = Patrol(
         id=new_id,
         unit=patrol_data.unit,
@@ -41,15 +241,93 @@ async def create_patrol(patrol_data: PatrolCreate, user=Depends(role_required(Ro
         last_update=None,
         on_track=True,
     )
-    patrols_db[new_id] = patrol
+    route_indexes[new_id] = geofence.RouteIndex(patrol.route)
+    patrols_db.put(new_id, patrol)
     return patrol
 
 
 @router.get("/", response_model=List[Patrol])
-async def list_patrols(user=Depends(role_required(Role.PATROL_MEMBER))):
-    """Return all patrols visible to the user. Members may see their own; higher roles see all."""
+async def list_patrols(request: Request, response: Response, user=Depends(role_required(Role.PATROL_MEMBER))):
+    """Return all patrols visible to the user. Members may see their own; higher roles see all.
+
+    Answers ``304 Not Modified`` when ``If-None-Match`` holds the current ETag.
+    """
+    cached = not_modified(request, response, patrols_db.etag())
+    if cached is not None:
+        return cached
     # For simplicity, return all patrols
-    return list(patrols_db.values())
+    return patrols_json.response(headers=response.headers)
+
+
+@router.get("/map", response_model=PatrolMap)
+async def patrol_map(
+    request: Request,
+    response: Response,
+    bbox: str = Query(..., description="min_lat,min_lon,max_lat,max_lon"),
+    zoom: int = Query(..., ge=0, le=24, description="Web map zoom level"),
+    user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Return the patrols inside a map viewport, clustered to suit the zoom level.
+
+    Nearby patrols are merged into clusters with counts and off-track
+    tallies; patrols alone in their cluster cell, and every patrol once
+    zoomed in far enough, are returned individually.
+    """
+    cached = not_modified(request, response, patrols_db.etag())
+    if cached is not None:
+        return cached
+    box = parse_bbox(bbox)
+    clusters, patrol_ids, totals = patrol_quadtree.query(box, zoom)
+    # Assembled from cached patrol encodings; the layout matches PatrolMap
+    return PreencodedJSONResponse(b"".join([
+        b'{"zoom":%d,"bbox":' % zoom, encode_json(box),
+        b',"total":%d,"off_track":%d' % (totals.count, totals.off_track),
+        b',"clusters":', encode_json([cluster.as_dict() for cluster in clusters]),
+        b',"patrols":', patrols_json.array(patrol_ids),
+        b"}",
+    ]), headers=response.headers)
+
+
+@router.get("/tracks/stats")
+async def track_stats(user=Depends(role_required(Role.HQ_OPS))):
+    """Report the number of stored fixes and the memory they occupy."""
+    return track_store.stats()
+
+
+@router.get("/{patrol_id}/track", response_model=PatrolTrack)
+async def patrol_track(
+    patrol_id: int,
+    since: Optional[datetime] = Query(None, description="Start of window (ISO8601)"),
+    until: Optional[datetime] = Query(None, description="End of window (ISO8601)"),
+    tolerance: float = Query(0.0, ge=0.0, description="Simplification tolerance in degrees"),
+    user=Depends(role_required(Role.PATROL_MEMBER)),
+):
+    """Return the path a patrol walked, simplified with Douglas-Peucker."""
+    if patrol_id not in patrols_db:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patrol not found")
+    fixes, timestamps, points = track_store.query(patrol_id, since, until, tolerance)
+    return PatrolTrack(patrol_id=patrol_id, fixes=fixes, timestamps=timestamps, points=points)
+
+
+def _apply_update(patrol: Patrol, update: PatrolUpdate) -> List[dict]:
+    """Apply a location fix to a patrol and return the messages to broadcast."""
+    # Update location
+    patrol.current_location = (update.latitude, update.longitude)
+    patrol.last_update = update.timestamp
+    # Check if on track
+    index = route_indexes.get(patrol.id)
+    if index is None:
+        index = route_indexes[patrol.id] = geofence.RouteIndex(patrol.route)
+    started = time.perf_counter()
+    patrol.on_track = index.is_on_route(patrol.current_location)
+    route_check_latency.observe(time.perf_counter() - started)
+    messages = [_location_message(patrol)]
+    # Report geofence entries and exits for this fix
+    started = time.perf_counter()
+    entered, exited = geofence_engine.evaluate(patrol.id, patrol.current_location)
+    geofence_check_latency.observe(time.perf_counter() - started)
+    messages.extend(_geofence_messages(patrol, entered, exited))
+    return messages
 
 
 @router.post("/{patrol_id}/update", response_model=Patrol)
@@ -62,19 +340,128 @@ async def update_patrol(
     patrol = patrols_db.get(patrol_id)
     if not patrol:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patrol not found")
-    # Update location
-    patrol.current_location = (update.latitude, update.longitude)
-    patrol.last_update = update.timestamp
-    # Check if on track
-    patrol.on_track = geofence.is_on_route(patrol.current_location, patrol.route)
-    # Broadcast update to clients
-    message = {
-        "type": "location_update",
+    messages = _apply_update(patrol, update)
+    patrols_db.put(patrol.id, patrol, fields=FIX_FIELDS)
+    await manager.publish(messages)
+    return patrol
+
+
+@router.put("/{patrol_id}/route", response_model=Patrol)
+async def update_route(
+    patrol_id: int,
+    update: PatrolRouteUpdate,
+    user=Depends(role_required(Role.PATROL_COMD)),
+):
+    """Replace a patrol's planned route, re-check its adherence and broadcast the new route."""
+    patrol = patrols_db.get(patrol_id)
+    if not patrol:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patrol not found")
+    patrol.route = update.route
+    if update.route_name is not None:
+        patrol.route_name = update.route_name
+    index = route_indexes[patrol.id] = geofence.RouteIndex(patrol.route)
+    messages = [{
+        "type": "route_update",
         "patrol_id": patrol.id,
         "unit": patrol.unit,
+        "route_name": patrol.route_name,
+        "route": patrol.route,
         "location": patrol.current_location,
-        "timestamp": patrol.last_update.isoformat(),
-        "on_track": patrol.on_track,
-    }
-    await manager.broadcast(message)
-    return patrol
\ No newline at end of file
+    }]
+    if patrol.current_location is not None:
+        on_track = index.is_on_route(patrol.current_location)
+        if on_track != patrol.on_track:
+            patrol.on_track = on_track
+            messages.append(_location_message(patrol))
+    patrols_db.put(patrol.id, patrol)
+    await manager.publish(messages, batch=True)
+    return patrol
+
+
+async def _read_bulk_records(request: Request) -> AsyncIterator[Any]:
+    """Yield raw records from a JSON array body or a streamed NDJSON body."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _decode_line(line)
+        if buffer.strip():
+            yield _decode_line(buffer)
+        return
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of updates")
+    for record in body:
+        yield record
+
+
+class _InvalidLine:
+    """Stands in for an NDJSON line that is not valid JSON."""
+
+    def __init__(self, error: str) -> None:
+        self.error = error
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        # Surface as a per-record error rather than failing the whole batch
+        return _InvalidLine(f"Invalid JSON: {exc}")
+
+
+def _parse_bulk_record(record: Any) -> Tuple[Optional[PatrolBulkUpdate], Optional[str]]:
+    """Validate one bulk record, returning (update, None) or (None, error)."""
+    if isinstance(record, _InvalidLine):
+        return None, record.error
+    if not isinstance(record, dict):
+        return None, "Record is not a JSON object"
+    try:
+        return PatrolBulkUpdate(**record), None
+    except ValidationError as exc:
+        return None, str(exc)
+
+
+@router.post("/bulk-update", response_model=List[BulkUpdateResult])
+async def bulk_update_patrols(request: Request, user=Depends(role_required(Role.PATROL_MEMBER))):
+    """Apply many location fixes for many patrols in one request.
+
+    The body is either a JSON array of ``PatrolBulkUpdate`` records or,
+    with an ``application/x-ndjson`` content type, one record per line
+    streamed as it arrives. Each record is applied in order and gets its
+    own result; all resulting messages go out in a single batch frame in
+    which only the latest location update per patrol is kept.
+    """
+    results: List[BulkUpdateResult] = []
+    latest_locations: Dict[int, dict] = {}
+    events: List[dict] = []
+    async for record in _read_bulk_records(request):
+        index = len(results)
+        update, error = _parse_bulk_record(record)
+        patrol = patrols_db.get(update.patrol_id) if update else None
+        if update and not patrol:
+            error = "Patrol not found"
+        if error:
+            patrol_id = record.get("patrol_id") if isinstance(record, dict) else None
+            if not isinstance(patrol_id, int):
+                patrol_id = None
+            results.append(BulkUpdateResult(index=index, patrol_id=patrol_id, status="error", detail=error))
+            continue
+        messages = _apply_update(patrol, update)
+        patrols_db.put(patrol.id, patrol, fields=FIX_FIELDS)
+        for message in messages:
+            if message["type"] == "location_update":
+                latest_locations.pop(patrol.id, None)
+                latest_locations[patrol.id] = message
+            else:
+                events.append(message)
+        results.append(BulkUpdateResult(index=index, patrol_id=patrol.id, status="ok", on_track=patrol.on_track))
+    await manager.publish(list(latest_locations.values()) + events, batch=True)
+    return results
\ No newline at end of file
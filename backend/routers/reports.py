@@ -4,25 +4,32 @@ Reporting endpoints for exporting commander briefs.
 This router provides an endpoint for generating PDF reports summarising
 patrol statuses and incidents over a given time window. Access is
 restricted to HQ OPS and above.
+
+Briefs are rendered off the event loop by the report job subsystem.
+Clients can either wait on ``GET /reports/commander-brief`` or submit a
+job with ``POST /reports/commander-brief/jobs`` and poll
+``GET /reports/jobs/{job_id}`` until the PDF is ready to download.
 """
 
-import os
 from datetime import datetime
-from tempfile import NamedTemporaryFile
-from typing import List
+from typing import List, Tuple
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from fastapi.responses import FileResponse
 
 from ..dependencies import role_required
-from ..models import Incident, Patrol
+from ..incident_index import incident_index
+from ..models import Incident, Patrol, ReportJobStatus
+from ..report_jobs import ReportJob, patrol_digest, report_jobs
 from ..roles import Role
-from ..pdf_report import generate_commander_brief
+from ..startup import startup_report
+from ..timeutils import to_epoch
 from .incidents import incidents_db
 from .patrols import patrols_db
 
 
 router = APIRouter(prefix="/reports", tags=["reports"])
+startup_report.add_warmup("report workers", report_jobs.warm_up)
 
 
 def _parse_datetime(value: str) -> datetime:
@@ -32,6 +39,43 @@ def _parse_datetime(value: str) -> datetime:
         raise HTTPException(status_code=400, detail=f"Invalid datetime: {value}")
 
 
+def _parse_window(start: str, end: str) -> Tuple[datetime, datetime]:
+    start_dt = _parse_datetime(start)
+    end_dt = _parse_datetime(end)
+    if end_dt < start_dt:
+        raise HTTPException(status_code=400, detail="End must be after start")
+    return start_dt, end_dt
+
+
+def _submit_brief(start_dt: datetime, end_dt: datetime) -> ReportJob:
+    """Collect the data for a window and hand it to the job subsystem."""
+    # Select incidents in the window from the DTG index
+    incident_list: List[Incident] = [
+        incidents_db[incident_id]
+        for _, incident_id in incident_index.range(to_epoch(start_dt), to_epoch(end_dt))
+    ]
+
+    # All patrols included
+    patrol_list: List[Patrol] = list(patrols_db.values())
+
+    data_version = (incidents_db.version, patrol_digest(patrol_list))
+    return report_jobs.submit(start_dt, end_dt, data_version, incident_list, patrol_list)
+
+
+class _JobFileResponse(FileResponse):
+    """Sends a checked-out job's PDF and releases it once sent, even if the client goes away."""
+
+    def __init__(self, job: ReportJob) -> None:
+        super().__init__(job.path, filename=job.filename, media_type="application/pdf")
+        self.job = job
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            report_jobs.release(self.job)
+
+
 @router.get("/commander-brief")
 async def commander_brief(
     start: str = Query(..., description="Start of reporting period (ISO8601)"),
@@ -39,24 +83,48 @@ async def commander_brief(
     user=Depends(role_required(Role.HQ_OPS)),
 ):
     """Generate a commander brief PDF for the specified date range."""
-    start_dt = _parse_datetime(start)
-    end_dt = _parse_datetime(end)
-    if end_dt < start_dt:
-        raise HTTPException(status_code=400, detail="End must be after start")
+    job = _submit_brief(*_parse_window(start, end))
+    # Checked out before waiting, so an eviction before the response is sent keeps the file
+    report_jobs.checkout(job)
+    try:
+        await job.done.wait()
+    except BaseException:
+        report_jobs.release(job)
+        raise
+    if job.status == "failed":
+        report_jobs.release(job)
+        raise HTTPException(status_code=500, detail=f"Report generation failed: {job.error}")
+    return _JobFileResponse(job)
 
-    # Filter incidents
-    incident_list: List[Incident] = []
-    for inc in incidents_db.values():
-        if start_dt <= inc.dtg <= end_dt:
-            incident_list.append(inc)
 
-    # All patrols included
-    patrol_list: List[Patrol] = list(patrols_db.values())
+@router.post("/commander-brief/jobs", response_model=ReportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_commander_brief(
+    start: str = Query(..., description="Start of reporting period (ISO8601)"),
+    end: str = Query(..., description="End of reporting period (ISO8601)"),
+    user=Depends(role_required(Role.HQ_OPS)),
+):
+    """Start rendering a commander brief and return its job id."""
+    return _submit_brief(*_parse_window(start, end)).describe()
+
+
+def _get_job(job_id: str) -> ReportJob:
+    job = report_jobs.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobStatus)
+async def report_job_status(job_id: str, user=Depends(role_required(Role.HQ_OPS))):
+    """Return the status of a report job."""
+    return _get_job(job_id).describe()
 
-    # Generate PDF in a temporary file
-    with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp_path = tmp.name
-    generate_commander_brief(tmp_path, start_dt, end_dt, incident_list, patrol_list)
 
-    filename = f"commander_brief_{start_dt.date()}_{end_dt.date()}.pdf"
-    return FileResponse(tmp_path, filename=filename, media_type="application/pdf")
\ No newline at end of file
+@router.get("/jobs/{job_id}/download")
+async def download_report(job_id: str, user=Depends(role_required(Role.HQ_OPS))):
+    """Download the PDF of a finished report job."""
+    job = _get_job(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Report job is {job.status}")
+    report_jobs.checkout(job)
+    return _JobFileResponse(job)
\ No newline at end of file
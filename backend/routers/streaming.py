@@ -7,35 +7,520 @@ patrol locations are updated via the REST API the manager's
 ``broadcast`` method is called, sending JSON messages to all
 connected clients. This enables real‑time situational awareness
 dashboards without polling.
+
+Clients may narrow what they receive by sending subscription messages,
+for example ``{"action": "subscribe", "units": ["1 EB"]}`` or
+``{"action": "subscribe", "bboxes": [[23.7, 90.3, 23.9, 90.5]]}``.
+Each message is routed through a :class:`SubscriptionIndex` to the
+clients that match its patrol id, unit or location; clients that never
+subscribe keep receiving everything.
+
+Location updates can optionally be conflated into ticks: with
+``BROADCAST_TICK_HZ`` set, only the latest state of each patrol is kept
+between ticks and each tick goes out as one ``tick`` frame carrying, per
+patrol, just the fields that changed since the state that client last
+received. A client sees a patrol's full record the first time it is
+sent one, and again for every patrol after one of its queued frames
+was dropped.
+
+Published messages travel over the event bus, so with several workers
+every worker delivers them to its own connected clients.
+
+Broadcasting never waits on a socket. Each connection owns a bounded
+send queue drained by its own writer task, so a slow dashboard only
+delays itself. When a queue is full the slow-consumer policy decides
+what happens: ``drop_oldest`` discards the oldest queued frame,
+``conflate`` keeps only the newest location update per patrol, and
+``disconnect`` closes the connection.
+
+Connections authenticate with a JWT in the ``token`` query parameter.
+With ``encoding=binary`` as well, location updates arrive as compact
+binary frames laid out as described in :mod:`backend.wire`; every other
+message stays JSON. JSON is the default. uvicorn negotiates
+permessage-deflate with clients that offer it (``--ws-per-message-deflate``,
+on by default), which mostly benefits the JSON encoding; binary frames
+are already small and cheap to send uncompressed.
+
+Every message delivered by a worker carries a ``seq`` number and is kept
+in a bounded replay buffer. On connect a client first receives a
+``snapshot`` frame with the current patrols and the ``seq`` it reflects;
+the encoded snapshot is shared by every client connecting at the same
+``seq``, so a reconnect storm costs one encode rather than one REST call
+per dashboard. A client that reconnects with ``resume_from=<seq>`` gets
+a ``replay`` frame holding only the messages it missed instead, or a
+fresh snapshot if those have already left the buffer. Sequence numbers
+are local to a worker; a client resuming against another worker, or
+after a restart, falls back to the snapshot.
 """
 
+import asyncio
+import itertools
 import json
-from typing import List
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from ..bbox import check_bbox
+from ..dependencies import websocket_user
+from ..eventbus import bus as default_bus
+from ..metrics import broadcast_fanout_latency, broadcast_frames
+from ..models import SubscriptionRequest
+from ..subscriptions import SubscriptionIndex
+from ..wire import ENCODINGS, KIND_LOCATIONS, KIND_TICK, encode_locations, is_location_update
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "conflate", "disconnect")
+
+# Send queue configuration; override via environment
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Rate at which conflated location ticks are flushed; 0 sends every update immediately
+BROADCAST_TICK_HZ = float(os.getenv("BROADCAST_TICK_HZ", "0"))
+
+# Messages kept for clients that reconnect with resume_from
+REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "10000"))
+
+STREAM_TOPIC = "stream"
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+# WebSocket close code used when a slow consumer is disconnected (try again later)
+WS_CLOSE_SLOW_CONSUMER = 1013
+
+Frame = Union[str, bytes]
+
+
+def _conflation_key(message: dict) -> Optional[Hashable]:
+    """Return the key under which a message may replace an older queued one."""
+    if message.get("type") == "location_update":
+        return ("location_update", message.get("patrol_id"))
+    return None
+
+
+class ClientChannel:
+    """Bounded send queue and writer task for a single WebSocket."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: int,
+        policy: str,
+        on_close: Callable[[WebSocket], None],
+        encoding: str = "json",
+        on_drop: Optional[Callable[[WebSocket], None]] = None,
+    ) -> None:
+        self.websocket = websocket
+        self.max_size = max_size
+        self.policy = policy
+        self.encoding = encoding
+        self.dropped = 0
+        # Latest state of each patrol sent to this client in a tick, the base for its deltas
+        self.tick_state: Dict[int, dict] = {}
+        self._on_close = on_close
+        self._on_drop = on_drop
+        self._pending: "OrderedDict[Hashable, Frame]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._writer())
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, data: Frame, key: Optional[Hashable] = None) -> bool:
+        """Queue a frame without blocking; return False if the client must be dropped."""
+        if self.policy == "conflate" and key is not None and key in self._pending:
+            # Replace the stale frame in place so ordering is preserved
+            self._pending[key] = data
+            self.dropped += 1
+        else:
+            if len(self._pending) >= self.max_size:
+                if self.policy == "disconnect":
+                    return False
+                self._pending.popitem(last=False)
+                self.dropped += 1
+                if self._on_drop is not None:
+                    self._on_drop(self.websocket)
+            if self.policy != "conflate" or key is None:
+                key = next(self._sequence)
+            self._pending[key] = data
+        self._wakeup.set()
+        return True
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._pending:
+                    _, data = self._pending.popitem(last=False)
+                    if isinstance(data, bytes):
+                        await self.websocket.send_bytes(data)
+                    else:
+                        await self.websocket.send_text(data)
+        except Exception:
+            # Sending failed; the client is gone
+            self._on_close(self.websocket)
+
+    def close(self) -> None:
+        """Stop the writer task and discard anything still queued."""
+        self._pending.clear()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: List[WebSocket] = []
+    def __init__(
+        self,
+        queue_size: int = SEND_QUEUE_SIZE,
+        policy: str = SLOW_CONSUMER_POLICY,
+        tick_hz: float = BROADCAST_TICK_HZ,
+        bus=default_bus,
+        replay_size: int = REPLAY_BUFFER_SIZE,
+    ) -> None:
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.active_connections: Dict[WebSocket, ClientChannel] = {}
+        self.subscriptions = SubscriptionIndex()
+        self.ticker = TickBroadcaster(self, tick_hz) if tick_hz > 0 else None
+        self.bus = bus
+        # Sequence number of the latest delivered message, and the most recent messages
+        self.seq = 0
+        self.replay: Deque[dict] = deque(maxlen=replay_size)
+        self._snapshot_version: Optional[Callable[[], Hashable]] = None
+        self._snapshot_patrols: Optional[Callable[[], bytes]] = None
+        self._snapshot: Optional[Tuple[Hashable, str]] = None
+        self._replay_frames: Dict[Tuple[int, str], List[Frame]] = {}
+        self._replay_frames_seq = 0
+        bus.subscribe(STREAM_TOPIC, self._deliver)
+
+    def set_snapshot_source(self, version: Callable[[], Hashable], patrols: Callable[[], bytes]) -> None:
+        """Provide the current patrols as a JSON array for connect snapshots.
 
-    async def connect(self, websocket: WebSocket) -> None:
+        ``version`` must change whenever ``patrols`` would return something
+        different, so the encoded snapshot can be reused until then.
+        """
+        self._snapshot_version = version
+        self._snapshot_patrols = patrols
+        self._snapshot = None
+
+    async def connect(self, websocket: WebSocket, encoding: str = "json", resume_from: Optional[int] = None) -> None:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[websocket] = ClientChannel(
+            websocket, self.queue_size, self.policy, self.disconnect, encoding,
+            on_drop=self.ticker.resync if self.ticker is not None else None,
+        )
+        self.subscriptions.add_client(websocket)
+        frames = self._resume_frames(resume_from, encoding) if resume_from is not None else None
+        if frames is None:
+            frames = [self._snapshot_frame()]
+        for data in frames:
+            self._send(websocket, data)
+
+    def _snapshot_frame(self) -> str:
+        """Return the encoded snapshot of current state, rebuilding it only when state has moved on."""
+        version = (self.seq, self._snapshot_version() if self._snapshot_version is not None else None)
+        if self._snapshot is None or self._snapshot[0] != version:
+            patrols = self._snapshot_patrols().decode("utf-8") if self._snapshot_patrols is not None else "[]"
+            self._snapshot = (version, f'{{"type":"snapshot","seq":{self.seq},"patrols":{patrols}}}')
+        return self._snapshot[1]
+
+    def _resume_frames(self, resume_from: int, encoding: str) -> Optional[List[Frame]]:
+        """Return frames replaying everything after ``resume_from``, or None if it cannot be resumed."""
+        if resume_from > self.seq:
+            return None
+        if resume_from < self.seq and (not self.replay or self.replay[0]["seq"] > resume_from + 1):
+            return None
+        if self._replay_frames_seq != self.seq:
+            self._replay_frames = {}
+            self._replay_frames_seq = self.seq
+        key = (resume_from, encoding)
+        if key not in self._replay_frames:
+            missed = [m for m in self.replay if m["seq"] > resume_from]
+            frames = self._encode_batch(missed, missed, list(range(len(missed))), encoding, "replay", {"seq": self.seq})
+            self._replay_frames[key] = frames or [json.dumps({"type": "replay", "seq": self.seq, "messages": []})]
+        return self._replay_frames[key]
 
     def disconnect(self, websocket: WebSocket) -> None:
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        channel = self.active_connections.pop(websocket, None)
+        if channel is not None:
+            channel.close()
+        self.subscriptions.remove_client(websocket)
 
-    async def broadcast(self, message: dict) -> None:
-        """Broadcast a JSON message to all connected clients."""
-        data = json.dumps(message)
-        for connection in list(self.active_connections):
+    def _drop_slow_consumer(self, websocket: WebSocket) -> None:
+        self.disconnect(websocket)
+
+        async def close() -> None:
             try:
-                await connection.send_text(data)
+                await websocket.close(code=WS_CLOSE_SLOW_CONSUMER)
             except Exception:
-                # On error remove connection silently
-                self.disconnect(connection)
+                pass
+
+        asyncio.get_running_loop().create_task(close())
+
+    def queue_depths(self) -> List[int]:
+        """Return the number of frames queued for each connection."""
+        return [channel.depth for channel in self.active_connections.values()]
+
+    def _targets(self, message: dict) -> Iterable[WebSocket]:
+        """Return the connections subscribed to a message."""
+        if "patrol_id" not in message:
+            return list(self.active_connections)
+        return self.subscriptions.match(message["patrol_id"], message.get("unit"), message.get("location"))
+
+    def _send(self, websocket: WebSocket, data: Frame, key: Optional[Hashable] = None) -> None:
+        channel = self.active_connections.get(websocket)
+        if channel is None:
+            return
+        broadcast_frames.inc()
+        if not channel.enqueue(data, key):
+            self._drop_slow_consumer(websocket)
+
+    def _encoding(self, websocket: WebSocket) -> str:
+        channel = self.active_connections.get(websocket)
+        return "json" if channel is None else channel.encoding
+
+    def _send_message(self, message: dict) -> None:
+        """Queue a message for every subscribed local client in the encoding it asked for."""
+        targets = self._targets(message)
+        if not targets:
+            return
+        key = _conflation_key(message)
+        binary = is_location_update(message)
+        frames: Dict[str, Frame] = {}
+        for websocket in targets:
+            encoding = self._encoding(websocket) if binary else "json"
+            data = frames.get(encoding)
+            if data is None:
+                if encoding == "binary":
+                    try:
+                        data = encode_locations([message], seq=message.get("seq", 0))
+                    except ValueError:
+                        # Binary clients read JSON frames too, so the update still reaches them
+                        logger.exception("Sending location update as JSON")
+                        data = json.dumps(message)
+                else:
+                    data = json.dumps(message)
+                frames[encoding] = data
+            self._send(websocket, data, key)
+
+    def _send_batch(self, messages: List[dict], frame_type: str = "batch", **fields) -> None:
+        """Queue several messages as one frame per local client.
+
+        Each client receives only the messages it is subscribed to; clients
+        with identical selections share a single encoded frame. Binary
+        clients get their location updates as full records in one binary
+        frame, followed by a JSON frame for any other messages.
+        """
+        selections: Dict[WebSocket, List[int]] = {}
+        for i, message in enumerate(messages):
+            for websocket in self._targets(message):
+                selections.setdefault(websocket, []).append(i)
+        frames: Dict[Tuple[str, Tuple[int, ...]], List[Frame]] = {}
+        for websocket, selected in selections.items():
+            encoding = self._encoding(websocket)
+            key = (encoding, tuple(selected))
+            if key not in frames:
+                frames[key] = self._encode_batch(messages, messages, selected, encoding, frame_type, fields)
+            for data in frames[key]:
+                self._send(websocket, data)
+
+    @staticmethod
+    def _encode_batch(
+        messages: List[dict],
+        payloads: List[dict],
+        selected: List[int],
+        encoding: str,
+        frame_type: str,
+        fields: dict,
+    ) -> List[Frame]:
+        encoded: List[Frame] = []
+        if encoding == "binary":
+            locations = [messages[i] for i in selected if is_location_update(messages[i])]
+            if locations:
+                kind = KIND_TICK if frame_type == "tick" else KIND_LOCATIONS
+                seq = fields.get("seq", max(m.get("seq", 0) for m in locations))
+                try:
+                    encoded.append(encode_locations(locations, kind, seq))
+                    selected = [i for i in selected if not is_location_update(messages[i])]
+                except ValueError:
+                    logger.exception("Sending location updates as JSON")
+        if selected:
+            encoded.append(json.dumps({"type": frame_type, **fields, "messages": [payloads[i] for i in selected]}))
+        return encoded
+
+    def _deliver(self, event: dict) -> None:
+        """Deliver a published event to the clients connected to this worker.
+
+        Location updates go through the tick broadcaster when one is
+        configured; everything else is sent straight away, either as
+        individual frames or as one batch frame.
+        """
+        started = time.perf_counter()
+        messages = event["messages"]
+        for message in messages:
+            self.seq += 1
+            message["seq"] = self.seq
+            self.replay.append(message)
+        if self.ticker is not None:
+            for message in messages:
+                if message.get("type") == "location_update":
+                    self.ticker.mark_dirty(message)
+            messages = [m for m in messages if m.get("type") != "location_update"]
+        if event.get("batch"):
+            if messages:
+                self._send_batch(messages)
+        else:
+            for message in messages:
+                try:
+                    self._send_message(message)
+                except Exception:
+                    # One message that cannot be sent must not hold back the rest
+                    logger.exception("Failed to deliver %s message", message.get("type"))
+        broadcast_fanout_latency.observe(time.perf_counter() - started)
+
+    async def publish(self, messages: List[dict], batch: bool = False) -> None:
+        """Publish messages to the clients of every worker without waiting on any socket.
+
+        With ``batch`` the messages reach each client as one batch frame.
+        """
+        self.bus.publish(STREAM_TOPIC, {"messages": messages, "batch": batch})
+
+    async def broadcast(self, message: dict) -> None:
+        """Broadcast a JSON message to all subscribed clients."""
+        await self.publish([message])
+
+    async def broadcast_batch(self, messages: List[dict]) -> None:
+        """Broadcast several messages to subscribed clients as a single batch frame."""
+        if messages:
+            await self.publish(messages, batch=True)
+
+    def handle_client_message(self, websocket: WebSocket, text: str) -> None:
+        """Apply a subscribe/unsubscribe request and acknowledge it."""
+        try:
+            request = SubscriptionRequest(**json.loads(text))
+            if request.action not in ("subscribe", "unsubscribe"):
+                raise ValueError(f"Unknown action: {request.action}")
+            bboxes = [check_bbox(bbox) for bbox in request.bboxes]
+        except (ValueError, TypeError, ValidationError) as exc:
+            self._send(websocket, json.dumps({"type": "error", "detail": str(exc)}))
+            return
+        apply = self.subscriptions.subscribe if request.action == "subscribe" else self.subscriptions.unsubscribe
+        subscription = apply(
+            websocket,
+            patrol_ids=request.patrol_ids,
+            units=request.units,
+            bboxes=bboxes,
+            everything=request.all,
+        )
+        self._send(websocket, json.dumps({"type": "subscription", **subscription.describe()}))
+
+
+class TickBroadcaster:
+    """Conflates location updates and flushes them as delta frames at a fixed rate.
+
+    Deltas are taken per client against the state that client was last
+    sent, since subscriptions route each patrol to a different set of
+    clients on every tick. After a client's queue drops a frame its base
+    is discarded and the next tick sends it every patrol it subscribes to
+    in full.
+    """
+
+    def __init__(self, manager: ConnectionManager, rate_hz: float) -> None:
+        self.manager = manager
+        self.interval = 1.0 / rate_hz
+        self.tick = 0
+        self._dirty: Dict[int, dict] = {}
+        # Latest ticked state of every patrol, for resyncing clients
+        self._latest: Dict[int, dict] = {}
+        self._resync: Set[WebSocket] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, message: dict) -> None:
+        """Record the latest state of a patrol to be sent on the next tick."""
+        self._dirty[message["patrol_id"]] = message
+        self._schedule()
+
+    def resync(self, websocket: WebSocket) -> None:
+        """Send a client every patrol in full on the next tick, after it lost a frame."""
+        self._resync.add(websocket)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        # The loop stops once a tick finds nothing to send and restarts on the next update
+        while self._dirty or self._resync:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Send each client one tick frame with what changed since the state it last received."""
+        manager = self.manager
+        dirty, self._dirty = self._dirty, {}
+        resync, self._resync = self._resync, set()
+        self._latest.update(dirty)
+        selections: Dict[WebSocket, List[dict]] = {}
+        for state in dirty.values():
+            for websocket in manager._targets(state):
+                selections.setdefault(websocket, []).append(state)
+        if resync:
+            for websocket in resync:
+                channel = manager.active_connections.get(websocket)
+                if channel is not None:
+                    channel.tick_state.clear()
+            for patrol_id, state in self._latest.items():
+                if patrol_id not in dirty:
+                    for websocket in resync.intersection(manager._targets(state)):
+                        selections.setdefault(websocket, []).append(state)
+        if not selections:
+            return
+        self.tick += 1
+        fields = {"tick": self.tick, "seq": manager.seq}
+        # Deltas by (state, base) identity; holding the base keeps its id from being reused
+        deltas: Dict[Tuple[int, int], Tuple[dict, Optional[dict]]] = {}
+        frames: Dict[Hashable, List[Frame]] = {}
+        for websocket, states in selections.items():
+            channel = manager.active_connections.get(websocket)
+            if channel is None:
+                continue
+            sent: List[dict] = []
+            payloads: List[dict] = []
+            for state in states:
+                previous = channel.tick_state.get(state["patrol_id"])
+                if previous is state:
+                    continue
+                key = (id(state), id(previous))
+                if key not in deltas:
+                    base = previous or {}
+                    delta = {k: v for k, v in state.items() if k not in ("type", "seq") and base.get(k) != v}
+                    if delta:
+                        delta["patrol_id"] = state["patrol_id"]
+                    deltas[key] = (delta, previous)
+                channel.tick_state[state["patrol_id"]] = state
+                delta = deltas[key][0]
+                if delta:
+                    sent.append(state)
+                    payloads.append(delta)
+            if not sent:
+                continue
+            frame_key = (channel.encoding, tuple(id(payload) for payload in payloads))
+            if frame_key not in frames:
+                frames[frame_key] = manager._encode_batch(
+                    sent, payloads, list(range(len(sent))), channel.encoding, "tick", fields
+                )
+            for data in frames[frame_key]:
+                manager._send(websocket, data)
 
 
 manager = ConnectionManager()
@@ -46,10 +531,26 @@ router = APIRouter()
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for clients to receive streaming patrol updates."""
-    await manager.connect(websocket)
+    """WebSocket endpoint for clients to receive streaming patrol updates.
+
+    Clients authenticate with ``/ws?token=<jwt>``; connections without a
+    valid token are closed before being accepted. ``encoding=binary``
+    selects binary location frames and ``resume_from=<seq>`` asks for a
+    replay of missed messages in place of the initial snapshot.
+    """
+    if await websocket_user(websocket) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    encoding = websocket.query_params.get("encoding", "json")
+    if encoding not in ENCODINGS:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+    resume_from = websocket.query_params.get("resume_from")
+    await manager.connect(websocket, encoding, int(resume_from) if resume_from and resume_from.isdigit() else None)
     try:
         while True:
-            await websocket.receive_text()  # Keep connection alive; ignore client msgs
+            manager.handle_client_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
\ No newline at end of file
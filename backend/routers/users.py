@@ -17,6 +17,7 @@ from ..dependencies import (
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     role_required,
+    token_cache,
 )
 from ..models import Token, User
 from ..roles import Role
@@ -44,4 +45,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @router.get("/users/me", response_model=User)
 async def read_users_me(current_user_data=Depends(role_required(Role.VIEW_ONLY))):
     """Return the current authenticated user as a User model."""
-    return User(username=current_user_data.username, role=current_user_data.role)
\ No newline at end of file
+    return User(username=current_user_data.username, role=current_user_data.role)
+
+
+@router.get("/auth/token-cache")
+async def token_cache_stats(user=Depends(role_required(Role.SUPER_ADMIN))):
+    """Report size and hit rate of the verified-token cache."""
+    return token_cache.stats()
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Cached JSON encodings of stored entities.
+
+Most entities are read far more often than they change, yet every list
+response used to validate and encode the whole collection again. An
+:class:`EncodedStore` keeps the JSON bytes of each entity in a store,
+drops an entry whenever the store reports a write to it, and re-encodes
+it only on the next read. List endpoints join the cached fragments and
+return them through :class:`PreencodedJSONResponse`, which sends the
+bytes as they are.
+"""
+
+import json
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from .store import Store
+
+
+def encode_json(value: Any) -> bytes:
+    """Encode ``value`` the way FastAPI's JSONResponse would."""
+    return json.dumps(
+        jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def join_array(fragments: Iterable[bytes]) -> bytes:
+    """Join pre-encoded JSON values into a JSON array."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+class PreencodedJSONResponse(Response):
+    """A JSON response whose body is already encoded bytes."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else encode_json(content)
+
+
+class EncodedStore:
+    """Per-entity JSON bytes for a store, invalidated by its writes."""
+
+    def __init__(self, store: Store) -> None:
+        self.store = store
+        self._encoded: Dict[Hashable, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+        store.add_listener(self._invalidate)
+
+    def _invalidate(self, key: Hashable, value: Any, local: bool) -> None:
+        self._encoded.pop(key, None)
+
+    def get(self, key: Hashable) -> bytes:
+        """Return the JSON encoding of the entity stored under ``key``."""
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            self.misses += 1
+            encoded = self._encoded[key] = encode_json(self.store[key])
+        else:
+            self.hits += 1
+        return encoded
+
+    def array(self, keys: Optional[Iterable[Hashable]] = None) -> bytes:
+        """Return a JSON array of the given entities, or of the whole store."""
+        return join_array(self.get(key) for key in (self.store if keys is None else keys))
+
+    def response(self, keys: Optional[Iterable[Hashable]] = None, headers: Optional[Mapping[str, str]] = None) -> PreencodedJSONResponse:
+        """Return a list response for the given entities, or for the whole store."""
+        return PreencodedJSONResponse(self.array(keys), headers=headers)
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._encoded), "hits": self.hits, "misses": self.misses}
\ No newline at end of file
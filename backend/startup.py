@@ -0,0 +1,153 @@
+"""
+Startup timing, lazy imports and warm-up.
+
+Workers are started and stopped often, so the time from process start
+to taking traffic matters. Heavy third-party modules such as NumPy are
+bound with :func:`lazy_import` and only executed when first used, and
+reportlab is imported by the report workers themselves, so importing
+``backend.main`` does not pay for subsystems a request may never touch.
+
+Subsystems register warm-up hooks with :meth:`StartupReport.add_warmup`
+to build caches such as route indexes, packed geofences and search
+columns ahead of the first request that needs them. With
+``STARTUP_WARMUP`` enabled, the default, the hooks run in the background
+once the application has started and ``GET /ready`` answers 503 until
+they finish. With it set to ``0`` the worker is ready as soon as it has
+started and caches are built on demand.
+
+Every import made by ``backend.main``, every startup step and every
+warm-up hook is timed. The breakdown, including which third-party
+packages each step pulled in, is served by ``GET /ready`` and logged
+when the worker becomes ready.
+
+This module only uses the standard library so that it can be imported
+before anything else.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import inspect
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") != "0"
+
+# Steps named in the log line once the worker is ready
+SLOWEST_STEPS_LOGGED = 5
+
+WarmupHook = Callable[[], Any]
+
+_PACKAGE = __name__.partition(".")[0]
+# Names bound by lazy_import, whether or not they have been loaded since
+_lazy_modules: Set[str] = set()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module ``name``, deferring its execution until an attribute is first read."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    _lazy_modules.add(name)
+    return module
+
+
+def _is_loaded(name: str) -> bool:
+    # A lazy module turns into a plain module once it has been executed
+    return name not in _lazy_modules or type(sys.modules.get(name)) is ModuleType
+
+
+class StartupReport:
+    """Durations of the imports, startup steps and warm-up hooks, in the order they ran."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.ready = False
+        self.ready_after: Optional[float] = None
+        self._warmups: List[Tuple[str, WarmupHook]] = []
+
+    @contextmanager
+    def step(self, phase: str, name: str) -> Iterator[None]:
+        """Time the body of the ``with`` block as step ``name`` of ``phase``."""
+        modules = set(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record: Dict[str, Any] = {"phase": phase, "name": name, "seconds": round(time.perf_counter() - started, 4)}
+            loaded = [module for module in set(sys.modules) - modules if _is_loaded(module)]
+            if loaded:
+                record["modules_loaded"] = len(loaded)
+                # Third-party packages this step pulled in
+                packages = {module.partition(".")[0] for module in loaded} - sys.stdlib_module_names - {_PACKAGE}
+                packages = sorted(package for package in packages if not package.startswith("_"))
+                if packages:
+                    record["packages"] = packages
+            self.steps.append(record)
+
+    def import_module(self, name: str, package: Optional[str] = None) -> ModuleType:
+        """Import a module as a timed step of the ``import`` phase."""
+        with self.step("import", importlib.util.resolve_name(name, package)):
+            return importlib.import_module(name, package)
+
+    def add_warmup(self, name: str, hook: WarmupHook) -> None:
+        """Register ``hook`` to run during warm-up; an awaitable result is awaited."""
+        self._warmups.append((name, hook))
+
+    async def warm_up(self) -> None:
+        """Run the warm-up hooks in registration order, then report readiness.
+
+        A failing hook is logged and skipped; the cache it would have
+        built is then filled by the first request that needs it.
+        """
+        for name, hook in self._warmups:
+            try:
+                with self.step("warmup", name):
+                    result = hook()
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception:
+                logger.exception("Warm-up step %s failed", name)
+            # Let requests in between steps
+            await asyncio.sleep(0)
+        self.mark_ready()
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started
+        slowest = sorted(self.steps, key=lambda step: step["seconds"], reverse=True)[:SLOWEST_STEPS_LOGGED]
+        logger.info(
+            "Ready %.3fs after startup began; slowest steps: %s",
+            self.ready_after,
+            ", ".join(f"{step['phase']} {step['name']} {step['seconds']:.3f}s" for step in slowest),
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        phases: Dict[str, float] = {}
+        for step in self.steps:
+            phases[step["phase"]] = phases.get(step["phase"], 0.0) + step["seconds"]
+        return {
+            "ready": self.ready,
+            "ready_after_seconds": None if self.ready_after is None else round(self.ready_after, 4),
+            "phase_seconds": {phase: round(seconds, 4) for phase, seconds in phases.items()},
+            "steps": self.steps,
+        }
+
+
+startup_report = StartupReport()
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+In-memory entity stores with change notification.
+
+Each store is a plain ``dict`` keyed by entity id so existing code can
+keep reading it directly. Writes go through :meth:`Store.put`, which
+notifies listeners; derived structures (route indexes, geofence grids)
+and replication to other workers hang off these listeners. Changes that
+arrive from another worker are applied with :meth:`Store.apply_remote`
+and reach the same listeners with ``local=False``.
+
+A write that changes only some fields of an entity, such as a location
+fix, names them in :meth:`Store.put`. Replication and the event log then
+carry just those values instead of the whole entity, route included.
+
+Ids are allocated per store. When several workers share state each one
+is given a distinct ``NODE_INDEX`` out of ``NODE_COUNT`` and allocates
+ids from its own residue class so they never collide.
+
+Every write is stamped with a version from a single counter shared by
+all stores, and each store remembers the latest version of every key in
+write order. That gives list endpoints a cheap ETag and lets
+:meth:`Store.changed_since` find recent changes without scanning the
+whole store. Versions are local to a worker process and restart with it,
+so ETags and change-feed versions also carry an epoch drawn at random
+when the process starts. A tag or version from another worker, or from
+an earlier run, then never matches by accident.
+"""
+
+import itertools
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+
+NODE_INDEX = int(os.getenv("NODE_INDEX", "0"))
+NODE_COUNT = int(os.getenv("NODE_COUNT", "1"))
+
+STORE_TOPIC = "store"
+
+Listener = Callable[[Hashable, Any, bool], None]
+
+# Versions shared by every store, so one number orders all changes in this process
+_clock = itertools.count(1)
+_current_version = 0
+# Distinguishes this process's versions from those of other workers and earlier runs
+EPOCH = uuid.uuid4().hex[:12]
+
+
+def current_version() -> int:
+    """Return the version of the most recent write to any store."""
+    return _current_version
+
+
+def version_token(version: int) -> str:
+    """Return ``version`` qualified with this process's epoch, for handing to clients."""
+    return f"{EPOCH}.{version}"
+
+
+def parse_version_token(token: str) -> Optional[int]:
+    """Return the version in a token from :func:`version_token`, or None if it is not one of this process's."""
+    epoch, _, version = token.partition(".")
+    if epoch != EPOCH or not version.isdigit():
+        return None
+    return int(version)
+
+
+class Store(dict):
+    """A dict of entities that tells listeners about every write."""
+
+    def __init__(self, name: str, model: Type[BaseModel]) -> None:
+        super().__init__()
+        self.name = name
+        self.model = model
+        self.next_id = 1 + NODE_INDEX
+        # Version of the latest write; lets caches tell whether the data changed
+        self.version = 0
+        # Latest version of each key, oldest first
+        self.versions: "OrderedDict[Hashable, int]" = OrderedDict()
+        # Fields named by the write being notified; None when the whole entity changed
+        self.changed_fields: Optional[Sequence[str]] = None
+        self._listeners: List[Listener] = []
+        self._field_adapters: Dict[str, TypeAdapter] = {}
+        self._change: Optional[Tuple[int, dict, bool]] = None
+        stores[name] = self
+
+    def add_listener(self, listener: Listener) -> None:
+        """Register ``listener(key, value, local)`` to be called after every write."""
+        self._listeners.append(listener)
+
+    def allocate_id(self) -> int:
+        """Return a new id unique across all workers."""
+        new_id = self.next_id
+        self.next_id += NODE_COUNT
+        return new_id
+
+    def put(self, key: Hashable, value: BaseModel, fields: Optional[Sequence[str]] = None) -> None:
+        """Store a new or modified entity and notify listeners.
+
+        Pass ``fields`` when the entity already exists and only those fields changed.
+        """
+        self[key] = value
+        self._notify(key, value, True, fields)
+
+    def apply_remote(self, key: Hashable, data: dict, partial: bool = False) -> None:
+        """Apply an entity change received from another worker or read back from the log.
+
+        With ``partial`` the data holds only the changed fields, which are
+        validated one by one and set on the stored entity. A partial change
+        to an entity this worker does not hold yet is ignored.
+        """
+        if partial:
+            value = self.get(key)
+            if value is None:
+                return
+            for name, field_value in data.items():
+                setattr(value, name, self._field_adapter(name).validate_python(field_value))
+            self._notify(key, value, False, list(data))
+            return
+        value = self.model(**data)
+        self[key] = value
+        self._notify(key, value, False)
+
+    def _field_adapter(self, name: str) -> TypeAdapter:
+        adapter = self._field_adapters.get(name)
+        if adapter is None:
+            adapter = self._field_adapters[name] = TypeAdapter(self.model.model_fields[name].annotation)
+        return adapter
+
+    def encoded_change(self, value: Any) -> Tuple[dict, bool]:
+        """Return the JSON-ready data of the write being notified and whether it is partial.
+
+        Meant for listeners; the encoding is shared by every listener of one write.
+        """
+        if self._change is None or self._change[0] != self.version:
+            if self.changed_fields is None:
+                self._change = (self.version, jsonable_encoder(value), False)
+            else:
+                data = {name: jsonable_encoder(getattr(value, name)) for name in self.changed_fields}
+                self._change = (self.version, data, True)
+        return self._change[1], self._change[2]
+
+    def changed_since(self, since: int) -> List[Hashable]:
+        """Return keys written after version ``since``, oldest change first."""
+        keys = []
+        for key in reversed(self.versions):
+            if self.versions[key] <= since:
+                break
+            keys.append(key)
+        keys.reverse()
+        return keys
+
+    def etag(self) -> str:
+        """Return a weak ETag that changes whenever the store is written."""
+        return f'W/"{self.name}-{EPOCH}-{self.version}"'
+
+    def _notify(self, key: Hashable, value: Any, local: bool, fields: Optional[Sequence[str]] = None) -> None:
+        global _current_version
+        _current_version = self.version = next(_clock)
+        self.versions[key] = self.version
+        self.versions.move_to_end(key)
+        self.changed_fields = fields
+        for listener in self._listeners:
+            listener(key, value, local)
+
+
+# All stores by name, for replication and persistence
+stores: Dict[str, Store] = {}
+
+
+def _state() -> Dict[str, list]:
+    """Return the entities of every store, geofences first so fence membership can be rebuilt."""
+    names = sorted(stores, key=lambda name: name != "geofences")
+    return {name: [[key, jsonable_encoder(value)] for key, value in stores[name].items()] for name in names}
+
+
+def _load_state(state: Dict[str, list]) -> None:
+    """Apply the entities shared by another worker."""
+    for name, entities in state.items():
+        store = stores.get(name)
+        if store is not None:
+            for key, value in entities:
+                store.apply_remote(key, value)
+
+
+def enable_replication(bus) -> None:
+    """Replicate writes through ``bus`` and load existing state from another worker on joining."""
+
+    def publish(store: Store) -> Listener:
+        def listener(key: Hashable, value: Any, local: bool) -> None:
+            if local:
+                data, partial = store.encoded_change(value)
+                event = {"store": store.name, "key": key, "fields" if partial else "value": data}
+                bus.publish(STORE_TOPIC, event, deliver_locally=False)
+
+        return listener
+
+    def receive(event: dict) -> None:
+        store = stores.get(event["store"])
+        if store is not None:
+            if "fields" in event:
+                store.apply_remote(event["key"], event["fields"], partial=True)
+            else:
+                store.apply_remote(event["key"], event["value"])
+
+    for store in stores.values():
+        store.add_listener(publish(store))
+    bus.subscribe(STORE_TOPIC, receive)
+    bus.set_state_provider(_state, _load_state)
@@ -0,0 +1,167 @@
+"""
+Subscription index for routing streamed updates to interested clients.
+
+Clients start out subscribed to everything. Once a client subscribes to
+specific patrol ids, units or map bounding boxes it only receives
+messages about matching patrols. Routing a message looks up its patrol
+id and unit in hash maps and its location in a uniform grid of
+bounding-box subscriptions, so the cost depends on how many clients
+care about a patrol rather than on how many are connected.
+"""
+
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+# Size in degrees of the grid cells used to index bounding-box subscriptions
+BBOX_CELL_DEG = 0.5
+# Boxes spanning more cells than this are kept in a short list and scanned
+MAX_BBOX_CELLS = 256
+
+
+class ClientSubscription:
+    """Filters registered by a single client."""
+
+    def __init__(self) -> None:
+        self.all = True
+        self.patrol_ids: Set[int] = set()
+        self.units: Set[str] = set()
+        self.bboxes: Set[BBox] = set()
+
+    def describe(self) -> dict:
+        return {
+            "all": self.all,
+            "patrol_ids": sorted(self.patrol_ids),
+            "units": sorted(self.units),
+            "bboxes": sorted(self.bboxes),
+        }
+
+
+def _contains(bbox: BBox, location: Tuple[float, float]) -> bool:
+    return bbox[0] <= location[0] <= bbox[2] and bbox[1] <= location[1] <= bbox[3]
+
+
+class SubscriptionIndex:
+    def __init__(self, cell_deg: float = BBOX_CELL_DEG) -> None:
+        self.cell_deg = cell_deg
+        self.clients: Dict[Hashable, ClientSubscription] = {}
+        self._all: Set[Hashable] = set()
+        self._by_patrol: Dict[int, Set[Hashable]] = {}
+        self._by_unit: Dict[str, Set[Hashable]] = {}
+        self._by_cell: Dict[Tuple[int, int], Set[Tuple[Hashable, BBox]]] = {}
+        self._large_bboxes: Set[Tuple[Hashable, BBox]] = set()
+
+    def add_client(self, client: Hashable) -> None:
+        self.clients[client] = ClientSubscription()
+        self._all.add(client)
+
+    def remove_client(self, client: Hashable) -> None:
+        sub = self.clients.pop(client, None)
+        if sub is None:
+            return
+        self._all.discard(client)
+        self._remove_filters(client, sub, sub.patrol_ids, sub.units, sub.bboxes)
+
+    def _cells(self, bbox: BBox) -> Optional[List[Tuple[int, int]]]:
+        """Return the grid cells a box overlaps, or None if it is too large to index."""
+        x0, y0 = math.floor(bbox[0] / self.cell_deg), math.floor(bbox[1] / self.cell_deg)
+        x1, y1 = math.floor(bbox[2] / self.cell_deg), math.floor(bbox[3] / self.cell_deg)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_BBOX_CELLS:
+            return None
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def subscribe(
+        self,
+        client: Hashable,
+        patrol_ids: Iterable[int] = (),
+        units: Iterable[str] = (),
+        bboxes: Iterable[BBox] = (),
+        everything: bool = False,
+    ) -> ClientSubscription:
+        """Add filters for a client. Adding any filter leaves the subscribe-all mode."""
+        sub = self.clients[client]
+        patrol_ids, units, bboxes = set(patrol_ids), set(units), set(bboxes)
+        if everything:
+            sub.all = True
+            self._all.add(client)
+        elif patrol_ids or units or bboxes:
+            sub.all = False
+            self._all.discard(client)
+        for patrol_id in patrol_ids - sub.patrol_ids:
+            self._by_patrol.setdefault(patrol_id, set()).add(client)
+        for unit in units - sub.units:
+            self._by_unit.setdefault(unit, set()).add(client)
+        for bbox in bboxes - sub.bboxes:
+            cells = self._cells(bbox)
+            if cells is None:
+                self._large_bboxes.add((client, bbox))
+            for cell in cells or ():
+                self._by_cell.setdefault(cell, set()).add((client, bbox))
+        sub.patrol_ids |= patrol_ids
+        sub.units |= units
+        sub.bboxes |= bboxes
+        return sub
+
+    def unsubscribe(
+        self,
+        client: Hashable,
+        patrol_ids: Iterable[int] = (),
+        units: Iterable[str] = (),
+        bboxes: Iterable[BBox] = (),
+        everything: bool = False,
+    ) -> ClientSubscription:
+        """Remove filters for a client; ``everything`` clears every filter and subscribe-all."""
+        sub = self.clients[client]
+        if everything:
+            sub.all = False
+            self._all.discard(client)
+            patrol_ids, units, bboxes = sub.patrol_ids, sub.units, sub.bboxes
+        self._remove_filters(client, sub, set(patrol_ids), set(units), set(bboxes))
+        return sub
+
+    def _remove_filters(
+        self, client: Hashable, sub: ClientSubscription, patrol_ids: Set[int], units: Set[str], bboxes: Set[BBox]
+    ) -> None:
+        for key, index in ((patrol_ids & sub.patrol_ids, self._by_patrol), (units & sub.units, self._by_unit)):
+            for value in key:
+                members = index.get(value)
+                if members is not None:
+                    members.discard(client)
+                    if not members:
+                        del index[value]
+        for bbox in bboxes & sub.bboxes:
+            cells = self._cells(bbox)
+            if cells is None:
+                self._large_bboxes.discard((client, bbox))
+            for cell in cells or ():
+                members = self._by_cell.get(cell)
+                if members is not None:
+                    members.discard((client, bbox))
+                    if not members:
+                        del self._by_cell[cell]
+        sub.patrol_ids = sub.patrol_ids - patrol_ids
+        sub.units = sub.units - units
+        sub.bboxes = sub.bboxes - bboxes
+
+    def match(
+        self,
+        patrol_id: Optional[int] = None,
+        unit: Optional[str] = None,
+        location: Optional[Tuple[float, float]] = None,
+    ) -> Set[Hashable]:
+        """Return the clients interested in a message about the given patrol."""
+        targets = set(self._all)
+        if patrol_id is not None:
+            targets.update(self._by_patrol.get(patrol_id, ()))
+        if unit is not None:
+            targets.update(self._by_unit.get(unit, ()))
+        if location is not None:
+            cell = (math.floor(location[0] / self.cell_deg), math.floor(location[1] / self.cell_deg))
+            for client, bbox in self._by_cell.get(cell, ()):
+                if _contains(bbox, location):
+                    targets.add(client)
+            for client, bbox in self._large_bboxes:
+                if _contains(bbox, location):
+                    targets.add(client)
+        return targets
@@ -0,0 +1,23 @@
+"""
+Conversions between datetimes and epoch seconds.
+
+Timestamps in this backend are naive UTC datetimes (``datetime.utcnow``),
+while clients may send timezone-aware values. Converting both to epoch
+seconds gives indexes a single comparable key.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: datetime) -> float:
+    """Return seconds since the epoch, treating naive datetimes as UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+def from_epoch(seconds: float) -> datetime:
+    """Return a naive UTC datetime for seconds since the epoch."""
+    return _EPOCH + timedelta(seconds=seconds)
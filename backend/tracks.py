@@ -0,0 +1,194 @@
+"""
+Compact per-patrol track history.
+
+Each patrol's fixes are kept in three ``array('d')`` columns (epoch
+seconds, latitude, longitude) rather than one object per fix, costing
+24 bytes per fix. A track grows until it reaches ``TRACK_CAPACITY``
+fixes and then behaves as a ring buffer, overwriting its oldest fixes,
+so memory per patrol is bounded.
+
+Queries select a time window by bisection and can simplify the result
+with the Douglas-Peucker algorithm, which keeps replay of long patrols
+cheap for dashboards.
+"""
+
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .startup import lazy_import
+from .timeutils import from_epoch, to_epoch
+
+np = lazy_import("numpy")
+
+
+# Maximum number of fixes retained per patrol
+TRACK_CAPACITY = int(os.getenv("TRACK_CAPACITY", "100000"))
+
+
+class _Column:
+    """Chronological read-only view over a ring-buffered column, usable with bisect."""
+
+    def __init__(self, track: "Track", data: array) -> None:
+        self.track = track
+        self.data = data
+
+    def __len__(self) -> int:
+        return self.track.size
+
+    def __getitem__(self, i: int) -> float:
+        return self.data[(self.track.start + i) % len(self.data)]
+
+
+class Track:
+    """Columnar ring buffer of fixes for one patrol."""
+
+    __slots__ = ("capacity", "times", "lats", "lons", "start", "size", "_ordered")
+
+    def __init__(self, capacity: int = TRACK_CAPACITY) -> None:
+        self.capacity = capacity
+        self.times = array("d")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.start = 0
+        self.size = 0
+        self._ordered = True
+
+    def append(self, seconds: float, lat: float, lon: float) -> None:
+        if self.size and self.times[(self.start + self.size - 1) % len(self.times)] > seconds:
+            # Late fix, e.g. flushed by a gateway after a dropout; sorted on next read
+            self._ordered = False
+        if len(self.times) < self.capacity:
+            self.times.append(seconds)
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self.size += 1
+            return
+        # Full: overwrite the oldest fix
+        self.times[self.start] = seconds
+        self.lats[self.start] = lat
+        self.lons[self.start] = lon
+        self.start = (self.start + 1) % self.capacity
+
+    def last(self) -> Optional[Tuple[float, float, float]]:
+        if not self.size:
+            return None
+        i = (self.start + self.size - 1) % len(self.times)
+        return self.times[i], self.lats[i], self.lons[i]
+
+    def _sort(self) -> None:
+        """Restore chronological order after late fixes."""
+        order = np.argsort(self._chronological(self.times), kind="stable")
+        for column in (self.times, self.lats, self.lons):
+            values = self._chronological(column)[order]
+            column[:] = array("d", values.tobytes())
+        self.start = 0
+        self._ordered = True
+
+    def _chronological(self, column: array, lo: int = 0, hi: Optional[int] = None) -> "np.ndarray":
+        """Copy logical positions lo..hi of a column out in chronological order."""
+        hi = self.size if hi is None else hi
+        # Always copy: a live buffer view would stop the array from growing
+        data = np.frombuffer(column, dtype=np.float64)
+        if self.start == 0:
+            return data[lo:hi].copy()
+        return data[(self.start + np.arange(lo, hi)) % len(column)]
+
+    def window(self, since: Optional[float], until: Optional[float]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Return (times, lats, lons) for fixes with since <= time <= until."""
+        if not self._ordered:
+            self._sort()
+        times = _Column(self, self.times)
+        lo = 0 if since is None else bisect_left(times, since)
+        hi = self.size if until is None else bisect_right(times, until)
+        return tuple(self._chronological(column, lo, hi) for column in (self.times, self.lats, self.lons))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(column) for column in (self.times, self.lats, self.lons))
+
+
+def douglas_peucker(lats: "np.ndarray", lons: "np.ndarray", tolerance: float) -> "np.ndarray":
+    """Return the indices of the points kept when simplifying a polyline.
+
+    ``tolerance`` is the maximum distance, in degrees, between a dropped
+    point and the simplified line.
+    """
+    n = len(lats)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay, bx, by = lats[first], lons[first], lats[last], lons[last]
+        px, py = lats[first + 1:last], lons[first + 1:last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0.0:
+            distances = np.hypot(px - ax, py - ay)
+        else:
+            t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+            distances = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+class TrackStore:
+    def __init__(self, capacity: int = TRACK_CAPACITY) -> None:
+        self.capacity = capacity
+        self.tracks: Dict[int, Track] = {}
+
+    def record(self, patrol_id: int, timestamp: datetime, location: Tuple[float, float]) -> None:
+        """Append a fix, ignoring repeats of the most recent one."""
+        track = self.tracks.get(patrol_id)
+        if track is None:
+            track = self.tracks[patrol_id] = Track(self.capacity)
+        fix = (to_epoch(timestamp), location[0], location[1])
+        if track.last() != fix:
+            track.append(*fix)
+
+    def query(
+        self,
+        patrol_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        tolerance: float = 0.0,
+    ) -> Tuple[int, List[datetime], List[Tuple[float, float]]]:
+        """Return (fixes in window, timestamps, points) after simplification."""
+        track = self.tracks.get(patrol_id)
+        if track is None:
+            return 0, [], []
+        times, lats, lons = track.window(
+            None if since is None else to_epoch(since), None if until is None else to_epoch(until)
+        )
+        kept = douglas_peucker(lats, lons, tolerance)
+        timestamps = [from_epoch(t) for t in times[kept].tolist()]
+        points = list(zip(lats[kept].tolist(), lons[kept].tolist()))
+        return len(times), timestamps, points
+
+    def stats(self) -> dict:
+        """Report fix counts and memory use across all tracks."""
+        fixes = sum(track.size for track in self.tracks.values())
+        nbytes = sum(track.nbytes for track in self.tracks.values())
+        return {
+            "patrols": len(self.tracks),
+            "fixes": fixes,
+            "capacity_per_patrol": self.capacity,
+            "bytes": nbytes,
+            "bytes_per_million_fixes": round(nbytes / fixes * 1_000_000) if fixes else 0,
+        }
+
+
+track_store = TrackStore()
\ No newline at end of file
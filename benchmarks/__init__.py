@@ -0,0 +1,9 @@
+"""
+Local performance benchmarks for the backend.
+
+Every scenario runs against ``backend.main:app`` in-process with fixed
+seeds and fixed operation counts, so numbers from two runs on the same
+machine are comparable. Run the whole suite with ``python -m benchmarks``
+from the repository root, or one scenario with
+``python -m benchmarks.<module>``.
+"""
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Run the benchmark suite.
+
+Each scenario runs in its own interpreter so that state left behind by
+one (store contents, caches, peak RSS) cannot skew the next. Results are
+printed as one table and can be saved as JSON for comparison with a
+later run.
+
+Usage: python -m benchmarks [scenario ...] [--quick] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+from .common import environment, print_rows
+
+SCENARIOS = {
+    "ingest": "benchmarks.bench_ingest",
+    "geofence": "benchmarks.bench_geofence",
+    "lists": "benchmarks.bench_lists",
+    "brief": "benchmarks.bench_pdf_report",
+    "startup": "benchmarks.bench_startup",
+}
+
+
+def _run_child(module: str, quick: bool) -> None:
+    rows = importlib.import_module(module).run(quick)
+    print(json.dumps(rows))
+
+
+def _compare(rows: List[Dict], baseline: List[Dict]) -> None:
+    """Print the p50 and p99 change of every row also present in ``baseline``."""
+    previous = {(row["scenario"], row["name"]): row for row in baseline}
+    print("\nchange vs baseline (positive is slower)")
+    for row in rows:
+        old = previous.get((row["scenario"], row["name"]))
+        if old is None or "p50_ms" not in row or not old.get("p50_ms"):
+            continue
+        deltas = [
+            f"{key} {100 * (row[key] - old[key]) / old[key]:+.1f}%"
+            for key in ("p50_ms", "p99_ms") if old.get(key)
+        ]
+        print(f"  {row['scenario']:<9} {row['name']:<50} " + "  ".join(deltas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the backend benchmark suite")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--output", help="write results and environment as JSON to this file")
+    parser.add_argument("--compare", help="JSON file from an earlier --output run to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args.child, args.quick)
+        return
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    rows: List[Dict] = []
+    for name in args.scenarios or list(SCENARIOS):
+        command = [sys.executable, "-m", "benchmarks", "--child", SCENARIOS[name]] + (["--quick"] if args.quick else [])
+        print(f"running {name}...", file=sys.stderr)
+        out = subprocess.run(command, check=True, capture_output=True, text=True)
+        rows.extend(json.loads(out.stdout.strip().splitlines()[-1]))
+    print_rows(rows)
+
+    if args.compare:
+        with open(args.compare) as f:
+            _compare(rows, json.load(f)["results"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "quick": args.quick, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
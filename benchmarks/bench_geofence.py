@@ -0,0 +1,83 @@
+"""
+Geofence containment and route adherence with large shapes.
+
+Builds many large polygons and a long route from a fixed seed, then
+times per-point checks through the vectorised geofence engine and the
+route index against the plain reference implementations.
+
+Usage: python -m benchmarks.bench_geofence [--quick] [--json]
+"""
+
+import math
+import random
+from typing import Dict, List, Tuple
+
+from .common import SEED, measure, no_gc, scenario_main, summarise
+
+
+def star_polygon(rng: random.Random, center: Tuple[float, float], radius: float, vertices: int) -> List[Tuple[float, float]]:
+    """Return a jagged star-shaped polygon around ``center``."""
+    return [
+        (
+            center[0] + radius * rng.uniform(0.5, 1.0) * math.cos(2 * math.pi * i / vertices),
+            center[1] + radius * rng.uniform(0.5, 1.0) * math.sin(2 * math.pi * i / vertices),
+        )
+        for i in range(vertices)
+    ]
+
+
+def random_walk(rng: random.Random, start: Tuple[float, float], steps: int, step: float) -> List[Tuple[float, float]]:
+    route = [start]
+    heading = 0.0
+    for _ in range(steps - 1):
+        heading += rng.uniform(-0.6, 0.6)
+        lat, lon = route[-1]
+        route.append((lat + step * math.cos(heading), lon + step * math.sin(heading)))
+    return route
+
+
+def run(quick: bool) -> List[Dict]:
+    from backend.geofence import RouteIndex, is_on_route, point_in_polygon
+    from backend.geofence_engine import GeofenceEngine
+
+    fences, vertices, route_len, points = (20, 500, 2000, 2000) if quick else (100, 5000, 20000, 20000)
+    rng = random.Random(SEED)
+    polygons = {
+        f"fence-{i}": star_polygon(rng, (23.5 + rng.uniform(0, 1), 90.0 + rng.uniform(0, 1)), rng.uniform(0.02, 0.2), vertices)
+        for i in range(fences)
+    }
+    engine = GeofenceEngine()
+    for name, polygon in polygons.items():
+        engine.set_fence(name, polygon)
+    probes = [(23.5 + rng.uniform(-0.1, 1.1), 90.0 + rng.uniform(-0.1, 1.1)) for _ in range(points)]
+
+    route = random_walk(rng, (23.7, 90.4), route_len, 0.0004)
+    # Fixes that follow the route in order with jitter, like a real patrol
+    walk = [route[i * route_len // points] for i in range(points)]
+    fixes = [(lat + rng.uniform(-0.0006, 0.0006), lon + rng.uniform(-0.0006, 0.0006)) for lat, lon in walk]
+    index = RouteIndex(route)
+
+    rows = []
+    with no_gc():
+        rows.append(summarise(
+            "geofence", f"engine.containing fences={fences} vertices={vertices}",
+            measure(lambda i: engine.containing(probes[i]), points, warmup=100),
+        ))
+        reference_points = points // 20
+        rows.append(summarise(
+            "geofence", f"point_in_polygon loop fences={fences} vertices={vertices}",
+            measure(lambda i: [n for n, poly in polygons.items() if point_in_polygon(probes[i], poly)], reference_points),
+        ))
+        rows.append(summarise(
+            "geofence", f"RouteIndex.is_on_route vertices={route_len}",
+            measure(lambda i: index.is_on_route(fixes[i]), points, warmup=100),
+        ))
+        rows.append(summarise(
+            "geofence", f"is_on_route reference vertices={route_len}",
+            measure(lambda i: is_on_route(fixes[i], route), reference_points),
+        ))
+    return rows
+
+
+if __name__ == "__main__":
+    scenario_main(run, "Geofence containment and route adherence with large shapes")
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Sustained location ingest with WebSocket subscribers.
+
+Creates N patrols on a shared route, connects M subscribers to ``/ws``
+and posts location fixes to ``/patrols/{id}/update`` one at a time.
+Reports the latency of each update request, and the time until every
+subscriber has received every resulting location update.
+
+Usage: python -m benchmarks.bench_ingest [--quick] [--json]
+"""
+
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack
+from typing import Dict, List
+
+from .common import SEED, auth_headers, auth_token, measure, no_gc, scenario_main, summarise, wait_ready
+
+
+def _drain(ws, expected: int, received: List[int], index: int) -> None:
+    count = 0
+    while count < expected:
+        message = json.loads(ws.receive_text())
+        if message.get("type") == "snapshot":
+            continue
+        count += len(message["messages"]) if message.get("type") in ("batch", "tick") else 1
+    received[index] = count
+
+
+def run(quick: bool) -> List[Dict]:
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    patrols, subscribers, updates = (50, 4, 1000) if quick else (500, 16, 5000)
+    rng = random.Random(SEED)
+    route = [(23.70 + 0.001 * i, 90.40 + 0.0005 * (i % 7)) for i in range(200)]
+    headers = auth_headers()
+    rows = []
+    with TestClient(app) as client, ExitStack() as sockets:
+        wait_ready(client)
+        ids = [
+            client.post(
+                "/patrols/create",
+                json={"unit": f"{i % 20} EB", "route_name": "R1", "route": route},
+                headers=headers,
+            ).json()["id"]
+            for i in range(patrols)
+        ]
+        fixes = []
+        for i in range(updates):
+            lat, lon = route[rng.randrange(len(route))]
+            fixes.append((ids[i % patrols], lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.001, 0.001)))
+
+        token = auth_token()
+        websockets = [sockets.enter_context(client.websocket_connect(f"/ws?token={token}")) for _ in range(subscribers)]
+        received = [0] * subscribers
+        drainers = [
+            threading.Thread(target=_drain, args=(ws, updates, received, i), daemon=True)
+            for i, ws in enumerate(websockets)
+        ]
+        for thread in drainers:
+            thread.start()
+
+        def update(i: int) -> None:
+            patrol_id, lat, lon = fixes[i]
+            response = client.post(f"/patrols/{patrol_id}/update", json={"latitude": lat, "longitude": lon}, headers=headers)
+            assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        with no_gc():
+            samples = measure(update, updates)
+        ingest_done = time.perf_counter()
+        for thread in drainers:
+            thread.join(timeout=60)
+        delivered = time.perf_counter()
+
+        rows.append(summarise(
+            "ingest", f"update_patrol n={patrols} subs={subscribers}", samples, ingest_done - started,
+        ))
+        fanout = sum(received)
+        rows.append({
+            "scenario": "ingest",
+            "name": "fan-out delivery",
+            "ops": fanout,
+            "ops_per_sec": round(fanout / (delivered - started), 1),
+            "complete": fanout == updates * subscribers,
+            "drain_after_ingest_ms": round((delivered - ingest_done) * 1000, 1),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    scenario_main(run, "Sustained update_patrol ingest with WebSocket subscribers")
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+List endpoints at large store sizes.
+
+Fills the patrol, incident and geofence stores from a fixed seed and
+times full list requests, conditional requests answered with 304, paged
+incident queries, keyword search and the change feed.
+
+Usage: python -m benchmarks.bench_lists [--quick] [--json]
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .common import SEED, auth_headers, measure, no_gc, scenario_main, summarise, wait_ready
+
+
+def populate(patrol_count: int, incident_count: int, geofence_count: int, rng: random.Random) -> None:
+    """Write synthetic entities straight into the stores."""
+    from backend.models import Geofence, Incident, Patrol
+    from backend.routers.geofence import geofence_db
+    from backend.routers.incidents import incidents_db
+    from backend.routers.patrols import patrols_db
+
+    base = datetime(2025, 1, 1)
+    route = [(23.7 + 0.001 * i, 90.4) for i in range(50)]
+    for _ in range(patrol_count):
+        pid = patrols_db.allocate_id()
+        patrols_db.put(pid, Patrol(
+            id=pid, unit=f"{pid % 20} EB", route_name="R1", route=route,
+            current_location=route[rng.randrange(len(route))], last_update=base, on_track=True,
+        ))
+    for i in range(incident_count):
+        iid = incidents_db.allocate_id()
+        incidents_db.put(iid, Incident(
+            id=iid, camp=f"Camp {rng.randrange(8)}", dtg=base + timedelta(minutes=i), subject="Routine check",
+            location=(23.7 + rng.random(), 90.4 + rng.random()),
+            incident_in_brief=["observed movement near the gate", "no further action"],
+            follow_up=None, reporter=f"user{rng.randrange(50)}",
+        ))
+    for i in range(geofence_count):
+        lat, lon = 23.5 + rng.random(), 90.0 + rng.random()
+        geofence_db.put(f"zone-{i}", Geofence(
+            name=f"zone-{i}", points=[(lat, lon), (lat + 0.01, lon), (lat + 0.01, lon + 0.01), (lat, lon + 0.01)],
+        ))
+
+
+def run(quick: bool) -> List[Dict]:
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+    from backend.store import current_version, version_token
+
+    patrol_count, incident_count, geofence_count, requests = (1000, 5000, 50, 50) if quick else (5000, 100000, 500, 200)
+    populate(patrol_count, incident_count, geofence_count, random.Random(SEED))
+    headers = auth_headers()
+    rows = []
+    with TestClient(app) as client:
+        wait_ready(client)
+        def get(url: str, extra: Dict[str, str] = None, expect: int = 200):
+            response = client.get(url, headers={**headers, **(extra or {})})
+            assert response.status_code == expect, (url, response.status_code)
+            return response
+
+        etags = {url: get(url).headers["etag"] for url in ("/patrols/", "/incidents/", "/geofences/")}
+        since = version_token(current_version() - patrol_count // 10)
+        with no_gc():
+            rows.append(summarise("lists", f"GET /patrols/ n={patrol_count}", measure(lambda i: get("/patrols/"), requests, warmup=2)))
+            rows.append(summarise("lists", "GET /patrols/ If-None-Match", measure(
+                lambda i: get("/patrols/", {"If-None-Match": etags["/patrols/"]}, 304), requests)))
+            rows.append(summarise("lists", f"GET /incidents/ page=500 n={incident_count}", measure(
+                lambda i: get("/incidents/?limit=500"), requests, warmup=2)))
+            rows.append(summarise("lists", f"GET /incidents/ camp filter n={incident_count}", measure(
+                lambda i: get(f"/incidents/?camp=Camp%20{i % 8}&limit=500"), requests, warmup=8)))
+            rows.append(summarise("lists", f"GET /incidents/search n={incident_count}", measure(
+                lambda i: get(f"/incidents/search?q=movement%20gat&limit=50"), requests, warmup=2)))
+            rows.append(summarise("lists", f"GET /geofences/ n={geofence_count}", measure(lambda i: get("/geofences/"), requests, warmup=2)))
+            rows.append(summarise("lists", "GET /changes since=recent", measure(lambda i: get(f"/changes?since={since}"), requests, warmup=2)))
+    return rows
+
+
+if __name__ == "__main__":
+    scenario_main(run, "List endpoints at large store sizes")
\ No newline at end of file
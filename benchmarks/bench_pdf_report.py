@@ -0,0 +1,141 @@
+"""
+Benchmark commander brief rendering for very large briefs.
+
+Renders a brief of synthetic incidents in each layout and reports wall
+time, output size and peak resident set size. Every layout runs in its
+own subprocess so the peak RSS of one run does not mask another.
+The benchmark suite uses :func:`run` instead, which reports render
+latency percentiles for a typical and a very large brief.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_pdf_report [--incidents 10000] [--patrols 200] [--layouts table detailed]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from backend.models import Incident, Patrol
+
+SEED = 13
+
+
+def synthetic_data(incident_count: int, patrol_count: int, seed: int = SEED) -> Tuple[List[Incident], List[Patrol]]:
+    """Return reproducible incidents and patrols for the benchmark."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    camps = [f"Camp {c}" for c in "ABCDEFGH"]
+    words = "patrol observed vehicle crowd checkpoint report suspicious movement road market gate".split()
+    incidents = [
+        Incident(
+            id=i + 1,
+            camp=rng.choice(camps),
+            dtg=base + timedelta(minutes=5 * i),
+            subject=" ".join(rng.choices(words, k=3)),
+            location=(rng.uniform(-1, 1), rng.uniform(30, 32)),
+            incident_in_brief=[" ".join(rng.choices(words, k=rng.randint(6, 16))) for _ in range(rng.randint(1, 4))],
+            follow_up=" ".join(rng.choices(words, k=5)) if rng.random() < 0.5 else None,
+            reporter=f"user{rng.randint(1, 50)}",
+        )
+        for i in range(incident_count)
+    ]
+    patrols = [
+        Patrol(
+            id=i + 1,
+            unit=f"Unit {i % 20}",
+            route_name=f"Route {i % 12}",
+            route=[(0.0, 31.0), (0.01, 31.01)],
+            last_update=base + timedelta(minutes=i),
+            on_track=rng.random() < 0.8,
+        )
+        for i in range(patrol_count)
+    ]
+    return incidents, patrols
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(layout: str, incident_count: int, patrol_count: int) -> dict:
+    """Render one brief in this process and return its measurements."""
+    from backend.pdf_report import generate_commander_brief
+
+    incidents, patrols = synthetic_data(incident_count, patrol_count)
+    baseline = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "brief.pdf")
+        t0 = time.perf_counter()
+        generate_commander_brief(path, incidents[0].dtg, incidents[-1].dtg, incidents, patrols, layout=layout)
+        elapsed = time.perf_counter() - t0
+        size = os.path.getsize(path)
+    return {
+        "layout": layout,
+        "incidents": incident_count,
+        "patrols": patrol_count,
+        "seconds": round(elapsed, 3),
+        "pdf_mb": round(size / (1024 * 1024), 2),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run(quick: bool) -> List[Dict]:
+    """Render typical and very large briefs repeatedly and summarise their latency."""
+    from backend.pdf_report import generate_commander_brief
+
+    from .common import measure, summarise
+
+    cases = [("detailed", 200, 3 if quick else 10), ("table", 2000 if quick else 10000, 2 if quick else 3)]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "brief.pdf")
+        for layout, incident_count, renders in cases:
+            incidents, patrols = synthetic_data(incident_count, 200)
+
+            def render(i: int) -> None:
+                generate_commander_brief(path, incidents[0].dtg, incidents[-1].dtg, incidents, patrols, layout=layout)
+
+            rows.append(summarise(
+                "brief", f"{layout} incidents={incident_count}", measure(render, renders, warmup=1),
+                peak_rss_mb=round(_peak_rss_mb(), 1),
+            ))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--incidents", type=int, default=10000)
+    parser.add_argument("--patrols", type=int, default=200)
+    parser.add_argument("--layouts", nargs="+", default=["table", "detailed"], choices=["table", "detailed"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_once(args.child, args.incidents, args.patrols)))
+        return
+
+    print(f"{'layout':<10} {'incidents':>9} {'seconds':>9} {'pdf MB':>8} {'base RSS MB':>12} {'peak RSS MB':>12}")
+    for layout in args.layouts:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pdf_report", "--child", layout,
+             "--incidents", str(args.incidents), "--patrols", str(args.patrols)],
+            check=True, capture_output=True, text=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['layout']:<10} {r['incidents']:>9} {r['seconds']:>9} {r['pdf_mb']:>8} {r['baseline_rss_mb']:>12} {r['peak_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Worker cold start.
+
+Starts fresh interpreters that import ``backend.main``, run the app's
+startup and wait for ``/ready``, once with warm-up enabled and once
+without. Every sample is a new process, so nothing is imported or cached
+beforehand.
+
+Usage: python -m benchmarks.bench_startup [--quick] [--json]
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from .common import scenario_main, summarise
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in each child; the test client is imported after the app so that it
+# does not pre-load FastAPI and its time is left out of the ready figure
+CHILD = """
+import json, time
+started = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter() - started
+from fastapi.testclient import TestClient
+from benchmarks.common import wait_ready
+with TestClient(app) as client:
+    entered = time.perf_counter()
+    wait_ready(client, timeout=120)
+    ready = imported + time.perf_counter() - entered
+print(json.dumps({"import": imported, "ready": ready}))
+"""
+
+
+def start_once(warmup: bool) -> Dict[str, float]:
+    """Start the app in a new interpreter and return its import and ready times in seconds."""
+    env = {**os.environ, "STARTUP_WARMUP": "1" if warmup else "0", "PYTHONWARNINGS": "ignore"}
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(quick: bool) -> List[Dict]:
+    """Time cold imports and time to ready with and without warm-up."""
+    starts = 3 if quick else 10
+    imports: List[float] = []
+    rows = []
+    for warmup in (False, True):
+        samples = [start_once(warmup) for _ in range(starts)]
+        imports.extend(sample["import"] for sample in samples)
+        label = "on" if warmup else "off"
+        rows.append(summarise("startup", f"ready, warm-up {label}", [sample["ready"] for sample in samples]))
+    rows.insert(0, summarise("startup", "import backend.main", imports))
+    return rows
+
+
+if __name__ == "__main__":
+    scenario_main(run, __doc__.strip().splitlines()[0])
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Shared helpers for the benchmark scenarios.
+
+Each scenario measures the latency of individual operations, summarises
+them as throughput and p50/p95/p99, and prints one table row per
+measurement. With ``--json`` the rows are also printed as a JSON list on
+the last line so the suite runner can collect them.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+SEED = 17
+
+# Keep the app quiet and deterministic: no persistence, no external bus
+os.environ.pop("EVENT_LOG_DIR", None)
+os.environ.pop("EVENT_BUS_URL", None)
+warnings.filterwarnings("ignore")
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Return the ``q`` quantile (0-1) of already sorted samples, by nearest rank."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarise(scenario: str, name: str, samples: List[float], elapsed: Optional[float] = None, **extra) -> Dict:
+    """Summarise per-operation latencies in seconds as one result row."""
+    ordered = sorted(samples)
+    elapsed = sum(samples) if elapsed is None else elapsed
+    row = {
+        "scenario": scenario,
+        "name": name,
+        "ops": len(samples),
+        "ops_per_sec": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+    }
+    row.update(extra)
+    return row
+
+
+def measure(operation: Callable[[int], object], count: int, warmup: int = 0) -> List[float]:
+    """Call ``operation(i)`` ``count`` times and return each call's latency in seconds."""
+    for i in range(warmup):
+        operation(i)
+    samples = []
+    clock = time.perf_counter
+    for i in range(count):
+        t0 = clock()
+        operation(i)
+        samples.append(clock() - t0)
+    return samples
+
+
+@contextmanager
+def no_gc() -> Iterator[None]:
+    """Disable the cyclic collector while measuring so pauses do not land at random."""
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def auth_token(role: str = "super_admin", username: str = "admin") -> str:
+    from backend.dependencies import create_access_token
+
+    return create_access_token({"sub": username, "role": role})
+
+
+def auth_headers(role: str = "super_admin", username: str = "admin") -> Dict[str, str]:
+    return {"Authorization": f"Bearer {auth_token(role, username)}"}
+
+
+def wait_ready(client, timeout: float = 60.0) -> None:
+    """Block until the app has finished warming up so it does not compete with measurements."""
+    deadline = time.perf_counter() + timeout
+    while client.get("/ready").status_code != 200:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("App did not become ready")
+        time.sleep(0.05)
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "platform": sys.platform}
+
+
+def print_rows(rows: List[Dict]) -> None:
+    """Print result rows as an aligned table."""
+    columns = ["scenario", "name", "ops", "ops_per_sec", "p50_ms", "p95_ms", "p99_ms"]
+    extra = sorted({key for row in rows for key in row} - set(columns))
+    widths = {c: max(len(c), *(len(str(row.get(c, ""))) for row in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns) + ("  extra" if extra else ""))
+    for row in rows:
+        line = "  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns)
+        notes = ", ".join(f"{k}={row[k]}" for k in extra if k in row)
+        print(line + ("  " + notes if notes else ""))
+
+
+def scenario_main(run: Callable[[bool], List[Dict]], description: str) -> None:
+    """Command line entry point shared by the scenario modules."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--json", action="store_true", help="also print the rows as JSON on the last line")
+    args = parser.parse_args()
+    rows = run(args.quick)
+    print_rows(rows)
+    if args.json:
+        print(json.dumps(rows))
\ No newline at end of file
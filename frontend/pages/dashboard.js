@@ -22,51 +22,81 @@ export default function Dashboard() {
 
   useEffect(() => {
     if (!token) return;
-    fetchPatrols();
     fetchIncidents();
-    // Open WebSocket connection for real-time updates
-    const wsUrl = apiBase.replace(/^http/, 'ws') + '/ws';
-    const ws = new WebSocket(wsUrl);
-    ws.onmessage = (event) => {
-      try {
-        const msg = JSON.parse(event.data);
-        setMessages((prev) => [...prev, msg]);
-        // Update patrols list if message refers to patrol
-        if (msg.type === 'location_update') {
+    // Open WebSocket connection for real-time updates. The server sends a snapshot of
+    // all patrols on connect; after a drop we reconnect with the last seq seen and
+    // receive only the messages that were missed.
+    let ws;
+    let lastSeq = null;
+    let closed = false;
+    let retryTimer;
+    const connect = () => {
+      let wsUrl = apiBase.replace(/^http/, 'ws') + '/ws?token=' + encodeURIComponent(token);
+      if (lastSeq !== null) wsUrl += '&resume_from=' + lastSeq;
+      ws = new WebSocket(wsUrl);
+      ws.onmessage = (event) => {
+        try {
+          const msg = JSON.parse(event.data);
+          if (msg.type === 'snapshot') {
+            lastSeq = msg.seq;
+            setPatrols(msg.patrols);
+            return;
+          }
+          // Bulk updates and replays arrive as a single frame; conflated ticks carry only changed fields
+          const batch = ['batch', 'tick', 'replay'].includes(msg.type) ? msg.messages : [msg];
+          const seqs = [msg.seq, ...batch.map((m) => m.seq)].filter((s) => typeof s === 'number');
+          if (seqs.length) lastSeq = Math.max(lastSeq ?? 0, ...seqs);
+          setMessages((prev) => [...prev, ...batch]);
+          // Update patrols list for messages that refer to a patrol
+          const locations = {};
+          batch.forEach((m) => {
+            if (m.type === 'location_update' || m.type === 'route_update' || msg.type === 'tick') {
+              locations[m.patrol_id] = { ...locations[m.patrol_id], ...m };
+            }
+          });
           setPatrols((prev) =>
-            prev.map((p) =>
-              p.id === msg.patrol_id
-                ? { ...p, current_location: msg.location, last_update: msg.timestamp, on_track: msg.on_track }
-                : p
-            )
+            prev.map((p) => {
+              const m = locations[p.id];
+              if (!m) return p;
+              return {
+                ...p,
+                ...('location' in m && { current_location: m.location }),
+                ...('timestamp' in m && { last_update: m.timestamp }),
+                ...('on_track' in m && { on_track: m.on_track }),
+                ...('route' in m && { route: m.route, route_name: m.route_name }),
+              };
+            })
           );
+        } catch (err) {
+          console.error(err);
         }
-      } catch (err) {
-        console.error(err);
-      }
+      };
+      ws.onclose = () => {
+        if (!closed) retryTimer = setTimeout(connect, 1000 + Math.random() * 2000);
+      };
     };
+    connect();
     return () => {
+      closed = true;
+      clearTimeout(retryTimer);
       ws.close();
     };
   }, [token]);
 
-  const fetchPatrols = async () => {
-    try {
-      const res = await axios.get(`${apiBase}/patrols/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setPatrols(res.data);
-    } catch (err) {
-      console.error(err);
-    }
-  };
-
   const fetchIncidents = async () => {
     try {
-      const res = await axios.get(`${apiBase}/incidents/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setIncidents(res.data);
+      // The list is paged; follow X-Next-Cursor until the last page
+      let all = [];
+      let cursor = null;
+      do {
+        const res = await axios.get(`${apiBase}/incidents/`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { limit: 5000, ...(cursor && { cursor }) },
+        });
+        all = all.concat(res.data);
+        cursor = res.headers['x-next-cursor'];
+      } while (cursor);
+      setIncidents(all);
     } catch (err) {
       console.error(err);
     }
@@ -0,0 +1,89 @@
+import os
+from typing import Optional, Tuple
+
+import pytest
+from pydantic import BaseModel
+
+from backend.eventlog import EventLog
+from backend.store import Store, stores
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    location: Optional[Tuple[float, float]] = None
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    yield str(tmp_path)
+    stores.pop("items", None)
+
+
+def _write(directory: str, writes, **options) -> EventLog:
+    """Log ``writes`` of (key, item, fields) to a fresh store and close the log."""
+    store = Store("items", Item)
+    log = EventLog(directory, commit_interval=0.001, **options)
+    log.recover()
+    log.attach()
+    for key, item, fields in writes:
+        store.put(key, item, fields=fields)
+    log.close()
+    return log
+
+
+def _recover(directory: str) -> Tuple[Store, dict]:
+    store = Store("items", Item)
+    return store, EventLog(directory).recover()
+
+
+def _segments(directory: str):
+    return sorted(name for name in os.listdir(directory) if name.startswith("segment-"))
+
+
+def test_recover_replays_full_and_partial_writes(log_dir):
+    moved = Item(id=1, name="alpha", location=(1.0, 2.0))
+    _write(log_dir, [
+        (1, Item(id=1, name="alpha"), None),
+        (2, Item(id=2, name="bravo"), None),
+        (1, moved, ("location",)),
+    ])
+    store, recovery = _recover(log_dir)
+    assert recovery["replayed_records"] == 3
+    assert store[1] == moved
+    assert store[2] == Item(id=2, name="bravo")
+
+
+def test_recover_drops_torn_final_record(log_dir):
+    _write(log_dir, [(1, Item(id=1, name="alpha"), None), (2, Item(id=2, name="bravo"), None)])
+    path = os.path.join(log_dir, _segments(log_dir)[-1])
+    intact_size = os.path.getsize(path)
+    with open(path, "a") as fh:
+        fh.write('{"n": 3, "s": "items", "k": 3, "v": {"id": 3, "na')
+    store, recovery = _recover(log_dir)
+    assert recovery["replayed_records"] == 2
+    assert sorted(store) == [1, 2]
+    # The torn tail is truncated so later appends stay readable
+    assert os.path.getsize(path) == intact_size
+
+
+def test_writes_after_torn_tail_repair_are_recovered(log_dir):
+    _write(log_dir, [(1, Item(id=1, name="alpha"), None)])
+    with open(os.path.join(log_dir, _segments(log_dir)[-1]), "a") as fh:
+        fh.write('{"n": 2, "s": "ite')
+    _write(log_dir, [(2, Item(id=2, name="bravo"), None)])
+    store, recovery = _recover(log_dir)
+    assert sorted(store) == [1, 2]
+    assert recovery["replayed_records"] == 2
+
+
+def test_recover_from_snapshot_merges_partial_writes(log_dir):
+    writes = [(1, Item(id=1, name="alpha"), None)]
+    writes += [(1, Item(id=1, name="alpha", location=(float(i), 0.0)), ("location",)) for i in range(50)]
+    # Small segments so compaction folds most of the log into a snapshot
+    log = _write(log_dir, writes, segment_max_bytes=500, snapshot_every=10)
+    assert log.stats()["snapshots_written"] >= 1
+    assert any(name.startswith("snapshot-") for name in os.listdir(log_dir))
+    store, recovery = _recover(log_dir)
+    assert recovery["snapshot_entities"] == 1
+    assert store[1] == Item(id=1, name="alpha", location=(49.0, 0.0))
\ No newline at end of file
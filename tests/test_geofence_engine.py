@@ -0,0 +1,88 @@
+import math
+import random
+
+import numpy as np
+
+from backend.geofence import point_in_polygon
+from backend.geofence_engine import GeofenceEngine, containing_batch
+
+
+def _star(rng, centre, points):
+    """Return a random concave star-shaped polygon."""
+    cx, cy = centre
+    polygon = []
+    for i in range(points):
+        angle = 2 * math.pi * i / points
+        radius = rng.uniform(0.2, 1.0) if i % 2 else rng.uniform(1.0, 2.0)
+        polygon.append((cx + radius * math.cos(angle), cy + radius * math.sin(angle)))
+    return polygon
+
+
+def _lattice(rng, centre, points):
+    """Return a random concave polygon whose vertices sit on a quarter-degree lattice."""
+    cx, cy = centre
+    polygon = []
+    for i in range(points):
+        angle = 2 * math.pi * i / points
+        radius = rng.choice((1, 2, 3, 4)) if i % 2 else rng.choice((6, 7, 8))
+        polygon.append((cx + round(radius * math.cos(angle)) / 4, cy + round(radius * math.sin(angle)) / 4))
+    return polygon
+
+
+def _touching(centre):
+    """Return a ring of two squares that share a single vertex, plus a notch back to that vertex."""
+    cx, cy = centre
+    return [
+        (cx, cy), (cx + 1, cy), (cx + 1, cy + 1), (cx, cy + 1), (cx, cy),
+        (cx - 1, cy), (cx - 1, cy - 1), (cx, cy - 1), (cx, cy),
+        (cx + 0.5, cy - 0.5), (cx + 0.5, cy - 1), (cx + 1, cy - 1),
+    ]
+
+
+def _probes(rng, polygon, count):
+    """Return random points near the polygon plus its vertices and points on its edges."""
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    points = [
+        (rng.uniform(min(xs) - 0.5, max(xs) + 0.5), rng.uniform(min(ys) - 0.5, max(ys) + 0.5))
+        for _ in range(count)
+    ]
+    points.extend(polygon)
+    for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+        points.append(((x1 + x2) / 2, (y1 + y2) / 2))
+        t = rng.random()
+        points.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1)))
+    # Whole-number and quarter-degree lattice points hit edges and vertices exactly
+    for x in np.arange(math.floor(min(xs)), math.ceil(max(xs)) + 0.25, 0.25):
+        for y in np.arange(math.floor(min(ys)), math.ceil(max(ys)) + 0.25, 0.25):
+            points.append((float(x), float(y)))
+    return points
+
+
+def _fences(rng):
+    fences = {}
+    for i in range(8):
+        centre = (rng.uniform(-5, 5), rng.uniform(-5, 5))
+        fences[f"star{i}"] = _star(rng, centre, rng.randrange(6, 24, 2))
+        lattice_centre = (round(centre[0]), round(centre[1]))
+        fences[f"lattice{i}"] = _lattice(rng, lattice_centre, rng.randrange(6, 16, 2))
+    fences["touching"] = _touching((0.0, 0.0))
+    fences["triangle"] = [(0.0, 0.0), (2.0, 0.0), (1.0, 2.0)]
+    fences["collinear"] = [(0.0, 0.0), (1.0, 0.0), (2.0, 0.0), (2.0, 2.0), (2.0, 1.0), (0.0, 1.0)]
+    return fences
+
+
+def test_engine_matches_point_in_polygon():
+    rng = random.Random(20250101)
+    fences = _fences(rng)
+    for resolution in (1, 4, 64):
+        engine = GeofenceEngine(grid_resolution=resolution)
+        for name, polygon in fences.items():
+            engine.set_fence(name, polygon)
+        packed = engine.packed()
+        probes = [p for polygon in fences.values() for p in _probes(rng, polygon, 30)]
+        batch = containing_batch(packed, probes)
+        for point, row in zip(probes, batch):
+            expected = sorted(name for name, polygon in fences.items() if point_in_polygon(point, polygon))
+            assert sorted(engine.containing(point)) == expected, (resolution, point)
+            assert sorted(packed.names[i] for i in np.flatnonzero(row)) == expected, (resolution, point)
\ No newline at end of file
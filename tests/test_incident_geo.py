@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from backend.incident_geo import IncidentGeoIndex, haversine_m
+from backend.models import Incident
+
+
+def _index(locations):
+    index = IncidentGeoIndex()
+    for i, location in enumerate(locations, start=1):
+        index.add(Incident(
+            id=i, camp="A", dtg=datetime(2026, 1, 1), subject="s", location=location,
+            incident_in_brief=["a"], reporter="x",
+        ))
+    return index
+
+
+def test_near_pole_returns_each_incident_once():
+    locations = [(89.99, lon) for lon in range(-180, 181, 15)] + [(89.5, 0.0), (-89.99, 0.0)]
+    index = _index(locations)
+    for center in ((89.999, 0.0), (89.999, 179.9), (90.0, -180.0)):
+        hits = index.near(center, 5000.0)
+        ids = [incident_id for incident_id, _ in hits]
+        assert len(ids) == len(set(ids))
+        expected = {i for i, location in enumerate(locations, start=1) if haversine_m(center, location) <= 5000.0}
+        assert set(ids) == expected
+
+
+def test_near_antimeridian_searches_both_sides():
+    index = _index([(10.0, 179.999), (10.0, -179.999), (10.0, 179.0)])
+    assert sorted(i for i, _ in index.near((10.0, 180.0), 1000.0)) == [1, 2]
\ No newline at end of file
@@ -0,0 +1,22 @@
+import asyncio
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.models import PatrolCreate
+from backend.routers.patrols import create_patrol, patrols_db, route_indexes
+
+ROUTE = [(23.80, 90.40), (23.81, 90.41)]
+DETOUR = [(23.80, 90.40), (23.79, 90.42)]
+
+
+def test_create_patrol_builds_route_index():
+    patrol = asyncio.run(create_patrol(PatrolCreate(unit="1 EB", route_name="north", route=ROUTE), user=None))
+    assert route_indexes[patrol.id].route == ROUTE
+    assert route_indexes[patrol.id].is_on_route((23.805, 90.405))
+
+
+def test_replicated_reroute_rebuilds_route_index():
+    patrol = asyncio.run(create_patrol(PatrolCreate(unit="2 EB", route_name="east", route=ROUTE), user=None))
+    patrols_db.apply_remote(patrol.id, {**jsonable_encoder(patrol), "route": DETOUR})
+    assert route_indexes[patrol.id].route == DETOUR
+    assert route_indexes[patrol.id].is_on_route((23.795, 90.41))
\ No newline at end of file
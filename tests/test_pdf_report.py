@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from backend.models import Incident
+from backend.pdf_report import INCIDENT_ROW_MAX_LINES, _incident_rows, generate_commander_brief
+
+
+def _incident(incident_id: int, details=("Movement seen near the gate",), follow_up=None) -> Incident:
+    return Incident(
+        id=incident_id,
+        camp="Camp 1",
+        dtg=datetime(2025, 1, 1, 6, 0),
+        subject="Suspicious movement",
+        location=(23.8103, 90.4125),
+        incident_in_brief=list(details),
+        follow_up=follow_up,
+        reporter="cpl.rahman",
+    )
+
+
+OVERSIZED = [
+    _incident(1, follow_up="Follow the track north and report back. " * 30),
+    _incident(2, details=[f"Observation {i}" for i in range(400)]),
+]
+
+
+@pytest.mark.parametrize("incident", OVERSIZED, ids=["long follow-up", "many details"])
+def test_oversized_incident_renders_in_table_layout(tmp_path, incident):
+    path = tmp_path / "brief.pdf"
+    incidents = [_incident(10), incident, _incident(11)]
+    generate_commander_brief(str(path), datetime(2025, 1, 1), datetime(2025, 1, 2), incidents, [], layout="table")
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+def test_oversized_incident_continues_on_further_rows():
+    rows = _incident_rows(OVERSIZED[1])
+    assert len(rows) > 1
+    assert rows[0][0] == "2" and all(row[0] == "" for row in rows[1:])
+    assert all(cell.count("\n") < INCIDENT_ROW_MAX_LINES for row in rows for cell in row)
+    details = "\n".join(row[5] for row in rows).split("\n")
+    assert details == [f"- Observation {i}" for i in range(400)]
+
+
+def test_short_incident_is_one_row():
+    assert len(_incident_rows(_incident(3, follow_up="Report at 0800"))) == 1
\ No newline at end of file
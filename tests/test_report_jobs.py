@@ -0,0 +1,91 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backend import report_jobs as report_jobs_module
+from backend.metrics import report_render_latency
+from backend.report_jobs import ReportJobManager
+
+START = datetime(2026, 1, 1)
+END = datetime(2026, 1, 2)
+
+
+def _run_job(monkeypatch, render, version="v1"):
+    manager = ReportJobManager(workers=1, cache_size=1)
+    manager._executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(report_jobs_module, "_render", render)
+
+    async def run():
+        job = manager.submit(START, END, version, [], [])
+        await job.done.wait()
+        return job
+
+    try:
+        return asyncio.run(run())
+    finally:
+        manager.shutdown()
+
+
+def test_render_duration_is_the_worker_time(monkeypatch):
+    done = report_render_latency.labels("done")
+    before = (done.count, done.sum)
+
+    def render(path, start, end, incidents, patrols):
+        open(path, "wb").close()
+        return 0.125, None
+
+    job = _run_job(monkeypatch, render)
+    assert job.status == "done"
+    assert (done.count, done.sum) == (before[0] + 1, before[1] + 0.125)
+
+
+def test_failed_render_records_worker_time_and_error(monkeypatch):
+    failed = report_render_latency.labels("failed")
+    before = (failed.count, failed.sum)
+
+    job = _run_job(monkeypatch, lambda *args: (0.5, "boom"))
+    assert (job.status, job.error) == ("failed", "boom")
+    assert (failed.count, failed.sum) == (before[0] + 1, before[1] + 0.5)
+
+
+def test_pool_failure_is_not_timed(monkeypatch):
+    failed = report_render_latency.labels("failed")
+    before = failed.count
+
+    def render(*args):
+        raise RuntimeError("pool broke")
+
+    job = _run_job(monkeypatch, render)
+    assert (job.status, job.error) == ("failed", "pool broke")
+    assert failed.count == before
+
+
+def test_evicted_brief_is_kept_until_released(monkeypatch):
+    manager = ReportJobManager(workers=1, cache_size=1)
+    manager._executor = ThreadPoolExecutor(1)
+
+    def render(path, start, end, incidents, patrols):
+        open(path, "wb").close()
+        return 0.0, None
+
+    monkeypatch.setattr(report_jobs_module, "_render", render)
+
+    async def run():
+        first = manager.submit(START, END, "v1", [], [])
+        manager.checkout(first)
+        await first.done.wait()
+        second = manager.submit(START, END, "v2", [], [])
+        await second.done.wait()
+        return first, second
+
+    try:
+        first, second = asyncio.run(run())
+        assert first.status == "expired"
+        path = first.path
+        assert os.path.exists(path)
+        manager.release(first)
+        assert not os.path.exists(path) and first.path is None
+        assert os.path.exists(second.path)
+    finally:
+        manager.shutdown()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import math
+import random
+
+from backend.geofence import RouteIndex, point_segment_distance
+
+THRESHOLD = 0.0005
+
+
+def _brute_force(point, route, threshold=THRESHOLD):
+    if len(route) == 1:
+        return math.hypot(point[0] - route[0][0], point[1] - route[0][1]) <= threshold
+    return any(point_segment_distance(point, a, b) <= threshold for a, b in zip(route, route[1:]))
+
+
+def _route(rng, vertices):
+    """Return a random walk mixing short steps, long jumps and repeated vertices."""
+    x, y = rng.uniform(90.0, 91.0), rng.uniform(23.0, 24.0)
+    route = [(x, y)]
+    for _ in range(vertices - 1):
+        kind = rng.random()
+        if kind < 0.15:
+            route.append(route[-1])
+            continue
+        step = 0.05 if kind < 0.3 else 0.002
+        x += rng.uniform(-step, step)
+        y += rng.uniform(-step, step)
+        route.append((x, y))
+    return route
+
+
+def _probes(rng, route, count):
+    """Return points scattered around the route at distances either side of the threshold."""
+    points = []
+    for _ in range(count):
+        a = rng.choice(route)
+        b = rng.choice(route)
+        t = rng.random()
+        angle = rng.uniform(0, 2 * math.pi)
+        offset = THRESHOLD * rng.choice((0.0, 0.5, 0.99, 1.01, 2.0, 10.0)) * rng.random() ** 0.1
+        points.append((a[0] + t * (b[0] - a[0]) + offset * math.cos(angle), a[1] + t * (b[1] - a[1]) + offset * math.sin(angle)))
+    return points
+
+
+def test_is_on_route_matches_brute_force():
+    rng = random.Random(7)
+    routes = [_route(rng, rng.randint(2, 60)) for _ in range(40)]
+    routes += [[(90.4, 23.8)], [(90.4, 23.8), (90.4, 23.8)], [(90.0, 23.0), (90.0, 23.0), (90.3, 23.2)]]
+    for route in routes:
+        index = RouteIndex(route, threshold=THRESHOLD)
+        # Consecutive queries move the cursor around, exercising both lookup paths
+        for point in _probes(rng, route, 300):
+            assert index.is_on_route(point) == _brute_force(point, route), (route, point)
+
+
+def test_long_segment_crossing_many_cells():
+    # One long segment among short ones makes cells much smaller than the segment
+    route = [(90.0 - i * 0.0001, 23.0 + (i % 2) * 0.0001) for i in range(1000, -1, -1)] + [(91.0, 23.7)]
+    index = RouteIndex(route, threshold=THRESHOLD)
+    assert index.cell_size < 0.01
+    for s in range(1001):
+        t = s / 1000
+        x, y = 90.0 + t, 23.0 + t * 0.7
+        assert index.is_on_route((x, y + 0.0004))
+        assert not index.is_on_route((x, y + 0.0012))
+
+
+def test_one_point_route():
+    index = RouteIndex([(90.4, 23.8)], threshold=THRESHOLD)
+    assert index.is_on_route((90.4003, 23.8003))
+    assert not index.is_on_route((90.4004, 23.8004))
+    assert not RouteIndex([], threshold=THRESHOLD).is_on_route((90.4, 23.8))
\ No newline at end of file
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.dependencies import create_access_token
+from backend.eventbus import InProcessBus
+from backend.routers import streaming
+from backend.routers.streaming import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.frames = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.frames.append(json.loads(data))
+
+
+async def _subscribe(text):
+    manager = ConnectionManager(bus=InProcessBus())
+    websocket = FakeSocket()
+    await manager.connect(websocket)
+    manager.handle_client_message(websocket, text)
+    for _ in range(3):
+        await asyncio.sleep(0)
+    return manager.subscriptions.clients[websocket], websocket.frames[-1]
+
+
+def test_subscribe_rejects_non_finite_and_off_globe_bboxes():
+    for bbox in ("[1e400, 0, 1, 1]", "[NaN, 0, 1, 1]", "[0, 0, 91, 1]", "[0, -181, 1, 1]", "[1, 0, 0, 1]"):
+        subscription, frame = asyncio.run(_subscribe('{"action": "subscribe", "bboxes": [%s]}' % bbox))
+        assert frame["type"] == "error", bbox
+        assert subscription.all and not subscription.bboxes
+
+
+def test_subscribe_accepts_valid_bbox():
+    subscription, frame = asyncio.run(_subscribe('{"action": "subscribe", "bboxes": [[23.7, 90.3, 23.9, 90.5]]}'))
+    assert frame["type"] == "subscription"
+    assert subscription.bboxes == {(23.7, 90.3, 23.9, 90.5)}
+
+
+def test_endpoint_forgets_socket_when_handler_fails(monkeypatch):
+    manager = ConnectionManager(bus=InProcessBus())
+
+    def fail(websocket, text):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(manager, "handle_client_message", fail)
+    monkeypatch.setattr(streaming, "manager", manager)
+    app = FastAPI()
+    app.include_router(streaming.router)
+    token = create_access_token({"sub": "admin", "role": "super_admin"})
+    with TestClient(app) as client:
+        try:
+            with client.websocket_connect(f"/ws?token={token}") as websocket:
+                assert manager.active_connections
+                websocket.send_text("{}")
+                websocket.receive_text()
+        except Exception:
+            pass
+    assert not manager.active_connections
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from backend.eventbus import InProcessBus
+from backend.routers.streaming import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.frames = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.frames.append(json.loads(data))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.frames.append(data)
+
+    def ticks(self):
+        """Return and forget the tick frames received so far."""
+        ticks = [frame for frame in self.frames if frame["type"] == "tick"]
+        self.frames = []
+        return ticks
+
+
+def _location(patrol_id, location, on_track=True):
+    return {
+        "type": "location_update",
+        "patrol_id": patrol_id,
+        "unit": f"unit {patrol_id}",
+        "location": location,
+        "timestamp": "2025-01-01T00:00:00",
+        "timestamp_ms": 1735689600000,
+        "on_track": on_track,
+    }
+
+
+def _full(message):
+    """Return a location update as a tick frame carries it in full."""
+    return json.loads(json.dumps({k: v for k, v in message.items() if k != "type"}))
+
+
+async def _connect(manager, subscribe=None) -> FakeSocket:
+    websocket = FakeSocket()
+    await manager.connect(websocket)
+    if subscribe:
+        manager.subscriptions.subscribe(websocket, **subscribe)
+    return websocket
+
+
+async def _tick(manager, *messages) -> None:
+    if messages:
+        manager._deliver({"messages": list(messages)})
+    manager.ticker.flush()
+    # Let the writer tasks send what was queued
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_client_gets_changes_it_missed_while_filtered_out():
+    async def main():
+        manager = ConnectionManager(tick_hz=10, bus=InProcessBus())
+        everyone = await _connect(manager)
+        nearby = await _connect(manager, {"bboxes": [(0.0, 0.0, 1.0, 1.0)]})
+        await _tick(manager, _location(1, (5.0, 5.0)))
+        await _tick(manager, _location(1, (5.0, 5.0), on_track=False))
+        assert [tick["messages"] for tick in everyone.ticks()] == [
+            [_full(_location(1, (5.0, 5.0)))],
+            [{"on_track": False, "patrol_id": 1}],
+        ]
+        assert nearby.ticks() == []
+        # The patrol moves into the box: the newly targeted client gets the whole record, on_track included
+        await _tick(manager, _location(1, (0.5, 0.5), on_track=False))
+        [tick] = nearby.ticks()
+        assert tick["messages"][0]["on_track"] is False
+        assert tick["messages"][0]["unit"] == "unit 1"
+        [tick] = everyone.ticks()
+        assert tick["messages"] == [{"location": [0.5, 0.5], "patrol_id": 1}]
+
+    asyncio.run(main())
+
+
+def test_dropped_tick_frame_forces_full_resync():
+    async def main():
+        manager = ConnectionManager(queue_size=1, policy="drop_oldest", tick_hz=10, bus=InProcessBus())
+        slow = await _connect(manager)
+        await asyncio.sleep(0)
+        slow.frames = []
+        # Two ticks queued before the writer runs; the first is evicted
+        manager._deliver({"messages": [_location(1, (0.1, 0.1))]})
+        manager.ticker.flush()
+        await _tick(manager, _location(2, (0.2, 0.2)))
+        await _tick(manager)
+        received = [tick["messages"] for tick in slow.ticks()]
+        assert len(received) == 2
+        assert received[0] == [_full(_location(2, (0.2, 0.2)))]
+        # The resync tick resends every patrol in full, including the one from the dropped frame
+        resent = {message["patrol_id"]: message for message in received[-1]}
+        assert sorted(resent) == [1, 2]
+        assert resent[1] == _full(_location(1, (0.1, 0.1)))
+        # Afterwards deltas resume against the resent state
+        await _tick(manager, _location(1, (0.1, 0.1), on_track=False))
+        assert [tick["messages"] for tick in slow.ticks()] == [[{"on_track": False, "patrol_id": 1}]]
+
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,55 @@
+import pytest
+
+from backend.wire import HEADER, KIND_LOCATIONS, KIND_TICK, LOCATION_RECORD, decode_frame, encode_locations
+
+
+def _update(patrol_id, location, timestamp_ms, on_track=True):
+    return {
+        "type": "location_update",
+        "patrol_id": patrol_id,
+        "unit": "1 EB",
+        "location": location,
+        "timestamp": "unused by the encoder",
+        "timestamp_ms": timestamp_ms,
+        "on_track": on_track,
+    }
+
+
+def test_round_trip():
+    updates = [
+        _update(1, (23.8103321, 90.4125181), 1735689600123),
+        _update(4_000_000_000, (-89.9999999, -179.9999999), 0, on_track=False),
+        _update(7, (90.0, 180.0), 4102444800000),
+    ]
+    frame = encode_locations(updates, KIND_TICK, seq=42)
+    assert len(frame) == HEADER.size + len(updates) * LOCATION_RECORD.size
+    kind, seq, messages = decode_frame(frame)
+    assert (kind, seq) == (KIND_TICK, 42)
+    for update, message in zip(updates, messages):
+        assert message["type"] == "location_update"
+        assert message["patrol_id"] == update["patrol_id"]
+        assert message["location"] == pytest.approx(update["location"], abs=1e-7)
+        assert message["timestamp_ms"] == update["timestamp_ms"]
+        assert message["on_track"] == update["on_track"]
+
+
+def test_empty_frame():
+    assert decode_frame(encode_locations([], seq=3)) == (KIND_LOCATIONS, 3, [])
+
+
+def test_coordinates_round_to_seven_decimals():
+    _, _, [message] = decode_frame(encode_locations([_update(1, (1.23456784, -1.23456786), 0)]))
+    assert message["location"] == (1.2345678, -1.2345679)
+
+
+@pytest.mark.parametrize("location", [(300.0, 0.0), (0.0, float("inf")), (float("nan"), 0.0)])
+def test_unencodable_location_raises_value_error(location):
+    with pytest.raises(ValueError):
+        encode_locations([_update(1, location, 0)])
+
+
+def test_unknown_version_is_rejected():
+    frame = bytearray(encode_locations([_update(1, (0.0, 0.0), 0)]))
+    frame[0] = 99
+    with pytest.raises(ValueError):
+        decode_frame(bytes(frame))
\ No newline at end of file